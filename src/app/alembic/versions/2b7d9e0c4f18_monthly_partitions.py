@@ -0,0 +1,295 @@
+"""monthly_partitions
+
+Revision ID: 2b7d9e0c4f18
+Revises: 8f4c6a1e3b59
+Create Date: 2026-10-18 13:40:52.281906
+
+Lookups of transactions by id alone check the index of every partition, so pass
+created_at where it is known. transactions.ext_id is kept unique by the
+transactions_ext_ids table maintained by a trigger, which also locates the
+partition of a transaction by ext_id.
+
+Tables are copied to the partitioned ones within the migration transaction, so
+writes to transactions, receipts and receipt items must be stopped while it runs:
+apply it with the app stopped, in a window long enough to copy and index them.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "2b7d9e0c4f18"
+down_revision = "8f4c6a1e3b59"
+branch_labels = None
+depends_on = None
+
+PARTITIONED_TABLES = ("transactions", "receipts", "receipt_items")
+MONTHS_AHEAD = 3
+
+# Rows which landed in the default partition, because the partitions were not
+# created in time, are moved to the created ones: a partition can't be created
+# while the default one has rows of its range.
+CREATE_MONTHLY_PARTITIONS = """
+CREATE OR REPLACE FUNCTION content.create_monthly_partitions(
+    parent text, date_from date, date_to date
+) RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    default_partition text := parent || '_default';
+    month date;
+    partition text;
+    has_rows boolean;
+    moved integer;
+    created integer := 0;
+BEGIN
+    -- concurrent calls wait for each other instead of racing
+    PERFORM pg_advisory_xact_lock(hashtext('content.' || parent));
+
+    FOR month IN EXECUTE format(
+        'SELECT m::date FROM generate_series('
+        'date_trunc(''month'', %L::date), %L::date, interval ''1 month'') m '
+        'UNION SELECT date_trunc(''month'', created_at)::date FROM content.%I '
+        'ORDER BY 1',
+        date_from, date_to, default_partition
+    ) LOOP
+        partition := format('%s_y%s', parent, to_char(month, 'YYYY"m"MM'));
+        CONTINUE WHEN to_regclass(format('content.%I', partition)) IS NOT NULL;
+
+        EXECUTE format(
+            'SELECT EXISTS (SELECT FROM content.%I '
+            'WHERE created_at >= %L AND created_at < %L)',
+            default_partition, month, month + interval '1 month'
+        ) INTO has_rows;
+
+        IF has_rows THEN
+            EXECUTE format(
+                'ALTER TABLE content.%I DETACH PARTITION content.%I',
+                parent, default_partition
+            );
+        END IF;
+
+        EXECUTE format(
+            'CREATE TABLE content.%I PARTITION OF content.%I '
+            'FOR VALUES FROM (%L) TO (%L)',
+            partition, parent, month, month + interval '1 month'
+        );
+        created := created + 1;
+
+        IF has_rows THEN
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM content.%I '
+                'WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO content.%I SELECT * FROM moved',
+                default_partition, month, month + interval '1 month', partition
+            );
+            GET DIAGNOSTICS moved = ROW_COUNT;
+            RAISE WARNING 'Moved % rows from % to %',
+                moved, default_partition, partition;
+            EXECUTE format(
+                'ALTER TABLE content.%I ATTACH PARTITION content.%I DEFAULT',
+                parent, default_partition
+            );
+        END IF;
+    END LOOP;
+
+    RETURN created;
+END
+$$
+"""
+
+# Unique keys of a partitioned table must include the partition key, so ext_id is
+# kept unique by the unpartitioned table of ext_ids maintained by the trigger. It
+# also locates the partition of the transaction by ext_id.
+CREATE_EXT_IDS = """
+CREATE TABLE content.transactions_ext_ids (
+    ext_id uuid PRIMARY KEY,
+    transaction_id uuid NOT NULL,
+    created_at timestamp without time zone NOT NULL
+);
+
+INSERT INTO content.transactions_ext_ids (ext_id, transaction_id, created_at)
+SELECT ext_id, id, created_at FROM content.transactions WHERE ext_id IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION content.keep_transactions_ext_ids()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.ext_id IS NOT NULL THEN
+        DELETE FROM content.transactions_ext_ids
+        WHERE ext_id = OLD.ext_id AND transaction_id = OLD.id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.ext_id IS NOT NULL THEN
+        -- a row moved between partitions keeps its ext_id
+        INSERT INTO content.transactions_ext_ids (ext_id, transaction_id, created_at)
+        VALUES (NEW.ext_id, NEW.id, NEW.created_at)
+        ON CONFLICT (ext_id) DO UPDATE SET created_at = EXCLUDED.created_at
+        WHERE transactions_ext_ids.transaction_id = EXCLUDED.transaction_id;
+
+        IF NOT FOUND THEN
+            RAISE unique_violation USING
+                MESSAGE = format('duplicate transactions ext_id %s', NEW.ext_id),
+                CONSTRAINT = 'transactions_ext_ids_pkey';
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER keep_transactions_ext_ids
+AFTER INSERT OR UPDATE OF ext_id, created_at OR DELETE ON content.transactions
+FOR EACH ROW EXECUTE FUNCTION content.keep_transactions_ext_ids();
+"""
+
+INDEXES = {
+    "transactions": {
+        "ix_content_transactions_ext_id": "ext_id",
+        "ix_content_transactions_created_at_id": "created_at, id",
+        "ix_content_transactions_amount_id": "amount, id",
+        "ix_content_transactions_user_id_created_at_id": (
+            "user_id, created_at DESC, id DESC"
+        ),
+        "ix_content_transactions_status_created_at_id": "status, created_at, id",
+        "ix_content_transactions_type_status_created_at_id": (
+            "type, status, created_at, id"
+        ),
+        "ix_content_transactions_payment_type_created_at_id": (
+            "payment_type, created_at, id"
+        ),
+    },
+    "receipts": {
+        "ix_content_receipts_ext_id": "ext_id",
+        "ix_content_receipts_status": "status",
+        "ix_content_receipts_transaction_id": "transaction_id",
+    },
+    "receipt_items": {
+        "ix_content_receipt_items_receipt_id": "receipt_id",
+    },
+}
+
+
+def upgrade() -> None:
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+
+    for table in PARTITIONED_TABLES:
+        op.execute(f"ALTER TABLE content.{table} RENAME TO {table}_unpartitioned")
+        op.execute(
+            f"""
+            UPDATE content.{table}_unpartitioned
+            SET created_at = coalesce(updated_at, timezone('utc', now()))
+            WHERE created_at IS NULL
+            """
+        )
+        # primary and unique keys of a partitioned table must include the partition
+        # key, so id alone is not unique anymore and can't be referenced by foreign
+        # keys
+        op.execute(
+            f"""
+            CREATE TABLE content.{table} (
+                LIKE content.{table}_unpartitioned
+                    INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+            """
+        )
+        op.execute(
+            f"""
+            ALTER TABLE content.{table}
+            ALTER COLUMN created_at SET DEFAULT timezone('utc', now())
+            """
+        )
+        op.execute(
+            f"CREATE TABLE content.{table}_default PARTITION OF content.{table} DEFAULT"
+        )
+        op.execute(
+            f"""
+            SELECT content.create_monthly_partitions(
+                '{table}',
+                coalesce(
+                    (SELECT min(created_at) FROM content.{table}_unpartitioned),
+                    now()
+                )::date,
+                (now() + interval '{MONTHS_AHEAD} months')::date
+            )
+            """
+        )
+        op.execute(
+            f"INSERT INTO content.{table} SELECT * FROM content.{table}_unpartitioned"
+        )
+
+    # drops foreign keys between these tables and from users_films as well
+    for table in PARTITIONED_TABLES:
+        op.execute(f"DROP TABLE content.{table}_unpartitioned CASCADE")
+
+    for table, indexes in INDEXES.items():
+        for name, columns in indexes.items():
+            op.execute(f"CREATE INDEX {name} ON content.{table} ({columns})")
+
+    op.execute(CREATE_EXT_IDS)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE content.transactions_ext_ids")
+
+    for table in PARTITIONED_TABLES:
+        op.execute(f"ALTER TABLE content.{table} RENAME TO {table}_partitioned")
+        op.execute(
+            f"""
+            CREATE TABLE content.{table} (
+                LIKE content.{table}_partitioned
+                    INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                PRIMARY KEY (id)
+            )
+            """
+        )
+        op.execute(
+            f"INSERT INTO content.{table} SELECT * FROM content.{table}_partitioned"
+        )
+        op.execute(f"DROP TABLE content.{table}_partitioned CASCADE")
+
+    for table, indexes in INDEXES.items():
+        for name, columns in indexes.items():
+            if name not in (
+                "ix_content_transactions_ext_id",
+                "ix_content_receipts_transaction_id",
+                "ix_content_receipt_items_receipt_id",
+            ):
+                op.execute(f"CREATE INDEX {name} ON content.{table} ({columns})")
+
+    op.execute(
+        "ALTER TABLE content.transactions ADD CONSTRAINT transactions_ext_id_key "
+        "UNIQUE (ext_id)"
+    )
+    op.execute(
+        "ALTER TABLE content.transactions ADD CONSTRAINT _id_type_uc UNIQUE (id, type)"
+    )
+    op.create_foreign_key(
+        None,
+        "receipts",
+        "transactions",
+        ["transaction_id"],
+        ["id"],
+        source_schema="content",
+        referent_schema="content",
+        ondelete="SET NULL",
+    )
+    op.create_foreign_key(
+        None,
+        "receipt_items",
+        "receipts",
+        ["receipt_id"],
+        ["id"],
+        source_schema="content",
+        referent_schema="content",
+        ondelete="SET NULL",
+    )
+    op.create_foreign_key(
+        None,
+        "users_films",
+        "transactions",
+        ["transaction_id"],
+        ["id"],
+        source_schema="content",
+        referent_schema="content",
+    )
+    op.execute("DROP FUNCTION content.create_monthly_partitions(text, date, date)")
+    op.execute("DROP FUNCTION content.keep_transactions_ext_ids()")
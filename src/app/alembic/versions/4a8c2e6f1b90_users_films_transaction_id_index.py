@@ -0,0 +1,38 @@
+"""users_films_transaction_id_index
+
+Revision ID: 4a8c2e6f1b90
+Revises: d61a0f7b5e23
+Create Date: 2026-10-18 17:41:26.205913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "4a8c2e6f1b90"
+down_revision = "d61a0f7b5e23"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # transactions are joined with their user films by it
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_content_users_films_transaction_id",
+            "users_films",
+            ["transaction_id"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_content_users_films_transaction_id",
+            table_name="users_films",
+            schema="content",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,55 @@
+"""transactions_user_history_index
+
+Revision ID: 5e0b7d2a9c41
+Revises: c3a9e1f4d2b7
+Create Date: 2026-10-18 11:02:17.604133
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5e0b7d2a9c41"
+down_revision = "c3a9e1f4d2b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the table is in use, so the index is built without locking out writes, which
+    # can't be done in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_content_transactions_user_id_created_at_id",
+            "transactions",
+            ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        # user_id is a prefix of the composite index above
+        op.drop_index(
+            "ix_content_transactions_user_id",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_content_transactions_user_id",
+            "transactions",
+            ["user_id"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_user_id_created_at_id",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,84 @@
+"""revenue_aggregates
+
+Revision ID: 8f4c6a1e3b59
+Revises: 5e0b7d2a9c41
+Create Date: 2026-10-18 12:24:05.917342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "8f4c6a1e3b59"
+down_revision = "5e0b7d2a9c41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "transactions",
+        sa.Column("film_id", postgresql.UUID(as_uuid=True), nullable=True),
+        schema="content",
+    )
+    op.execute(
+        """
+        UPDATE content.transactions t
+        SET film_id = uf.film_id
+        FROM content.users_films uf
+        WHERE uf.transaction_id = t.id
+        """
+    )
+    # users_films keeps the film of its latest transaction only, so earlier
+    # payments and refunds of the film are matched by receipt items: refund items
+    # are copied from the payment ones, and their description is the film title.
+    # Titles which are ambiguous for the user are skipped.
+    op.execute(
+        """
+        WITH user_film_titles AS (
+            SELECT
+                t.user_id,
+                ri.description,
+                (array_agg(DISTINCT uf.film_id))[1] AS film_id
+            FROM content.users_films uf
+            JOIN content.transactions t ON t.id = uf.transaction_id
+            JOIN content.receipts r ON r.transaction_id = t.id
+            JOIN content.receipt_items ri ON ri.receipt_id = r.id
+            GROUP BY t.user_id, ri.description
+            HAVING count(DISTINCT uf.film_id) = 1
+        )
+        UPDATE content.transactions t
+        SET film_id = uft.film_id
+        FROM content.receipts r, content.receipt_items ri, user_film_titles uft
+        WHERE t.film_id IS NULL
+            AND r.transaction_id = t.id
+            AND ri.receipt_id = r.id
+            AND uft.user_id = t.user_id
+            AND uft.description = ri.description
+        """
+    )
+    op.create_table(
+        "revenue_aggregates",
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("film_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "payment_type",
+            postgresql.ENUM(name="transactionpaymenttype", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("payments_count", sa.Integer(), nullable=False),
+        sa.Column("payments_amount", sa.Numeric(precision=14, scale=3), nullable=False),
+        sa.Column("refunds_count", sa.Integer(), nullable=False),
+        sa.Column("refunds_amount", sa.Numeric(precision=14, scale=3), nullable=False),
+        sa.PrimaryKeyConstraint("day", "film_id", "payment_type"),
+        schema="content",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("revenue_aggregates", schema="content")
+    op.drop_column("transactions", "film_id", schema="content")
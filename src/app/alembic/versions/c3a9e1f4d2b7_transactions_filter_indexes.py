@@ -0,0 +1,138 @@
+"""transactions_filter_indexes
+
+Revision ID: c3a9e1f4d2b7
+Revises: 94f21b034c8b
+Create Date: 2026-10-18 10:12:41.318207
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c3a9e1f4d2b7"
+down_revision = "94f21b034c8b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the table is in use, so indexes are built without locking out writes, which
+    # can't be done in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_content_transactions_created_at_id",
+            "transactions",
+            ["created_at", "id"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_content_transactions_amount_id",
+            "transactions",
+            ["amount", "id"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_content_transactions_status_created_at_id",
+            "transactions",
+            ["status", "created_at", "id"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_content_transactions_type_status_created_at_id",
+            "transactions",
+            ["type", "status", "created_at", "id"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_content_transactions_payment_type_created_at_id",
+            "transactions",
+            ["payment_type", "created_at", "id"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        # single column indexes are prefixes of the composite ones above
+        op.drop_index(
+            "ix_content_transactions_status",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_type",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_payment_type",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_content_transactions_payment_type",
+            "transactions",
+            ["payment_type"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_content_transactions_type",
+            "transactions",
+            ["type"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_content_transactions_status",
+            "transactions",
+            ["status"],
+            unique=False,
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_payment_type_created_at_id",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_type_status_created_at_id",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_status_created_at_id",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_amount_id",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_content_transactions_created_at_id",
+            table_name="transactions",
+            schema="content",
+            postgresql_concurrently=True,
+        )
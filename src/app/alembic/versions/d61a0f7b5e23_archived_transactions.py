@@ -0,0 +1,34 @@
+"""archived_transactions
+
+Revision ID: d61a0f7b5e23
+Revises: 2b7d9e0c4f18
+Create Date: 2026-10-18 15:08:33.470125
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "d61a0f7b5e23"
+down_revision = "2b7d9e0c4f18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "archived_transactions",
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("path", sa.String(length=255), nullable=False),
+        sa.Column("transaction_updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        schema="content",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("archived_transactions", schema="content")
@@ -13,3 +13,4 @@ admin_api = APIRouter(
 )
 
 admin_api.include_router(v1.transactions.router, prefix="/v1/transactions")
+admin_api.include_router(v1.revenue.router, prefix="/v1/revenue")
@@ -1 +1 @@
-from app.api.admin.v1 import transactions
+from app.api.admin.v1 import revenue, transactions
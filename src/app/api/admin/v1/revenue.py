@@ -0,0 +1,56 @@
+import enum
+
+import sqlalchemy as sa
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.admin.v1.schemas import RevenueFilterParams, RevenueSchema
+from app.api.dependencies.database import get_read_db
+from app.models import RevenueAggregate
+
+router = APIRouter()
+
+
+class GroupByEnum(str, enum.Enum):
+    DAY = "day"
+    FILM = "film"
+    PAYMENT_TYPE = "payment_type"
+
+
+GROUP_BY_COLUMNS = {
+    GroupByEnum.DAY: RevenueAggregate.day,
+    GroupByEnum.FILM: RevenueAggregate.film_id,
+    GroupByEnum.PAYMENT_TYPE: RevenueAggregate.payment_type,
+}
+
+
+@router.get(
+    "",
+    response_model=list[RevenueSchema],
+    description="Revenue grouped by day, film and/or payment type",
+)
+async def get_revenue(
+    group_by: list[GroupByEnum] = Query([GroupByEnum.DAY]),
+    filters: RevenueFilterParams = Depends(),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    columns = [GROUP_BY_COLUMNS[group] for group in dict.fromkeys(group_by)]
+    payments_amount = sa.func.sum(RevenueAggregate.payments_amount)
+    refunds_amount = sa.func.sum(RevenueAggregate.refunds_amount)
+    query = (
+        filters.apply(
+            sa.select(
+                *columns,
+                sa.func.sum(RevenueAggregate.payments_count).label("payments_count"),
+                payments_amount.label("payments_amount"),
+                sa.func.sum(RevenueAggregate.refunds_count).label("refunds_count"),
+                refunds_amount.label("refunds_amount"),
+                (payments_amount - refunds_amount).label("net_amount"),
+            )
+        )
+        .group_by(*columns)
+        .order_by(*columns)
+    )
+    result = await db_session.execute(query)
+
+    return result.mappings().all()
@@ -1,9 +1,15 @@
+import enum
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
 from typing import Optional
 
-from pydantic import UUID4
+from fastapi import Query
+from pydantic import BaseModel, UUID4
+from sqlalchemy.sql import Select
 
 from app.api.schemas import ORJSONModel
-from app.models import Transaction, Receipt, ReceiptItem
+from app.models import Transaction, Receipt, ReceiptItem, RevenueAggregate
 
 
 class UserFilmSchema(ORJSONModel):
@@ -49,3 +55,86 @@ class TransactionSchema(ORJSONModel):
 
     class Config:
         orm_mode = True
+
+
+# dataclass instead of pydantic model keeps ``Query`` in the signature, which
+# FastAPI needs to read list fields from the query string
+@dataclass
+class TransactionFilterParams:
+    status: Optional[list[Transaction.StatusEnum]] = Query(None)
+    type: Optional[list[Transaction.TypeEnum]] = Query(None)
+    payment_type: Optional[list[Transaction.PaymentType]] = Query(None)
+    user_id: Optional[UUID4] = Query(None)
+    created_from: Optional[datetime] = Query(None, description="Inclusive")
+    created_to: Optional[datetime] = Query(None, description="Exclusive")
+    amount_from: Optional[Decimal] = Query(None, ge=0, description="Inclusive")
+    amount_to: Optional[Decimal] = Query(None, ge=0, description="Inclusive")
+
+    def apply(self, query: Select) -> Select:
+        if self.status:
+            query = query.where(Transaction.status.in_(self.status))
+        if self.type:
+            query = query.where(Transaction.type.in_(self.type))
+        if self.payment_type:
+            query = query.where(Transaction.payment_type.in_(self.payment_type))
+        if self.user_id:
+            query = query.where(Transaction.user_id == self.user_id)
+        if self.created_from:
+            query = query.where(Transaction.created_at >= self.created_from)
+        if self.created_to:
+            query = query.where(Transaction.created_at < self.created_to)
+        if self.amount_from is not None:
+            query = query.where(Transaction.amount >= self.amount_from)
+        if self.amount_to is not None:
+            query = query.where(Transaction.amount <= self.amount_to)
+
+        return query
+
+
+class TransactionSortParams(BaseModel):
+    class SortEnum(str, enum.Enum):
+        CREATED_AT = "created_at"
+        CREATED_AT_DESC = "-created_at"
+        AMOUNT = "amount"
+        AMOUNT_DESC = "-amount"
+
+    sort: SortEnum = Query(SortEnum.CREATED_AT_DESC, description="Sort order")
+
+    @property
+    def descending(self) -> bool:
+        return self.sort.value.startswith("-")
+
+    @property
+    def column(self):
+        return getattr(Transaction, self.sort.value.lstrip("-"))
+
+
+class RevenueSchema(ORJSONModel):
+    day: Optional[date]
+    film_id: Optional[UUID4]
+    payment_type: Optional[Transaction.PaymentType]
+    payments_count: int
+    payments_amount: float
+    refunds_count: int
+    refunds_amount: float
+    net_amount: float
+
+
+@dataclass
+class RevenueFilterParams:
+    date_from: Optional[date] = Query(None, description="Inclusive")
+    date_to: Optional[date] = Query(None, description="Inclusive")
+    film_id: Optional[UUID4] = Query(None)
+    payment_type: Optional[list[Transaction.PaymentType]] = Query(None)
+
+    def apply(self, query: Select) -> Select:
+        if self.date_from:
+            query = query.where(RevenueAggregate.day >= self.date_from)
+        if self.date_to:
+            query = query.where(RevenueAggregate.day <= self.date_to)
+        if self.film_id:
+            query = query.where(RevenueAggregate.film_id == self.film_id)
+        if self.payment_type:
+            query = query.where(RevenueAggregate.payment_type.in_(self.payment_type))
+
+        return query
@@ -1,12 +1,28 @@
 import sqlalchemy as sa
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from fastapi_pagination import LimitOffsetPage
-from fastapi_pagination.ext.async_sqlalchemy import paginate
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.admin.v1.schemas import TransactionSchema
-from app.api.dependencies.database import get_db
+from app.api.admin.v1.schemas import (
+    TransactionFilterParams,
+    TransactionSchema,
+    TransactionSortParams,
+)
+from app.api.dependencies.database import get_read_db, get_snapshot_read_db
+from app.api.errors import INVALID_CURSOR
+from app.api.export import ExportFormatEnum, stream_rows
+from app.api.pagination import (
+    CountStrategyEnum,
+    CursorPage,
+    CursorParams,
+    InvalidCursorError,
+    paginate,
+    paginate_by_cursor,
+)
+from app.api.schemas import ErrorSchema
 from app.models import Transaction
+from app.settings import settings
 
 router = APIRouter()
 
@@ -14,7 +30,91 @@ router = APIRouter()
 @router.get(
     "",
     response_model=LimitOffsetPage[TransactionSchema],
-    description="Retrieve transactions",
+    description="Retrieve transactions. Use cursor pagination instead.",
+    deprecated=True,
+)
+async def get_transactions(
+    filters: TransactionFilterParams = Depends(),
+    sorting: TransactionSortParams = Depends(),
+    count: CountStrategyEnum = Query(
+        CountStrategyEnum(settings.PAGINATION.COUNT_STRATEGY),
+        description="How to calculate the total",
+    ),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    order_by = (
+        (sorting.column.desc(), Transaction.id.desc())
+        if sorting.descending
+        else (sorting.column.asc(), Transaction.id.asc())
+    )
+    return await paginate(
+        db_session,
+        filters.apply(sa.select(Transaction))
+        .options(*Transaction.load_options(Transaction.LoadProfileEnum.FULL))
+        .order_by(*order_by),
+        count_strategy=count,
+    )
+
+
+@router.get(
+    "/cursor",
+    response_model=CursorPage[TransactionSchema],
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorSchema},
+    },
+    description="Retrieve transactions paginated by cursor",
 )
-async def get_transactions(db_session: AsyncSession = Depends(get_db)):
-    return await paginate(db_session, sa.select(Transaction))
+async def get_transactions_by_cursor(
+    params: CursorParams = Depends(),
+    filters: TransactionFilterParams = Depends(),
+    sorting: TransactionSortParams = Depends(),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    try:
+        return await paginate_by_cursor(
+            db_session,
+            filters.apply(sa.select(Transaction)).options(
+                *Transaction.load_options(Transaction.LoadProfileEnum.FULL)
+            ),
+            Transaction,
+            params,
+            order_by=sorting.column,
+            descending=sorting.descending,
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_CURSOR
+        )
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                ExportFormatEnum.CSV.media_type: {},
+                ExportFormatEnum.NDJSON.media_type: {},
+            }
+        },
+    },
+    description="Export transactions as CSV or NDJSON",
+)
+async def export_transactions(
+    export_format: ExportFormatEnum = Query(ExportFormatEnum.CSV, alias="format"),
+    filters: TransactionFilterParams = Depends(),
+    db_session: AsyncSession = Depends(get_snapshot_read_db),
+):
+    query = filters.apply(sa.select(*Transaction.__table__.columns)).order_by(
+        Transaction.created_at, Transaction.id
+    )
+
+    return StreamingResponse(
+        stream_rows(db_session, query, export_format),
+        media_type=export_format.media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="transactions.{export_format.value}"'
+            )
+        },
+    )
@@ -1,9 +1,38 @@
 from typing import AsyncIterator
 
-from app.database import session_scope
+from fastapi import Depends
+from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.dependencies.auth import decode_jwt
+from app.database import session_scope, read_session_scope
+from app.security import TokenData
+
 
 async def get_db() -> AsyncIterator[AsyncSession]:
     async with session_scope() as session:
         yield session
+
+
+async def get_read_db() -> AsyncIterator[AsyncSession]:
+    async with read_session_scope() as session:
+        yield session
+
+
+async def get_snapshot_read_db() -> AsyncIterator[AsyncSession]:
+    """Read session seeing a single snapshot, for long reads like exports."""
+    async with read_session_scope(isolation_level="REPEATABLE READ") as session:
+        yield session
+
+
+async def get_user_read_db(user_id: UUID4) -> AsyncIterator[AsyncSession]:
+    """Read session for endpoints with user_id path param."""
+    async with read_session_scope(user_id) as session:
+        yield session
+
+
+async def get_current_user_read_db(
+    token_data: TokenData = Depends(decode_jwt),
+) -> AsyncIterator[AsyncSession]:
+    async with read_session_scope(token_data.user_id) as session:
+        yield session
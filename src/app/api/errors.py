@@ -10,3 +10,6 @@ REFUND_ERROR = "Operation rejected. Please contact technical support."
 INCORRECT_CREDENTIALS = "Incorrect credentials."
 NOT_AUTHENTICATED = "Not authenticated"
 NOT_ALLOWED = "Not allowed."
+INVALID_CURSOR = "Invalid cursor."
+REQUEST_IN_PROGRESS = "Request with this idempotence key is in progress."
+IDEMPOTENCE_KEY_REUSED = "Idempotence key is used already for another request."
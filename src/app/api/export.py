@@ -0,0 +1,70 @@
+import csv
+import enum
+import io
+from typing import AsyncIterator
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+CHUNK_SIZE = 1000
+
+
+class ExportFormatEnum(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+    @property
+    def media_type(self) -> str:
+        return {
+            self.CSV: "text/csv",
+            self.NDJSON: "application/x-ndjson",
+        }[self]
+
+
+def _csv_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+
+    return value
+
+
+def _to_csv(rows: list[dict], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if header and rows:
+        writer.writerow(rows[0].keys())
+
+    writer.writerows([_csv_value(value) for value in row.values()] for row in rows)
+
+    return buffer.getvalue().encode()
+
+
+def _to_ndjson(rows: list[dict]) -> bytes:
+    return b"".join(orjson.dumps(row, default=str) + b"\n" for row in rows)
+
+
+async def stream_rows(
+    session: AsyncSession,
+    query: Select,
+    export_format: ExportFormatEnum,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Streams query rows serialized by chunks. Rows are fetched from a server-side
+    cursor chunk_size at a time, so memory doesn't depend on the result size.
+    Query should select columns, not ORM entities.
+    """
+    result = await session.stream(query.execution_options(yield_per=chunk_size))
+    header = True
+
+    async for partition in result.mappings().partitions(chunk_size):
+        rows = [dict(row) for row in partition]
+
+        if export_format == ExportFormatEnum.CSV:
+            yield _to_csv(rows, header)
+        else:
+            yield _to_ndjson(rows)
+
+        header = False
@@ -0,0 +1,238 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import time
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from fastapi import HTTPException, params, status
+from fastapi.encoders import jsonable_encoder
+from redis import RedisError
+
+from app.api.errors import IDEMPOTENCE_KEY_REUSED, REQUEST_IN_PROGRESS
+from app.cache import LRUCache
+from app.redis import redis_client
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+IN_PROGRESS = b"in-progress"
+
+
+class RequestInProgressError(Exception):
+    """Raise it if a duplicate request is still in progress after waiting."""
+
+
+class IdempotenceKeyReusedError(Exception):
+    """Raise it if the idempotence key is used already for another request."""
+
+
+class IdempotencyStore:
+    """
+    Remembers responses of requests by their idempotence keys, so retries get the
+    stored response instead of doing the work again. While the first request is
+    in progress its duplicates wait for it. Responses are stored with fingerprints
+    of their requests, so a key reused for another request is rejected. Shared
+    between workers through redis
+    if it is enabled, otherwise the latest local_size keys are kept in process and
+    only retries which reach the same worker are deduplicated.
+    """
+
+    key_prefix = "idempotency"
+
+    def __init__(
+        self,
+        in_progress_ttl_sec: int,
+        response_ttl_sec: int,
+        wait_timeout_sec: float,
+        poll_interval_sec: float,
+        local_size: int,
+    ) -> None:
+        self.in_progress_ttl_sec = in_progress_ttl_sec
+        self.response_ttl_sec = response_ttl_sec
+        self.wait_timeout_sec = wait_timeout_sec
+        self.poll_interval_sec = poll_interval_sec
+        self._local = LRUCache(maxsize=local_size)
+        self._events: dict[str, asyncio.Event] = {}
+
+        if not redis_client:
+            logger.warning(
+                "Redis is disabled, idempotence keys are deduplicated per worker only"
+            )
+
+    def make_key(self, scope: str, user_id, idempotence_key) -> str:
+        return f"{self.key_prefix}:{scope}:{user_id}:{idempotence_key}"
+
+    async def acquire(self, key: str, fingerprint: str) -> Optional[bytes]:
+        """
+        Returns the stored response if the request is done already, otherwise marks
+        it in progress and returns None, so the caller must complete or release it.
+        Raises IdempotenceKeyReusedError if the response is of another request.
+        """
+        deadline = time.monotonic() + self.wait_timeout_sec
+
+        while True:
+            value = await self._set_in_progress(key)
+
+            if value is None:
+                return None
+
+            if value != IN_PROGRESS:
+                stored_fingerprint, _, response = value.partition(b":")
+
+                if stored_fingerprint != fingerprint.encode():
+                    raise IdempotenceKeyReusedError
+
+                return response
+
+            timeout = deadline - time.monotonic()
+
+            if timeout <= 0:
+                raise RequestInProgressError
+
+            await self._wait(key, timeout)
+
+    async def complete(self, key: str, fingerprint: str, response: bytes) -> None:
+        response = fingerprint.encode() + b":" + response
+
+        if not redis_client:
+            self._local.set(key, response, ttl_sec=self.response_ttl_sec)
+            self._notify(key)
+            return
+
+        try:
+            await redis_client.set(key, response, ex=self.response_ttl_sec)
+        except RedisError:
+            logger.exception("Failed to store response of %s", key)
+
+    async def release(self, key: str) -> None:
+        if not redis_client:
+            self._local.pop(key)
+            self._notify(key)
+            return
+
+        try:
+            await redis_client.delete(key)
+        except RedisError:
+            logger.exception("Failed to release %s", key)
+
+    async def _set_in_progress(self, key: str) -> Optional[bytes]:
+        """Returns None if marked the key, otherwise its current value."""
+        if not redis_client:
+            value = self._local.get(key)
+
+            if value is not None:
+                return value
+
+            self._local.set(key, IN_PROGRESS, ttl_sec=self.in_progress_ttl_sec)
+            self._events.setdefault(key, asyncio.Event())
+            return None
+
+        try:
+            if await redis_client.set(
+                key, IN_PROGRESS, ex=self.in_progress_ttl_sec, nx=True
+            ):
+                return None
+
+            # the key might expire between the calls, then it's marked next time
+            return await redis_client.get(key) or IN_PROGRESS
+        except RedisError:
+            # it's better to handle a duplicate than to fail the request
+            logger.exception("Failed to mark %s in progress", key)
+            return None
+
+    async def _wait(self, key: str, timeout: float) -> None:
+        event = self._events.get(key) if not redis_client else None
+
+        if event is None:
+            await asyncio.sleep(min(self.poll_interval_sec, timeout))
+            return
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify(self, key: str) -> None:
+        event = self._events.pop(key, None)
+
+        if event is not None:
+            event.set()
+
+
+idempotency_store = IdempotencyStore(
+    in_progress_ttl_sec=settings.IDEMPOTENCY.IN_PROGRESS_TTL_SEC,
+    response_ttl_sec=settings.IDEMPOTENCY.RESPONSE_TTL_SEC,
+    wait_timeout_sec=settings.IDEMPOTENCY.WAIT_TIMEOUT_SEC,
+    poll_interval_sec=settings.IDEMPOTENCY.POLL_INTERVAL_SEC,
+    local_size=settings.IDEMPOTENCY.LOCAL_SIZE,
+)
+
+
+def idempotent(scope: str) -> Callable:
+    """
+    Makes the endpoint idempotent by its idempotence_key header per user, which
+    are taken from idempotence_key and payload_data endpoint params. Only
+    successful responses are stored, errors release the key so the request can
+    be retried. The db_session param is committed before the response is stored.
+
+    The key can't be reused with other path and body params, which are all the
+    params except idempotence_key and dependencies.
+    """
+
+    def decorator(endpoint: Callable[..., Awaitable[Any]]) -> Callable:
+        request_params = [
+            name
+            for name, param in inspect.signature(endpoint).parameters.items()
+            if name != "idempotence_key"
+            and not isinstance(param.default, params.Depends)
+        ]
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs) -> Any:
+            key = idempotency_store.make_key(
+                scope, kwargs["payload_data"].user_id, kwargs["idempotence_key"]
+            )
+            fingerprint = hashlib.sha256(
+                orjson.dumps(
+                    jsonable_encoder({name: kwargs[name] for name in request_params}),
+                    option=orjson.OPT_SORT_KEYS,
+                )
+            ).hexdigest()
+
+            try:
+                response = await idempotency_store.acquire(key, fingerprint)
+            except RequestInProgressError:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=REQUEST_IN_PROGRESS,
+                )
+            except IdempotenceKeyReusedError:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=IDEMPOTENCE_KEY_REUSED,
+                )
+
+            if response is not None:
+                return orjson.loads(response)
+
+            try:
+                result = await endpoint(*args, **kwargs)
+
+                if "db_session" in kwargs:
+                    await kwargs["db_session"].commit()
+            except BaseException:
+                await idempotency_store.release(key)
+                raise
+
+            await idempotency_store.complete(
+                key, fingerprint, orjson.dumps(jsonable_encoder(result))
+            )
+
+            return result
+
+        return wrapper
+
+    return decorator
@@ -2,10 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies.database import get_db
+from app.api.dependencies.database import get_db, get_user_read_db
 from app.api.internal.v1.schemas import UserFilmOutputSchema
 from app.api.schemas import ErrorSchema
 from app.api.errors import USER_FILM_NOT_FOUND
+from app.cache import user_film_cache
+from app.database import recent_writes
 from app.models import UserFilm, ObjectDoesNotExistError
 
 router = APIRouter()
@@ -32,6 +34,9 @@ async def mark_as_watched(
             detail=USER_FILM_NOT_FOUND,
         )
 
+    await recent_writes.mark(user_id)
+    await user_film_cache.invalidate(user_id, film_id)
+
     return UserFilmOutputSchema.from_orm(user_film)
 
 
@@ -44,8 +49,13 @@ async def mark_as_watched(
     description="Retrieve user film.",
 )
 async def retrieve(
-    user_id: UUID4, film_id: UUID4, db_session: AsyncSession = Depends(get_db)
+    user_id: UUID4, film_id: UUID4, db_session: AsyncSession = Depends(get_user_read_db)
 ):
+    cached = await user_film_cache.get(user_id, film_id)
+
+    if cached is not None:
+        return UserFilmOutputSchema(**cached)
+
     try:
         user_film = await UserFilm.get(
             session=db_session, user_id=user_id, film_id=film_id
@@ -56,4 +66,7 @@ async def retrieve(
             detail=USER_FILM_NOT_FOUND,
         )
 
-    return UserFilmOutputSchema.from_orm(user_film)
+    user_film_data = UserFilmOutputSchema.from_orm(user_film)
+    await user_film_cache.set(user_id, film_id, user_film_data.dict())
+
+    return user_film_data
@@ -0,0 +1,226 @@
+import base64
+import binascii
+import decimal
+import enum
+import hashlib
+from datetime import datetime
+from logging import getLogger
+from typing import Any, Generic, Optional, Sequence, TypeVar
+from uuid import UUID
+
+import orjson
+import sqlalchemy as sa
+from fastapi import Query
+from fastapi_pagination.api import create_page, resolve_params
+from fastapi_pagination.bases import AbstractPage, AbstractParams
+from fastapi_pagination.ext.sqlalchemy import paginate_query
+from pydantic import BaseModel
+from pydantic.generics import GenericModel
+from redis import RedisError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import ClauseElement, Executable, Select
+
+from app.cache import LRUCache
+from app.redis import redis_client
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(Exception):
+    """Raise it if cursor token can't be decoded."""
+
+
+class CursorParams(BaseModel):
+    limit: int = Query(50, ge=1, le=100, description="Page size limit")
+    cursor: Optional[str] = Query(None, description="Cursor of the next page")
+
+
+class CursorPage(GenericModel, Generic[T]):
+    items: Sequence[T]
+    limit: int
+    next_cursor: Optional[str]
+
+
+def encode_cursor(value: Any, id_: UUID) -> str:
+    return base64.urlsafe_b64encode(
+        orjson.dumps([value, str(id_)], default=str)
+    ).decode()
+
+
+def decode_cursor(cursor: str, column: sa.Column) -> tuple[Any, UUID]:
+    try:
+        value, id_ = orjson.loads(base64.urlsafe_b64decode(cursor))
+        if not isinstance(id_, str):
+            raise InvalidCursorError
+        python_type = column.type.python_type
+        if python_type is datetime:
+            value = datetime.fromisoformat(value)
+        else:
+            value = python_type(value)
+        return value, UUID(id_)
+    except (binascii.Error, decimal.InvalidOperation, ValueError, TypeError) as err:
+        raise InvalidCursorError from err
+
+
+async def paginate_by_cursor(
+    session: AsyncSession,
+    query: Select,
+    model,
+    params: CursorParams,
+    order_by: Optional[sa.Column] = None,
+    descending: bool = True,
+) -> CursorPage:
+    """
+    Paginates query by the keyset of (order_by, id), by default (created_at, id)
+    starting from the newest rows. Doesn't count total rows, so every page costs
+    a single index range scan.
+    """
+    if order_by is None:
+        order_by = model.created_at
+
+    if descending:
+        query = query.order_by(order_by.desc(), model.id.desc())
+    else:
+        query = query.order_by(order_by.asc(), model.id.asc())
+
+    if params.cursor:
+        keyset = sa.tuple_(order_by, model.id)
+        value = decode_cursor(params.cursor, order_by)
+        query = query.where(keyset < value if descending else keyset > value)
+
+    result = await session.execute(query.limit(params.limit + 1))
+    items = result.scalars().unique().all()
+
+    next_cursor = None
+
+    if len(items) > params.limit:
+        items = items[: params.limit]
+        next_cursor = encode_cursor(getattr(items[-1], order_by.key), items[-1].id)
+
+    return CursorPage(items=items, limit=params.limit, next_cursor=next_cursor)
+
+
+class CountStrategyEnum(str, enum.Enum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    CACHED = "cached"
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kwargs)}"
+
+
+class CountCache:
+    """
+    Keeps exact totals of queries for a short time, so paging through the same
+    filters doesn't count the table on every page. Shared between workers through
+    redis if it is enabled, otherwise the latest local_size totals are kept in
+    process.
+    """
+
+    key_prefix = "count"
+
+    def __init__(self, ttl_sec: int, local_size: int) -> None:
+        self.ttl_sec = ttl_sec
+        self._local = LRUCache(maxsize=local_size)
+
+    async def get(self, signature: str) -> Optional[int]:
+        if not redis_client:
+            return self._local.get(signature)
+
+        try:
+            total = await redis_client.get(self._make_key(signature))
+        except RedisError:
+            logger.exception("Failed to get cached count %s", signature)
+            return None
+
+        return int(total) if total is not None else None
+
+    async def set(self, signature: str, total: int) -> None:
+        if not redis_client:
+            self._local.set(signature, total, ttl_sec=self.ttl_sec)
+            return
+
+        try:
+            await redis_client.set(self._make_key(signature), total, ex=self.ttl_sec)
+        except RedisError:
+            logger.exception("Failed to cache count %s", signature)
+
+    def _make_key(self, signature: str) -> str:
+        return f"{self.key_prefix}:{signature}"
+
+
+count_cache = CountCache(
+    ttl_sec=settings.PAGINATION.COUNT_CACHE_TTL_SEC,
+    local_size=settings.PAGINATION.COUNT_CACHE_LOCAL_SIZE,
+)
+
+
+def query_signature(query: Select) -> str:
+    compiled = query.compile(dialect=postgresql.dialect())
+    params = sorted((key, repr(value)) for key, value in compiled.params.items())
+    return hashlib.sha256(f"{compiled}{params}".encode()).hexdigest()
+
+
+async def count_exact(session: AsyncSession, query: Select) -> int:
+    return await session.scalar(
+        sa.select(sa.func.count()).select_from(query.order_by(None).subquery())
+    )
+
+
+async def count_estimated(session: AsyncSession, query: Select) -> int:
+    """
+    Returns the planner row estimate of the query. It comes from table statistics
+    and may be off by a lot for selective filters, but costs no table access.
+    """
+    result = await session.execute(Explain(query.order_by(None)))
+    return int(result.scalar()[0]["Plan"]["Plan Rows"])
+
+
+async def count_cached(session: AsyncSession, query: Select) -> int:
+    signature = query_signature(query.order_by(None))
+    total = await count_cache.get(signature)
+
+    if total is None:
+        total = await count_exact(session, query)
+        await count_cache.set(signature, total)
+
+    return total
+
+
+COUNTERS = {
+    CountStrategyEnum.EXACT: count_exact,
+    CountStrategyEnum.ESTIMATED: count_estimated,
+    CountStrategyEnum.CACHED: count_cached,
+}
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    params: Optional[AbstractParams] = None,
+    count_strategy: CountStrategyEnum = CountStrategyEnum.EXACT,
+) -> AbstractPage:
+    """
+    Same as ``fastapi_pagination.ext.async_sqlalchemy.paginate``, but the total is
+    calculated with the given strategy instead of always counting every row.
+    """
+    params = resolve_params(params)
+
+    total = await COUNTERS[count_strategy](session, query)
+    items = await session.execute(paginate_query(query, params))
+
+    return create_page(items.scalars().unique().all(), total, params)
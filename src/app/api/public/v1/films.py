@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.dependencies.auth import decode_jwt
 from app.api.dependencies.database import get_db
 from app.api.errors import ASYNC_API_SERVICE_ERROR, YOOKASSA_SERVICE_ERROR
+from app.api.idempotency import idempotent
 from app.api.public.v1.schemas import PurchaseResponseSchema, PurchaseRequestSchema
 from app.security import TokenData
 from app.services.payments.exceptions import (
@@ -22,6 +23,7 @@ router = APIRouter()
     response_model=PurchaseResponseSchema,
     description="Handle purchase request.",
 )
+@idempotent("purchase")
 async def purchase(
     film_id: str,
     body: PurchaseRequestSchema,
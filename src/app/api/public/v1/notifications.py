@@ -1,16 +1,25 @@
 import logging
+from typing import Union
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from starlette import status
 
 from app.api.dependencies.database import get_db
 from app.api.errors import YOOKASSA_SERVICE_ERROR
-from app.api.public.v1.schemas import PaymentNotificationSchema
+from app.api.public.v1.schemas import PaymentNotificationSchema, PaymentObjectSchema
+from app.cache import user_film_cache
+from app.database import recent_writes
 from app.integrations.yookassa.client import yookassa_client
 from app.integrations.yookassa.exceptions import YookassaHttpClientError
-from app.integrations.yookassa.schemas import StatusEnum
-from app.models import Transaction, ObjectDoesNotExistError
+from app.integrations.yookassa.schemas import YookassaRefundResponseSchema
+from app.models import (
+    ObjectDoesNotExistError,
+    RevenueAggregate,
+    Transaction,
+    TransactionExtId,
+)
 
 router = APIRouter()
 logger = logging.getLogger("notification")
@@ -20,8 +29,16 @@ logger = logging.getLogger("notification")
 async def on_after_payment(
     payment_data: PaymentNotificationSchema, db_session: AsyncSession = Depends(get_db)
 ):
+    is_refund = payment_data.event.startswith("refund.")
+    transaction_data: Union[PaymentObjectSchema, YookassaRefundResponseSchema]
+
     try:
-        transaction_data = await yookassa_client.get_transaction(payment_data.object.id)
+        if is_refund:
+            transaction_data = await yookassa_client.get_refund(payment_data.object.id)
+        else:
+            transaction_data = await yookassa_client.get_transaction(
+                payment_data.object.id
+            )
     except YookassaHttpClientError:
         raise HTTPException(
             status_code=status.HTTP_424_FAILED_DEPENDENCY,
@@ -29,14 +46,35 @@ async def on_after_payment(
         )
 
     try:
-        transaction = await Transaction.get(db_session, ext_id=payment_data.object.id)
+        transaction = await Transaction.get(
+            db_session,
+            ext_id=payment_data.object.id,
+            created_at=TransactionExtId.created_at_of(payment_data.object.id),
+            profile=Transaction.LoadProfileEnum.WITH_USER_FILM,
+        )
     except ObjectDoesNotExistError:
         logger.exception(
             "Unknown transaction `id` received: %s", payment_data.object.id
         )
         return
 
-    transaction.status = Transaction.StatusEnum(transaction_data.status.upper())
+    new_status = Transaction.StatusEnum(transaction_data.status.upper())
+    # duplicate notifications come concurrently, the transition happens once
+    transition = await Transaction.set_status(
+        db_session, new_status, id=transaction.id, created_at=transaction.created_at
+    )
+    set_committed_value(transaction, "status", new_status)
+
+    if transition and new_status == Transaction.StatusEnum.SUCCEEDED:
+        if transaction.film_id is None and transaction.user_film:
+            transaction.film_id = transaction.user_film.film_id
 
-    if transaction_data.status == StatusEnum.SUCCEEDED:
+        await RevenueAggregate.add(db_session, transaction)
+
+    if not is_refund and new_status == Transaction.StatusEnum.SUCCEEDED:
         transaction.user_film.is_active = True
+        await user_film_cache.invalidate(
+            transaction.user_id, transaction.user_film.film_id
+        )
+
+    await recent_writes.mark(transaction.user_id)
@@ -9,7 +9,8 @@ from pydantic import UUID4
 class PaymentObjectSchema(ORJSONModel):
     id: UUID
     status: str
-    paid: bool
+    # refund objects have no paid flag
+    paid: Optional[bool] = None
 
 
 class PaymentNotificationSchema(ORJSONModel):
@@ -6,7 +6,7 @@ from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies.auth import decode_jwt
-from app.api.dependencies.database import get_db
+from app.api.dependencies.database import get_db, get_current_user_read_db
 from app.api.errors import (
     TRANSACTION_NOT_FOUND,
     PERMISSION_DENIED,
@@ -15,6 +15,14 @@ from app.api.errors import (
     USER_FILM_ALREADY_WATCHED,
     REFUND_ERROR,
     YOOKASSA_SERVICE_ERROR,
+    INVALID_CURSOR,
+)
+from app.api.idempotency import idempotent
+from app.api.pagination import (
+    CursorPage,
+    CursorParams,
+    InvalidCursorError,
+    paginate_by_cursor,
 )
 from app.api.public.v1.schemas import TransactionSchema
 from app.api.schemas import ErrorSchema
@@ -41,10 +49,12 @@ router = APIRouter()
         status.HTTP_403_FORBIDDEN: {"model": ErrorSchema},
         status.HTTP_404_NOT_FOUND: {"model": ErrorSchema},
         status.HTTP_400_BAD_REQUEST: {"model": ErrorSchema},
+        status.HTTP_409_CONFLICT: {"model": ErrorSchema},
         status.HTTP_424_FAILED_DEPENDENCY: {"model": ErrorSchema},
     },
     description="Handle refund request.",
 )
+@idempotent("refund")
 async def refund(
     transaction_id: UUID4,
     idempotence_key: UUID4 = Header(),
@@ -106,18 +116,50 @@ async def refund(
 @router.get(
     "",
     response_model=LimitOffsetPage[TransactionSchema],
-    description="Get list of user transactions",
+    description="Get list of user transactions. Use cursor pagination instead.",
+    deprecated=True,
 )
 async def get_list(
-    db_session: AsyncSession = Depends(get_db),
+    db_session: AsyncSession = Depends(get_current_user_read_db),
     jwt_payload: TokenData = Depends(decode_jwt),
 ):
     return await paginate(
         db_session,
-        sa.select(Transaction).where(Transaction.user_id == jwt_payload.user_id),
+        sa.select(Transaction)
+        .where(Transaction.user_id == jwt_payload.user_id)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .options(*Transaction.load_options(Transaction.LoadProfileEnum.FULL)),
     )
 
 
+@router.get(
+    "/cursor",
+    response_model=CursorPage[TransactionSchema],
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": ErrorSchema},
+    },
+    description="Get list of user transactions paginated by cursor",
+)
+async def get_list_by_cursor(
+    params: CursorParams = Depends(),
+    db_session: AsyncSession = Depends(get_current_user_read_db),
+    jwt_payload: TokenData = Depends(decode_jwt),
+):
+    try:
+        return await paginate_by_cursor(
+            db_session,
+            sa.select(Transaction)
+            .where(Transaction.user_id == jwt_payload.user_id)
+            .options(*Transaction.load_options(Transaction.LoadProfileEnum.FULL)),
+            Transaction,
+            params,
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_CURSOR
+        )
+
+
 @router.get(
     "/{transaction_id}",
     responses={
@@ -128,12 +170,16 @@ async def get_list(
 )
 async def retrieve(
     transaction_id: UUID4,
-    db_session: AsyncSession = Depends(get_db),
+    db_session: AsyncSession = Depends(get_current_user_read_db),
     jwt_payload: TokenData = Depends(decode_jwt),
 ):
     try:
         transaction = await Transaction.get(
-            db_session, id=transaction_id, user_id=jwt_payload.user_id
+            db_session,
+            id=transaction_id,
+            user_id=jwt_payload.user_id,
+            profile=Transaction.LoadProfileEnum.FULL,
+            with_archived=True,
         )
     except ObjectDoesNotExistError:
         raise HTTPException(
@@ -31,10 +31,16 @@ router = APIRouter()
 )
 async def retrieve(
     transaction_id: UUID4,
+    # it's requested by the return url right after the payment, replicas may lag
     db_session: AsyncSession = Depends(get_db),
 ):
     try:
-        transaction = await Transaction.get(db_session, id=transaction_id)
+        transaction = await Transaction.get(
+            db_session,
+            id=transaction_id,
+            profile=Transaction.LoadProfileEnum.FULL,
+            with_archived=True,
+        )
     except ObjectDoesNotExistError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=TRANSACTION_NOT_FOUND
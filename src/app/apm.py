@@ -3,9 +3,62 @@ from typing import Optional, Callable
 
 import elasticapm
 from elasticapm.contrib.starlette import make_apm_client, ElasticAPM
+from elasticapm.metrics.base_metrics import MetricsSet
 from fastapi import FastAPI
 
+from app.database import engines
 from app.settings import settings
+from app.transports import AiohttpTransport
+
+METRICS_SETS = [
+    "elasticapm.metrics.sets.cpu.CPUMetricSet",
+    "app.apm.DatabasePoolMetricSet",
+    "app.apm.HttpTransportMetricSet",
+]
+
+
+class DatabasePoolMetricSet(MetricsSet):
+    def before_collect(self) -> None:
+        for name, engine in engines.items():
+            pool = engine.pool
+            stats = pool.pop_stats()
+            labels = {"pool": name}
+
+            self.gauge("db.pool.size", **labels).val = pool.size()
+            self.gauge("db.pool.checked_out", **labels).val = pool.checkedout()
+            # overflow counter is negative until the pool is filled up to its size
+            self.gauge("db.pool.overflow", **labels).val = max(pool.overflow(), 0)
+            self.timer(
+                "db.pool.checkout_wait", reset_on_collect=True, unit="us", **labels
+            ).update(int(stats["checkout_wait_sec"] * 1_000_000), stats["checkouts"])
+            self.timer(
+                "db.pool.connect", reset_on_collect=True, unit="us", **labels
+            ).update(int(stats["connect_sec"] * 1_000_000), stats["connects"])
+
+
+class HttpTransportMetricSet(MetricsSet):
+    def before_collect(self) -> None:
+        for transport in AiohttpTransport.instances:
+            stats = transport.connection_stats.pop()
+            connections = stats["created"] + stats["reused"]
+            labels = {"upstream": transport.name}
+
+            self.gauge("http.connections.created", **labels).val = stats["created"]
+            self.gauge("http.connections.reused", **labels).val = stats["reused"]
+            # share of requests served by warm connections
+            self.gauge("http.connections.reuse_ratio", **labels).val = (
+                stats["reused"] / connections if connections else 0
+            )
+            self.gauge("http.dns_cache.hits", **labels).val = stats["dns_cache_hits"]
+            self.gauge("http.dns_cache.misses", **labels).val = stats[
+                "dns_cache_misses"
+            ]
+            self.gauge("http.timeouts", **labels).val = stats["timeouts"]
+
+            if transport.retry_budget:
+                retries, denied = transport.retry_budget.pop()
+                self.gauge("http.retries", **labels).val = retries
+                self.gauge("http.retries.denied", **labels).val = denied
 
 
 def init_apm(app: FastAPI):
@@ -17,6 +70,7 @@ def init_apm(app: FastAPI):
         server_url=settings.APM.SERVER_URL,
         service_name=settings.APM.SERVICE_NAME,
         environment=settings.APM.ENVIRONMENT,
+        metrics_sets=METRICS_SETS,
     )
     app.add_middleware(ElasticAPM, client=apm)
 
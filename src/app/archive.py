@@ -0,0 +1,69 @@
+import asyncio
+import gzip
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from app.settings import settings
+
+
+class ArchiveStorage:
+    """
+    Keeps archived rows on local disk. Every batch is a directory with a gzipped
+    NDJSON file per table, one flat row per line, so files can be loaded as is by
+    columnar tools. Batches are written to a temporary directory and renamed, so a
+    batch is either complete or absent.
+    """
+
+    suffix = ".ndjson.gz"
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    async def write_batch(self, tables: dict[str, list[dict[str, Any]]]) -> str:
+        """Writes rows by table name, returns the batch path relative to root."""
+        return await asyncio.to_thread(self._write_batch, tables)
+
+    async def read_batch(self, path: str) -> dict[str, list[dict[str, Any]]]:
+        return await asyncio.to_thread(self._read_batch, path)
+
+    def _write_batch(self, tables: dict[str, list[dict[str, Any]]]) -> str:
+        path = Path(datetime.utcnow().strftime("%Y/%m"), uuid.uuid4().hex)
+        tmp_dir = self.root / path.parent / f".{path.name}.tmp"
+        tmp_dir.mkdir(parents=True)
+
+        try:
+            for table, rows in tables.items():
+                with open(tmp_dir / f"{table}{self.suffix}", "wb") as raw_file:
+                    with gzip.GzipFile(fileobj=raw_file, mode="wb") as file:
+                        for row in rows:
+                            file.write(orjson.dumps(row, default=str) + b"\n")
+
+                    raw_file.flush()
+                    os.fsync(raw_file.fileno())
+
+            os.replace(tmp_dir, self.root / path)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        return str(path)
+
+    def _read_batch(self, path: str) -> dict[str, list[dict[str, Any]]]:
+        tables = {}
+
+        for file_path in (self.root / path).glob(f"*{self.suffix}"):
+            with gzip.open(file_path, "rb") as file:
+                tables[file_path.name[: -len(self.suffix)]] = [
+                    orjson.loads(line) for line in file
+                ]
+
+        return tables
+
+
+archive_storage = ArchiveStorage(settings.ARCHIVE.DIR)
@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+from logging import getLogger
+from typing import Any, Hashable, Optional
+
+import orjson
+from redis import RedisError
+
+from app.redis import redis_client
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+TOMBSTONE = b""
+
+
+class LRUCache:
+    """
+    In-process cache of a bounded size. Evicts the least recently used entry when
+    full, and entries set with a ttl are dropped once they expire.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[Optional[float], Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_sec: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.time() + ttl_sec if ttl_sec is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class UserFilmCache:
+    """
+    Keeps user films access state for playback checks in redis. Writes invalidate
+    entries by a tombstone kept for hold_sec instead of deleting them, so a
+    concurrent read of not yet committed state can't put the old state back.
+    Invalidation must reach all workers at once, so the state is never cached in
+    process: the cache is off if redis is disabled.
+    """
+
+    key_prefix = "user-film"
+
+    def __init__(self, ttl_sec: int, hold_sec: int) -> None:
+        self.ttl_sec = ttl_sec
+        self.hold_sec = hold_sec
+
+        if not redis_client:
+            logger.warning("Redis is disabled, user films access is not cached")
+
+    async def get(self, user_id, film_id) -> Optional[dict[str, Any]]:
+        if not redis_client:
+            return None
+
+        key = self._make_key(user_id, film_id)
+
+        try:
+            value = await redis_client.get(key)
+        except RedisError:
+            logger.exception("Failed to get cached user film %s", key)
+            return None
+
+        return orjson.loads(value) if value else None
+
+    async def set(self, user_id, film_id, data: dict[str, Any]) -> None:
+        """Caches data unless the entry exists, tombstones included."""
+        if not redis_client:
+            return
+
+        key = self._make_key(user_id, film_id)
+
+        try:
+            await redis_client.set(
+                key, orjson.dumps(data, default=str), ex=self.ttl_sec, nx=True
+            )
+        except RedisError:
+            logger.exception("Failed to cache user film %s", key)
+
+    async def invalidate(self, user_id, film_id) -> None:
+        if not redis_client:
+            return
+
+        key = self._make_key(user_id, film_id)
+
+        try:
+            await redis_client.set(key, TOMBSTONE, ex=self.hold_sec)
+        except RedisError:
+            logger.exception("Failed to invalidate cached user film %s", key)
+
+    def _make_key(self, user_id, film_id) -> str:
+        return f"{self.key_prefix}:{user_id}:{film_id}"
+
+
+user_film_cache = UserFilmCache(
+    ttl_sec=settings.USERS_FILMS_CACHE.TTL_SEC,
+    hold_sec=settings.USERS_FILMS_CACHE.INVALIDATION_HOLD_SEC,
+)
@@ -0,0 +1,185 @@
+import enum
+import time
+from logging import getLogger
+
+from redis import RedisError
+
+from app.redis import redis_client
+
+logger = getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raise it if calls to the upstream are not allowed now."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream which keeps failing. The circuit opens after
+    failure_threshold failures within failure_window_sec, and then calls fail fast
+    for recovery_sec. After that the circuit is half-open: a single trial call is
+    let through, its success closes the circuit and its failure opens it again.
+    State is shared between workers through redis if it is enabled, otherwise
+    kept in process.
+    """
+
+    key_prefix = "circuit"
+
+    class StateEnum(str, enum.Enum):
+        CLOSED = "closed"
+        OPEN = "open"
+        HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        failure_window_sec: float,
+        recovery_sec: float,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window_sec = failure_window_sec
+        self.recovery_sec = recovery_sec
+        self.reset()
+
+    def reset(self) -> None:
+        """Closes the circuit kept in process."""
+        self._state = self.StateEnum.CLOSED
+        self._failures: list[float] = []
+        self._open_until = 0.0
+        self._trial_until = 0.0
+
+    async def allow(self) -> bool:
+        """
+        Raises CircuitOpenError if the call is not allowed. Returns True if the
+        call is the trial of a half-open circuit.
+        """
+        if not redis_client:
+            return self._allow_local()
+
+        try:
+            is_open, is_tripped = await redis_client.mget(
+                self._make_key("open"), self._make_key("tripped")
+            )
+
+            if is_open:
+                raise CircuitOpenError(self.name)
+
+            if not is_tripped:
+                return False
+
+            # let the trial call run as long as the circuit would stay open
+            if await redis_client.set(
+                self._make_key("trial"), 1, ex=self._ex(self.recovery_sec), nx=True
+            ):
+                return True
+        except RedisError:
+            # it's better to call the upstream than to fail without knowing
+            logger.exception("Failed to get state of circuit %s", self.name)
+            return False
+
+        raise CircuitOpenError(self.name)
+
+    async def record_success(self, trial: bool) -> None:
+        if not redis_client:
+            if trial:
+                self.reset()
+            return
+
+        if not trial:
+            return
+
+        try:
+            await redis_client.delete(
+                self._make_key("tripped"),
+                self._make_key("trial"),
+                self._make_key("failures"),
+            )
+        except RedisError:
+            logger.exception("Failed to close circuit %s", self.name)
+
+        logger.info("Circuit %s closed", self.name)
+
+    async def record_failure(self, trial: bool) -> None:
+        if not redis_client:
+            self._record_failure_local(trial)
+            return
+
+        try:
+            if not trial:
+                failures_key = self._make_key("failures")
+
+                # the window starts with the first failure, and the counter can't
+                # be left without expiry if the worker dies between the commands
+                async with redis_client.pipeline(transaction=True) as pipe:
+                    pipe.set(
+                        failures_key, 0, ex=self._ex(self.failure_window_sec), nx=True
+                    )
+                    pipe.incr(failures_key)
+                    _, failures = await pipe.execute()
+
+                if failures < self.failure_threshold:
+                    return
+
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.set(self._make_key("open"), 1, ex=self._ex(self.recovery_sec))
+                # half-open state lasts until a trial call succeeds
+                pipe.set(self._make_key("tripped"), 1)
+                pipe.delete(self._make_key("trial"), self._make_key("failures"))
+                await pipe.execute()
+        except RedisError:
+            logger.exception("Failed to record failure of circuit %s", self.name)
+            return
+
+        logger.warning("Circuit %s opened", self.name)
+
+    @property
+    def state(self) -> StateEnum:
+        """State of the circuit kept in process."""
+        if self._state == self.StateEnum.OPEN and self._open_until <= time.monotonic():
+            return self.StateEnum.HALF_OPEN
+
+        return self._state
+
+    def _allow_local(self) -> bool:
+        state = self.state
+
+        if state == self.StateEnum.CLOSED:
+            return False
+
+        now = time.monotonic()
+
+        if state == self.StateEnum.HALF_OPEN and self._trial_until <= now:
+            self._state = self.StateEnum.HALF_OPEN
+            self._trial_until = now + self.recovery_sec
+            return True
+
+        raise CircuitOpenError(self.name)
+
+    def _record_failure_local(self, trial: bool) -> None:
+        now = time.monotonic()
+
+        if not trial:
+            self._failures = [
+                failed_at
+                for failed_at in self._failures
+                if failed_at > now - self.failure_window_sec
+            ]
+            self._failures.append(now)
+
+            if len(self._failures) < self.failure_threshold:
+                return
+
+        self._state = self.StateEnum.OPEN
+        self._open_until = now + self.recovery_sec
+        self._trial_until = 0.0
+        self._failures = []
+        logger.warning("Circuit %s opened", self.name)
+
+    @staticmethod
+    def _ex(seconds: float) -> int:
+        return max(int(seconds), 1)
+
+    def _make_key(self, name: str) -> str:
+        return f"{self.key_prefix}:{self.name}:{name}"
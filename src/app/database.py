@@ -1,14 +1,214 @@
+import itertools
+import threading
+import time
 from contextlib import asynccontextmanager
+from logging import getLogger
+from typing import Optional, Union
+from uuid import UUID
 
+from redis import RedisError
 from sqlalchemy import MetaData
 from sqlalchemy.ext import asyncio as sa_asyncio
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from app.cache import LRUCache
+from app.redis import redis_client
 from app.settings import settings
 
+logger = getLogger(__name__)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool which accumulates the time spent waiting for a free connection,
+    and separately the time spent opening new connections.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkout_wait_sec = 0.0
+        self.checkouts = 0
+        self.connect_sec = 0.0
+        self.connects = 0
+        self._stats_lock = threading.Lock()
+
+    def _create_connection(self):
+        started_at = time.perf_counter()
+        record = super()._create_connection()
+        # taken by the checkout which has created the connection
+        record.info["connect_sec"] = time.perf_counter() - started_at
+
+        return record
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        record = None
+
+        try:
+            record = super()._do_get()
+            return record
+        finally:
+            elapsed_sec = time.perf_counter() - started_at
+            connect_sec = record.info.pop("connect_sec", None) if record else None
+
+            with self._stats_lock:
+                self.checkout_wait_sec += elapsed_sec - (connect_sec or 0.0)
+                self.checkouts += 1
+
+                if connect_sec is not None:
+                    self.connect_sec += connect_sec
+                    self.connects += 1
+
+    def pop_stats(self) -> dict[str, Union[float, int]]:
+        """
+        Returns total checkout wait and connect time with their counts since last
+        call.
+        """
+        with self._stats_lock:
+            stats = {
+                "checkout_wait_sec": self.checkout_wait_sec,
+                "checkouts": self.checkouts,
+                "connect_sec": self.connect_sec,
+                "connects": self.connects,
+            }
+            self.checkout_wait_sec, self.checkouts = 0.0, 0
+            self.connect_sec, self.connects = 0.0, 0
+
+        return stats
+
+
+class ReplicasRouter:
+    """
+    Spreads reads over replicas in round-robin. A replica which failed to give a
+    connection is skipped for retry_after_sec.
+    """
+
+    def __init__(
+        self, engines: list[sa_asyncio.AsyncEngine], retry_after_sec: int
+    ) -> None:
+        self.engines = engines
+        self.retry_after_sec = retry_after_sec
+        self._engines_cycle = itertools.cycle(engines)
+        self._unhealthy_until: dict[sa_asyncio.AsyncEngine, float] = {}
+
+    def is_healthy(self, engine: sa_asyncio.AsyncEngine) -> bool:
+        return self._unhealthy_until.get(engine, 0) <= time.monotonic()
+
+    def mark_unhealthy(self, engine: sa_asyncio.AsyncEngine) -> None:
+        self._unhealthy_until[engine] = time.monotonic() + self.retry_after_sec
+
+    async def get_session(
+        self, isolation_level: Optional[str] = None
+    ) -> Optional[sa_asyncio.AsyncSession]:
+        """Returns session connected to a healthy replica if there is one."""
+        for _ in range(len(self.engines)):
+            engine = next(self._engines_cycle)
+
+            if not self.is_healthy(engine):
+                continue
+
+            if isolation_level:
+                session = Session(
+                    bind=engine.execution_options(isolation_level=isolation_level)
+                )
+            else:
+                session = Session(bind=engine)
+
+            try:
+                await session.connection()
+            except Exception:
+                logger.warning("Replica %s is unavailable", engine.url, exc_info=True)
+                self.mark_unhealthy(engine)
+                await session.close()
+                continue
+
+            return session
+
+        return None
+
+
+class RecentWritesRegistry:
+    """
+    Remembers users who have written recently, so their reads are served by the
+    primary until replicas catch up. Shared between workers through redis if it is
+    enabled, otherwise kept in process.
+    """
+
+    key_prefix = "recent-write"
+
+    def __init__(self, ttl_sec: int, local_size: int) -> None:
+        self.ttl_sec = ttl_sec
+        self._local = LRUCache(maxsize=local_size)
+
+    async def mark(self, user_id) -> None:
+        if not redis_client:
+            self._local.set(str(user_id), True, self.ttl_sec)
+            return
+
+        try:
+            await redis_client.set(self._make_key(user_id), 1, ex=self.ttl_sec)
+        except RedisError:
+            logger.exception("Failed to mark recent write of user %s", user_id)
+
+    async def is_marked(self, user_id) -> bool:
+        if not redis_client:
+            return self._local.get(str(user_id), False)
+
+        try:
+            return bool(await redis_client.exists(self._make_key(user_id)))
+        except RedisError:
+            logger.exception("Failed to check recent write of user %s", user_id)
+            # it's safer to read from the primary if we are not sure
+            return True
+
+    def _make_key(self, user_id) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+
+engine_options = dict(
+    poolclass=InstrumentedQueuePool,
+    pool_recycle=settings.DB.POOL_RECYCLE,
+    pool_size=settings.DB.POOL_SIZE,
+    max_overflow=settings.DB.POOL_MAX_OVERFLOW,
+    pool_timeout=settings.DB.POOL_TIMEOUT_SEC,
+    pool_pre_ping=settings.DB.POOL_PRE_PING,
+)
+
 engine = sa_asyncio.create_async_engine(
-    settings.DB.DSN, pool_recycle=settings.DB.POOL_RECYCLE
+    settings.DB.DSN,
+    connect_args={"command_timeout": settings.DB.COMMAND_TIMEOUT_SEC},
+    **engine_options,
+)
+# shares the pool with the primary engine
+read_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+replicas_router = ReplicasRouter(
+    [
+        sa_asyncio.create_async_engine(
+            dsn,
+            connect_args={
+                "command_timeout": settings.DB.COMMAND_TIMEOUT_SEC,
+                "timeout": settings.DB.REPLICA_CONNECT_TIMEOUT_SEC,
+            },
+            isolation_level="AUTOCOMMIT",
+            **engine_options,
+        )
+        for dsn in settings.DB.REPLICA_DSNS
+    ],
+    retry_after_sec=settings.DB.REPLICA_RETRY_AFTER_SEC,
+)
+# all engines with their own pools, to collect their metrics
+engines = {
+    "primary": engine,
+    **{
+        f"replica-{i}": replica_engine
+        for i, replica_engine in enumerate(replicas_router.engines)
+    },
+}
+recent_writes = RecentWritesRegistry(
+    ttl_sec=settings.DB.READ_YOUR_WRITES_SEC,
+    local_size=settings.DB.READ_YOUR_WRITES_LOCAL_SIZE,
 )
 Session = sessionmaker(bind=engine, class_=sa_asyncio.AsyncSession)
 metadata = MetaData(schema=settings.DB.SCHEMA)
@@ -29,3 +229,36 @@ async def session_scope():
         raise
     finally:
         await async_session.close()
+
+
+@asynccontextmanager
+async def read_session_scope(
+    user_id: Optional[Union[str, UUID]] = None, isolation_level: Optional[str] = None
+):
+    """
+    Provide a read-only scope bound to a replica. Falls back to the primary if
+    there is no healthy replica or the user has written recently.
+
+    Connection works in autocommit mode by default, so reads don't pay for BEGIN
+    and COMMIT round trips. Pass isolation_level when reads need a transaction,
+    e.g. for server-side cursors. Never write using this scope.
+    """
+
+    async_session = None
+
+    if replicas_router.engines and not (
+        user_id and await recent_writes.is_marked(user_id)
+    ):
+        async_session = await replicas_router.get_session(isolation_level)
+
+    if not async_session and isolation_level:
+        async_session = Session(
+            bind=engine.execution_options(isolation_level=isolation_level)
+        )
+    elif not async_session:
+        async_session = Session(bind=read_engine)
+
+    try:
+        yield async_session
+    finally:
+        await async_session.close()
@@ -0,0 +1,73 @@
+import time
+from contextvars import ContextVar
+from logging import getLogger
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = getLogger(__name__)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """Raise it if there is no time left to make a call."""
+
+
+def set_deadline(timeout_sec: float):
+    """Sets the deadline of the current context, returns the token to reset it."""
+    return _deadline.set(time.monotonic() + timeout_sec)
+
+
+def reset_deadline(token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Returns seconds left until the deadline, None if there is no deadline."""
+    deadline = _deadline.get()
+
+    if deadline is None:
+        return None
+
+    return deadline - time.monotonic()
+
+
+class DeadlineMiddleware:
+    """
+    Sets the deadline of every request to budget_sec, or to the timeout in seconds
+    sent by the caller in the header if it is shorter.
+    """
+
+    def __init__(self, app: ASGIApp, budget_sec: float, header: str) -> None:
+        self.app = app
+        self.budget_sec = budget_sec
+        self.header = header.lower().encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = set_deadline(self._get_timeout(scope))
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
+
+    def _get_timeout(self, scope: Scope) -> float:
+        for name, value in scope["headers"]:
+            if name != self.header:
+                continue
+
+            try:
+                timeout = float(value)
+            except ValueError:
+                logger.warning("Invalid %s header: %s", self.header, value)
+                break
+
+            if timeout > 0:
+                return min(timeout, self.budget_sec)
+
+        return self.budget_sec
@@ -0,0 +1,151 @@
+import asyncio
+import contextvars
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Awaitable, Callable, Optional
+
+import orjson
+from redis import RedisError
+
+from app.cache import LRUCache
+from app.integrations.async_api.schemas import FilmSchema
+from app.redis import redis_client
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class CachedFilm:
+    # None means the Movies API answered that the film doesn't exist
+    film: Optional[FilmSchema]
+    fresh_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
+
+    @property
+    def stale_sec(self) -> float:
+        return max(time.time() - self.fresh_until, 0)
+
+
+class FilmDetailsCache:
+    """
+    Keeps film details in two tiers: a small LRU in process, so the hot catalog is
+    served without any network hop, and redis shared between workers if it is
+    enabled. Entries stay fresh for ttl_sec, after that they are still served for
+    stale_sec while refreshed in background. Missing films are remembered for
+    negative_ttl_sec.
+    """
+
+    key_prefix = "film-details"
+
+    def __init__(
+        self,
+        ttl_sec: int,
+        stale_sec: int,
+        negative_ttl_sec: int,
+        lru_size: int,
+    ) -> None:
+        self.ttl_sec = ttl_sec
+        self.stale_sec = stale_sec
+        self.negative_ttl_sec = negative_ttl_sec
+        self._local = LRUCache(maxsize=lru_size)
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    async def get(self, film_id: str) -> Optional[CachedFilm]:
+        entry = self._local.get(film_id)
+
+        if entry is None:
+            entry = await self._get_shared(film_id)
+
+            if entry is not None:
+                self._local.set(film_id, entry, ttl_sec=self._expires_in(entry))
+
+        return entry
+
+    async def set(self, film_id: str, film: Optional[FilmSchema]) -> CachedFilm:
+        if film is None:
+            entry = CachedFilm(
+                film=None, fresh_until=time.time() + self.negative_ttl_sec
+            )
+        else:
+            entry = CachedFilm(film=film, fresh_until=time.time() + self.ttl_sec)
+
+        expires_in = self._expires_in(entry)
+        self._local.set(film_id, entry, ttl_sec=expires_in)
+
+        if redis_client:
+            value = orjson.dumps(
+                {
+                    "film": film.dict() if film is not None else None,
+                    "fresh_until": entry.fresh_until,
+                }
+            )
+
+            try:
+                await redis_client.set(
+                    self._make_key(film_id), value, ex=max(int(expires_in), 1)
+                )
+            except RedisError:
+                logger.exception("Failed to cache details of film %s", film_id)
+
+        return entry
+
+    def refresh(
+        self, film_id: str, fetch: Callable[[str], Awaitable[Optional[FilmSchema]]]
+    ) -> None:
+        """Schedules a background refresh of the film, unless one is running."""
+        if film_id in self._refreshing:
+            return
+
+        # the task must not inherit the deadline and other state of the request
+        task = contextvars.Context().run(
+            asyncio.create_task, self._refresh(film_id, fetch)
+        )
+        self._refreshing[film_id] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(film_id, None))
+
+    async def _refresh(
+        self, film_id: str, fetch: Callable[[str], Awaitable[Optional[FilmSchema]]]
+    ) -> None:
+        try:
+            await self.set(film_id, await fetch(film_id))
+        except Exception:
+            # stale entry is served until it expires, next request tries again
+            logger.exception("Failed to refresh details of film %s", film_id)
+
+    async def _get_shared(self, film_id: str) -> Optional[CachedFilm]:
+        if not redis_client:
+            return None
+
+        try:
+            value = await redis_client.get(self._make_key(film_id))
+        except RedisError:
+            logger.exception("Failed to get cached details of film %s", film_id)
+            return None
+
+        if value is None:
+            return None
+
+        data = orjson.loads(value)
+        film = FilmSchema(**data["film"]) if data["film"] is not None else None
+
+        return CachedFilm(film=film, fresh_until=data["fresh_until"])
+
+    def _expires_in(self, entry: CachedFilm) -> float:
+        stale_sec = self.stale_sec if entry.film is not None else 0
+        return entry.fresh_until + stale_sec - time.time()
+
+    def _make_key(self, film_id: str) -> str:
+        return f"{self.key_prefix}:{film_id}"
+
+
+film_details_cache = FilmDetailsCache(
+    ttl_sec=settings.ASYNC_API_INTEGRATION.CACHE_TTL_SEC,
+    stale_sec=settings.ASYNC_API_INTEGRATION.CACHE_STALE_SEC,
+    negative_ttl_sec=settings.ASYNC_API_INTEGRATION.CACHE_NEGATIVE_TTL_SEC,
+    lru_size=settings.ASYNC_API_INTEGRATION.CACHE_LRU_SIZE,
+)
@@ -1,33 +1,75 @@
+import http
+from typing import Optional, Type
+
 from furl import furl
-from pydantic import AnyHttpUrl, ValidationError
+from pydantic import AnyHttpUrl
 
-from app.integrations.async_api.exceptions import AsyncAPIHttpClientError
+from app.integrations.async_api.cache import FilmDetailsCache, film_details_cache
+from app.integrations.async_api.exceptions import (
+    AsyncAPIHttpClientError,
+    FilmNotFoundError,
+)
 from app.integrations.async_api.schemas import FilmSchema
-from app.integrations.base import AbstractHttpClient
+from app.integrations.base import AbstractHttpClient, single_flight
 from app.settings import settings
+from app.settings.base import HttpClientSettings
 from app.transports import AbstractHttpTransport, AiohttpTransport
 
 
 class AsyncAPIHttpClient(AbstractHttpClient):
     base_url: AnyHttpUrl = settings.ASYNC_API_INTEGRATION.BASE_URL
-    client_exc: Exception = AsyncAPIHttpClientError
+    client_exc: Type[Exception] = AsyncAPIHttpClientError
+    client_settings: HttpClientSettings = settings.ASYNC_API_INTEGRATION
 
-    def __init__(self, http_transport: AbstractHttpTransport) -> None:
-        self.http_transport: AbstractHttpTransport = http_transport
+    def __init__(
+        self, http_transport: AbstractHttpTransport, cache: FilmDetailsCache
+    ) -> None:
+        super().__init__(http_transport)
+        self.cache: FilmDetailsCache = cache
 
-    async def get_film_details(self, film_id: str) -> FilmSchema:
-        url = furl(self.base_url).add(path="/api/v1/films").add(path=film_id)
+    async def get_film_details(
+        self, film_id: str, max_stale_sec: Optional[float] = None
+    ) -> FilmSchema:
+        """
+        Serves stale film details while they are refreshed in background, unless
+        they are stale longer than max_stale_sec, then waits for fresh ones.
+        """
+        entry = await self.cache.get(film_id)
+
+        if entry is None or (
+            max_stale_sec is not None and entry.stale_sec > max_stale_sec
+        ):
+            entry = await self.cache.set(
+                film_id, await self._fetch_film_details(film_id)
+            )
+        elif not entry.is_fresh:
+            self.cache.refresh(film_id, self._fetch_film_details)
+
+        if entry.film is None:
+            raise FilmNotFoundError(film_id)
 
-        response = await self.request(
-            method="GET",
-            url=url.url,
-            timeout=settings.ASYNC_API_INTEGRATION.TIMEOUT_SEC,
-        )
+        return entry.film
+
+    @single_flight
+    async def _fetch_film_details(self, film_id: str) -> Optional[FilmSchema]:
+        """Returns None if there is no such film."""
+        url = furl(self.base_url).add(path="/api/v1/films").add(path=film_id)
 
         try:
-            return FilmSchema(**response)
-        except ValidationError as err:
-            raise self.client_exc(err) from err
+            response = await self.request(
+                method="GET",
+                url=url.url,
+                timeout=self.timeout("get_film_details"),
+                raw=True,
+            )
+        except self.client_exc as err:
+            if getattr(err.__cause__, "status", None) == http.HTTPStatus.NOT_FOUND:
+                return None
+            raise
+
+        return self.parse(FilmSchema, response)
 
 
-async_api_client = AsyncAPIHttpClient(AiohttpTransport())
+async_api_client = AsyncAPIHttpClient(
+    AiohttpTransport("async_api", settings.ASYNC_API_INTEGRATION), film_details_cache
+)
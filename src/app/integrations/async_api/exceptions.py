@@ -1,2 +1,6 @@
 class AsyncAPIHttpClientError(Exception):
     pass
+
+
+class FilmNotFoundError(AsyncAPIHttpClientError):
+    pass
@@ -1,14 +1,22 @@
+import asyncio
 import base64
+import contextvars
+import functools
 import hashlib
 import hmac
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Any, Type
+from typing import Any, Awaitable, Callable, Type, TypeVar, Union
 from urllib.parse import quote_plus
 
-from pydantic import AnyHttpUrl
+from pydantic import AnyHttpUrl, BaseModel, ValidationError
 
-from app.transports import AbstractHttpTransport, BaseTransportError
+from app import deadline
+from app.settings.base import HttpClientSettings
+from app.transports import AbstractHttpTransport, BaseTransportError, RequestTimeout
+
+T = TypeVar("T")
+ModelT = TypeVar("ModelT", bound=BaseModel)
 
 
 class BaseClientError(Exception):
@@ -19,15 +27,28 @@ class AbstractHttpClient(ABC):  # pragma: no cover
     @abstractmethod
     def __init__(self, http_transport: AbstractHttpTransport) -> None:
         self.http_transport: AbstractHttpTransport = http_transport
+        # calls shared by single_flight methods
+        self._in_flight: dict[tuple, asyncio.Future] = {}
 
+    @property
     @abstractmethod
     def base_url(self) -> AnyHttpUrl:
         pass
 
+    @property
     @abstractmethod
     def client_exc(self) -> Type[Exception]:
         pass
 
+    @property
+    @abstractmethod
+    def client_settings(self) -> HttpClientSettings:
+        pass
+
+    def timeout(self, method: str) -> RequestTimeout:
+        """Timeout of the client method requests, overridden in settings by name."""
+        return RequestTimeout.from_settings(self.client_settings, method)
+
     async def startup(self) -> None:
         await self.http_transport.startup()
 
@@ -40,8 +61,67 @@ class AbstractHttpClient(ABC):  # pragma: no cover
         except BaseTransportError as err:
             raise self.client_exc(err.message) from err
 
+    def parse(
+        self, schema: Type[ModelT], response: Union[bytes, dict[str, Any]]
+    ) -> ModelT:
+        """
+        Validates the response into the schema, straight from raw bytes if the
+        request was made with raw=True, so they are decoded by the schema json
+        loads only once.
+        """
+        try:
+            if isinstance(response, bytes):
+                return schema.parse_raw(response)
+            return schema.parse_obj(response)
+        except ValidationError as err:
+            raise self.client_exc(str(err)) from err
+
+
+def single_flight(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Makes concurrent calls of a client method with the same arguments share one
+    call, so they make a single upstream request and get the same parsed result,
+    which callers must not mutate. Use it only for idempotent requests.
+
+    The shared call runs without a deadline, every caller waits for it until its
+    own one.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self: AbstractHttpClient, *args, **kwargs) -> T:
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        task = self._in_flight.get(key)
+
+        if task is None:
+            # the shared call must not inherit the deadline of the first caller
+            task = contextvars.Context().run(
+                asyncio.ensure_future, method(self, *args, **kwargs)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(_forget, self._in_flight, key))
+
+        # cancellation of one caller must not cancel the call for the others, each
+        # of them waits for it until its own deadline
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+        except asyncio.TimeoutError as err:
+            if task.done():
+                raise
+            raise self.client_exc("Deadline exceeded") from err
+
+    return wrapper
+
+
+def _forget(in_flight: dict, key: tuple, task: asyncio.Future) -> None:
+    in_flight.pop(key, None)
+
+    if not task.cancelled():
+        # retrieves the exception, callers might have been cancelled already
+        task.exception()
+
 
 class SignatureMixin(ABC):
+    @property
     @abstractmethod
     def secret_key(self) -> str:
         pass
@@ -1,27 +1,29 @@
 from decimal import Decimal
-from typing import Any
+from typing import Any, Type
 
 from furl import furl
-from pydantic import AnyHttpUrl, UUID4, ValidationError
+from pydantic import AnyHttpUrl, UUID4
 
 from app.api.public.v1.schemas import PaymentObjectSchema
-from app.integrations.base import AbstractHttpClient, SignatureMixin
+from app.integrations.base import AbstractHttpClient, SignatureMixin, single_flight
 from app.integrations.yookassa.exceptions import YookassaHttpClientError
 from app.integrations.yookassa.schemas import (
     YookassaPaymentResponseSchema,
     YookassaRefundResponseSchema,
 )
 from app.settings import settings
+from app.settings.base import HttpClientSettings
 from app.transports import AbstractHttpTransport, AiohttpTransport
 
 
 class YookassaHttpClient(AbstractHttpClient, SignatureMixin):
     base_url: AnyHttpUrl = settings.YOOKASSA_INTEGRATION.BASE_URL
-    client_exc: Exception = YookassaHttpClientError
-    secret_key = settings.YOOKASSA_INTEGRATION.SECRET_KEY
+    client_exc: Type[Exception] = YookassaHttpClientError
+    client_settings: HttpClientSettings = settings.YOOKASSA_INTEGRATION
+    secret_key: str = settings.YOOKASSA_INTEGRATION.SECRET_KEY
 
     def __init__(self, http_transport: AbstractHttpTransport) -> None:
-        self.http_transport: AbstractHttpTransport = http_transport
+        super().__init__(http_transport)
         self.http_transport.auth = (
             settings.YOOKASSA_INTEGRATION.AUTH_USER,
             settings.YOOKASSA_INTEGRATION.AUTH_PASSWORD,
@@ -56,26 +58,47 @@ class YookassaHttpClient(AbstractHttpClient, SignatureMixin):
         url = furl(self.base_url).add(path="/v3/payments")
 
         response = await self._request(
-            method="POST", url=url.url, json=data, headers=headers
+            method="POST",
+            url=url.url,
+            json=data,
+            headers=headers,
+            timeout=self.timeout("pay"),
+            raw=True,
         )
 
-        try:
-            return YookassaPaymentResponseSchema(**response)
-        except ValidationError as err:
-            raise self.client_exc(str(err)) from err
+        return self.parse(YookassaPaymentResponseSchema, response)
 
+    @single_flight
     async def get_transaction(self, transaction_id: UUID4) -> PaymentObjectSchema:
         """
         Gets transaction info from  yookassa by GET request to URL:
         https://api.yookassa.ru/v3/payments/{payment_id}
         """
         url = furl(self.base_url).add(path="/v3/payments").add(path=str(transaction_id))
-        result = await self._request(method="GET", url=url.url)
+        result = await self._request(
+            method="GET",
+            url=url.url,
+            timeout=self.timeout("get_transaction"),
+            raw=True,
+        )
 
-        try:
-            return PaymentObjectSchema(**result)
-        except ValidationError as err:
-            raise self.client_exc(str(err)) from err
+        return self.parse(PaymentObjectSchema, result)
+
+    @single_flight
+    async def get_refund(self, refund_id: UUID4) -> YookassaRefundResponseSchema:
+        """
+        Gets refund info from yookassa by GET request to URL:
+        https://api.yookassa.ru/v3/refunds/{refund_id}
+        """
+        url = furl(self.base_url).add(path="/v3/refunds").add(path=str(refund_id))
+        result = await self._request(
+            method="GET",
+            url=url.url,
+            timeout=self.timeout("get_refund"),
+            raw=True,
+        )
+
+        return self.parse(YookassaRefundResponseSchema, result)
 
     async def refund(
         self,
@@ -94,13 +117,17 @@ class YookassaHttpClient(AbstractHttpClient, SignatureMixin):
         url = furl(self.base_url).add(path="/v3/refunds")
 
         response = await self._request(
-            method="POST", url=url.url, json=data, headers=headers
+            method="POST",
+            url=url.url,
+            json=data,
+            headers=headers,
+            timeout=self.timeout("refund"),
+            raw=True,
         )
 
-        try:
-            return YookassaRefundResponseSchema(**response)
-        except ValidationError as err:
-            raise self.client_exc(str(err)) from err
+        return self.parse(YookassaRefundResponseSchema, response)
 
 
-yookassa_client = YookassaHttpClient(AiohttpTransport())
+yookassa_client = YookassaHttpClient(
+    AiohttpTransport("yookassa", settings.YOOKASSA_INTEGRATION)
+)
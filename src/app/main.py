@@ -1,4 +1,5 @@
-from logging import config
+import asyncio
+from logging import config, getLogger
 
 from fastapi import FastAPI
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -7,14 +8,19 @@ from fastapi_pagination import add_pagination
 
 from app.api import init_api
 from app.apm import init_apm
+from app.deadline import DeadlineMiddleware
 from app.integrations.async_api.client import async_api_client
 from app.integrations.yookassa.client import yookassa_client
+from app.partitions import create_future_partitions, maintain_partitions
+from app.redis import shutdown as shutdown_redis
 from app.sentry import init_sentry
 from app.settings import settings
 from app.settings.logging import LOGGING
 
 config.dictConfig(LOGGING)
 
+logger = getLogger(__name__)
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     docs_url=None,
@@ -24,6 +30,11 @@ app = FastAPI(
 )
 
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.SECURITY.ALLOWED_HOSTS)
+app.add_middleware(
+    DeadlineMiddleware,
+    budget_sec=settings.DEADLINE.BUDGET_SEC,
+    header=settings.DEADLINE.HEADER,
+)
 
 
 @app.on_event("startup")
@@ -31,11 +42,17 @@ async def startup():
     await yookassa_client.startup()
     await async_api_client.startup()
 
+    await create_future_partitions()
+    app.state.partitions_task = asyncio.create_task(maintain_partitions())
+
 
 @app.on_event("shutdown")
 async def shutdown():
+    app.state.partitions_task.cancel()
+
     await yookassa_client.shutdown()
     await async_api_client.shutdown()
+    await shutdown_redis()
 
 
 init_api(app)
@@ -1,17 +1,29 @@
 import enum
 import uuid
-from datetime import datetime
-from typing import Any, Optional
+from datetime import date, datetime, timedelta
+from logging import getLogger
+from typing import Any, Optional, Union
 
 import sqlalchemy as sa
 from pydantic import UUID4
-from sqlalchemy import and_, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import UUID, insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import declarative_mixin, relationship, selectinload
-
+from sqlalchemy.orm import (
+    Load,
+    declarative_mixin,
+    joinedload,
+    relationship,
+    selectinload,
+)
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.archive import archive_storage
 from app.database import Base
 
+logger = getLogger(__name__)
+
 
 class ObjectDoesNotExistError(Exception):
     """Raise it if object does not exist in database."""
@@ -29,13 +41,103 @@ class TimestampMixin:
     )
 
 
+@declarative_mixin
+class MonthlyPartitionedMixin(TimestampMixin):
+    """
+    Table range partitioned by months of created_at. Every unique key of a
+    partitioned table must include the partition key, so created_at is a part of
+    the primary key and the table can't be referenced by foreign keys.
+    """
+
+    # set by declarative mapping of the model
+    __tablename__: str
+    __table__: sa.Table
+
+    created_at = sa.Column(
+        sa.DateTime(timezone=False),
+        primary_key=True,
+        default=lambda: datetime.utcnow(),
+    )
+
+    partition_options = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    @classmethod
+    async def create_partitions(
+        cls, session: AsyncSession, date_from: date, date_to: date
+    ) -> int:
+        """
+        Creates missing partitions for months from date_from to date_to inclusive.
+        Returns number of created partitions.
+        """
+        create_monthly_partitions = getattr(
+            sa.func, cls.__table__.schema
+        ).create_monthly_partitions
+
+        return await session.scalar(
+            sa.select(create_monthly_partitions(cls.__tablename__, date_from, date_to))
+        )
+
+    @classmethod
+    async def default_partition_has_rows(cls, session: AsyncSession) -> bool:
+        default_partition = sa.table(
+            f"{cls.__tablename__}_default", schema=cls.__table__.schema
+        )
+
+        return await session.scalar(
+            sa.select(sa.exists().select_from(default_partition))
+        )
+
+
 @declarative_mixin
 class MethodsExtensionMixin:
+    # set by declarative mapping of the model
+    __table__: sa.Table
+
+    class LoadProfileEnum(str, enum.Enum):
+        SUMMARY = "summary"
+        WITH_RECEIPT = "with_receipt"
+        WITH_USER_FILM = "with_user_film"
+        FULL = "full"
+
+    @classmethod
+    def load_profiles(cls) -> dict[LoadProfileEnum, list[Load]]:
+        """
+        Maps load profile to loader options. Override it in models with
+        relationships to describe which relations each profile eagerly loads.
+        """
+        return {cls.LoadProfileEnum.SUMMARY: []}
+
+    @classmethod
+    def load_options(cls, profile: LoadProfileEnum) -> list[Load]:
+        return cls.load_profiles()[profile]
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any]):
+        """Builds transient object from the row decoded from JSON."""
+        values = {}
+
+        for column in cls.__table__.columns:
+            value = row.get(column.key)
+
+            if value is None:
+                pass
+            elif isinstance(column.type, sa.Enum):
+                value = column.type.enum_class(value)
+            elif column.type.python_type in (date, datetime):
+                value = column.type.python_type.fromisoformat(value)
+            else:
+                value = column.type.python_type(value)
+
+            values[column.key] = value
+
+        return cls(**values)
+
     @classmethod
     async def get(
         cls,
         session: AsyncSession,
         relations: Optional[list[relationship]] = None,
+        profile: LoadProfileEnum = LoadProfileEnum.SUMMARY,
         **kwargs,
     ):
         if relations is None:
@@ -46,7 +148,7 @@ class MethodsExtensionMixin:
             for field_name, field_val in kwargs.items()
         ]
 
-        stmt = sa.select(cls).where(and_(*filters))
+        stmt = sa.select(cls).where(and_(*filters)).options(*cls.load_options(profile))
 
         for relation in relations:
             stmt = stmt.options(selectinload(relation))
@@ -69,26 +171,164 @@ class MethodsExtensionMixin:
 
         return obj
 
+    @classmethod
+    async def update_where(
+        cls, session: AsyncSession, values: dict[str, Any], **kwargs
+    ) -> list[Row]:
+        """
+        Updates rows matched by kwargs with the single UPDATE ... RETURNING
+        statement. Objects are not loaded to the session, updated rows are returned
+        as is.
+        """
+        filters = [
+            getattr(cls, field_name) == field_val
+            for field_name, field_val in kwargs.items()
+        ]
+
+        stmt = (
+            sa.update(cls)
+            .where(and_(*filters))
+            .values(**values)
+            .returning(*cls.__table__.columns)
+        )
+        result = await session.execute(stmt)
+
+        return result.all()
+
+    @classmethod
+    async def bulk_create(
+        cls,
+        session: AsyncSession,
+        values: list[dict[str, Any]],
+        ignore_conflicts: bool = False,
+    ) -> list:
+        """
+        Creates objects for all given values by the single multi-row
+        INSERT ... RETURNING statement. Rows conflicting with existing ones are
+        skipped and not returned if ignore_conflicts is set.
+        """
+        if not values:
+            return []
+
+        stmt = insert(cls).values(values)
+
+        if ignore_conflicts:
+            stmt = stmt.on_conflict_do_nothing()
+
+        return await cls._execute_returning(session, stmt)
+
+    @classmethod
+    async def bulk_upsert(
+        cls,
+        session: AsyncSession,
+        values: list[dict[str, Any]],
+        index_elements: list[str],
+        update_fields: Optional[list[str]] = None,
+    ) -> list:
+        """
+        Creates objects for all given values by the single multi-row
+        INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement. Conflicting rows
+        are updated with update_fields, all given fields except index_elements by
+        default.
+        """
+        if not values:
+            return []
+
+        if update_fields is None:
+            update_fields = [
+                field_name
+                for field_name in values[0]
+                if field_name not in index_elements
+            ]
+
+        stmt = insert(cls).values(values)
+        set_ = {field_name: stmt.excluded[field_name] for field_name in update_fields}
+
+        if hasattr(cls, "updated_at"):
+            # onupdate defaults are not applied to ON CONFLICT DO UPDATE
+            set_.setdefault("updated_at", datetime.utcnow())
+
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+
+        return await cls._execute_returning(session, stmt)
+
+    @classmethod
+    async def _execute_returning(cls, session: AsyncSession, stmt) -> list:
+        stmt = sa.select(cls).from_statement(stmt.returning(*cls.__table__.columns))
+        result = await session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+
+        return result.scalars().all()
+
     @classmethod
     async def get_or_create(
         cls, session: AsyncSession, defaults: Optional[dict[str, Any]] = None, **kwargs
     ):
         """
         Gets object for given kwargs, if not found create it with additional kwargs
-        from defaults dict.
+        from defaults dict. Kwargs must match an unique constraint: the object is
+        inserted by INSERT ... ON CONFLICT DO NOTHING, so concurrent calls never race
+        into IntegrityError, and existing rows are not locked. Returns the object
+        and whether it was created.
         """
         if defaults is None:
             defaults = {}
 
-        try:
-            return await cls.get(session, **kwargs), False
-        except ObjectDoesNotExistError:
-            return await cls.create(session, **defaults, **kwargs), True
+        stmt = (
+            insert(cls)
+            .values(**defaults, **kwargs)
+            .on_conflict_do_nothing(index_elements=list(kwargs))
+            .returning(*cls.__table__.columns)
+        )
+
+        result = await session.execute(
+            sa.select(cls).from_statement(stmt),
+            execution_options={"populate_existing": True},
+        )
+        obj = result.scalar()
+
+        if obj is not None:
+            return obj, True
 
+        # nothing is returned on conflict, the row is visible to the next statement
+        return await cls.get(session, **kwargs), False
 
-class Transaction(Base, TimestampMixin, MethodsExtensionMixin):
+
+class Transaction(Base, MonthlyPartitionedMixin, MethodsExtensionMixin):
     __tablename__ = "transactions"
-    __table_args__ = (sa.UniqueConstraint("id", "type", name="_id_type_uc"),)
+    __table_args__ = (
+        # unique keys must include the partition key, ext_id is kept unique by
+        # TransactionExtId
+        sa.Index("ix_content_transactions_ext_id", "ext_id"),
+        # composite indexes backing the admin listing filters and sort orders
+        sa.Index("ix_content_transactions_created_at_id", "created_at", "id"),
+        sa.Index("ix_content_transactions_amount_id", "amount", "id"),
+        sa.Index(
+            "ix_content_transactions_user_id_created_at_id",
+            "user_id",
+            sa.text("created_at DESC"),
+            sa.text("id DESC"),
+        ),
+        sa.Index(
+            "ix_content_transactions_status_created_at_id", "status", "created_at", "id"
+        ),
+        sa.Index(
+            "ix_content_transactions_type_status_created_at_id",
+            "type",
+            "status",
+            "created_at",
+            "id",
+        ),
+        sa.Index(
+            "ix_content_transactions_payment_type_created_at_id",
+            "payment_type",
+            "created_at",
+            "id",
+        ),
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        MonthlyPartitionedMixin.partition_options,
+    )
 
     class TypeEnum(enum.Enum):
         PAYMENT = "PAYMENT"
@@ -112,27 +352,137 @@ class Transaction(Base, TimestampMixin, MethodsExtensionMixin):
         QR = "QR-CODE"
 
     id = sa.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    ext_id = sa.Column(UUID(as_uuid=True), unique=True)
-    user_id = sa.Column(UUID(as_uuid=True), nullable=False, index=True)
+    ext_id = sa.Column(UUID(as_uuid=True))
+    user_id = sa.Column(UUID(as_uuid=True), nullable=False)
+    film_id = sa.Column(UUID(as_uuid=True))
     amount = sa.Column(
         sa.Numeric(14, 3), sa.CheckConstraint("amount>0"), nullable=False
     )
-    type = sa.Column(sa.Enum(TypeEnum), nullable=False, index=True)
-    status = sa.Column(
-        sa.Enum(StatusEnum), default=StatusEnum.CREATED.value, index=True
-    )
-    payment_type = sa.Column(sa.Enum(PaymentType), nullable=False, index=True)
+    type = sa.Column(sa.Enum(TypeEnum), nullable=False)
+    status = sa.Column(sa.Enum(StatusEnum), default=StatusEnum.CREATED.value)
+    payment_type = sa.Column(sa.Enum(PaymentType), nullable=False)
 
     receipt = relationship(
-        "Receipt", lazy="joined", back_populates="transactions", uselist=False
+        "Receipt",
+        primaryjoin="Transaction.id == foreign(Receipt.transaction_id)",
+        lazy="raise",
+        back_populates="transactions",
+        uselist=False,
     )
     user_film = relationship(
-        "UserFilm", lazy="joined", back_populates="transaction", uselist=False
+        "UserFilm",
+        primaryjoin="Transaction.id == foreign(UserFilm.transaction_id)",
+        lazy="raise",
+        back_populates="transaction",
+        uselist=False,
     )
 
+    @classmethod
+    async def get(
+        cls,
+        session: AsyncSession,
+        relations: Optional[list[relationship]] = None,
+        profile: MethodsExtensionMixin.LoadProfileEnum = (
+            MethodsExtensionMixin.LoadProfileEnum.SUMMARY
+        ),
+        with_archived: bool = False,
+        **kwargs,
+    ):
+        """
+        Falls back to the archive if with_archived is set, then kwargs must include
+        id. Archived transactions are transient objects in their final state, so
+        use it for reads only.
+
+        Without created_at in kwargs every partition is looked up, so pass it when
+        it is known, see TransactionExtId.created_at_of for lookups by ext_id.
+        """
+        try:
+            return await super().get(session, relations, profile, **kwargs)
+        except ObjectDoesNotExistError:
+            if not with_archived:
+                raise
+
+        transaction = await ArchivedTransaction.load(session, kwargs["id"])
+
+        # ids may be given as strings
+        if any(
+            str(getattr(transaction, field_name)) != str(field_val)
+            for field_name, field_val in kwargs.items()
+        ):
+            raise ObjectDoesNotExistError
+
+        return transaction
+
+    @classmethod
+    async def set_status(
+        cls, session: AsyncSession, status: "Transaction.StatusEnum", **kwargs
+    ) -> Optional[Row]:
+        """
+        Sets status of the transaction matched by kwargs by the single
+        UPDATE ... RETURNING, unless it has this status already. Returns the updated
+        row or None, so of concurrent calls setting the same status only one gets
+        the transition: the others wait for its row lock and then don't match.
+        """
+        filters = [
+            getattr(cls, field_name) == field_val
+            for field_name, field_val in kwargs.items()
+        ]
+
+        stmt = (
+            sa.update(cls)
+            .where(and_(*filters), cls.status.is_distinct_from(status))
+            .values(status=status, updated_at=datetime.utcnow())
+            .returning(*cls.__table__.columns)
+        )
+        result = await session.execute(
+            stmt, execution_options={"synchronize_session": False}
+        )
+
+        return result.first()
+
+    @classmethod
+    def load_profiles(cls) -> dict[MethodsExtensionMixin.LoadProfileEnum, list[Load]]:
+        return {
+            cls.LoadProfileEnum.SUMMARY: [],
+            # scalar relations are joined, only the items collection is selected
+            # by the separate statement
+            cls.LoadProfileEnum.WITH_RECEIPT: [
+                joinedload(cls.receipt).selectinload(Receipt.items),
+            ],
+            cls.LoadProfileEnum.WITH_USER_FILM: [
+                joinedload(cls.user_film),
+            ],
+            cls.LoadProfileEnum.FULL: [
+                joinedload(cls.receipt).selectinload(Receipt.items),
+                joinedload(cls.user_film),
+            ],
+        }
+
+
+class TransactionExtId(Base):
+    """
+    Keeps ext_id of transactions unique across partitions, rows are maintained by
+    the trigger on transactions.
+    """
+
+    __tablename__ = "transactions_ext_ids"
+
+    ext_id = sa.Column(UUID(as_uuid=True), primary_key=True)
+    transaction_id = sa.Column(UUID(as_uuid=True), nullable=False)
+    created_at = sa.Column(sa.DateTime(timezone=False), nullable=False)
 
-class Receipt(Base, TimestampMixin, MethodsExtensionMixin):
+    @classmethod
+    def created_at_of(cls, ext_id: Union[str, UUID4]) -> sa.sql.expression.ScalarSelect:
+        """Selects created_at of the transaction to prune its partitions by."""
+        return sa.select(cls.created_at).where(cls.ext_id == ext_id).scalar_subquery()
+
+
+class Receipt(Base, MonthlyPartitionedMixin, MethodsExtensionMixin):
     __tablename__ = "receipts"
+    __table_args__ = (
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        MonthlyPartitionedMixin.partition_options,
+    )
 
     class StatusEnum(enum.Enum):
         # custom
@@ -146,28 +496,37 @@ class Receipt(Base, TimestampMixin, MethodsExtensionMixin):
 
     id = sa.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     ext_id = sa.Column(UUID(as_uuid=True), index=True)
-    transaction_id = sa.Column(
-        UUID(as_uuid=True), sa.ForeignKey("transactions.id", ondelete="SET NULL")
-    )
+    transaction_id = sa.Column(UUID(as_uuid=True), index=True)
     status = sa.Column(
         sa.Enum(StatusEnum), default=StatusEnum.CREATED.value, index=True
     )
 
-    transactions = relationship("Transaction", lazy="joined", back_populates="receipt")
-    items = relationship("ReceiptItem", lazy="joined")
+    transactions = relationship(
+        "Transaction",
+        primaryjoin="Transaction.id == foreign(Receipt.transaction_id)",
+        lazy="raise",
+        back_populates="receipt",
+    )
+    items = relationship(
+        "ReceiptItem",
+        primaryjoin="Receipt.id == foreign(ReceiptItem.receipt_id)",
+        lazy="raise",
+    )
 
 
-class ReceiptItem(Base, TimestampMixin, MethodsExtensionMixin):
+class ReceiptItem(Base, MonthlyPartitionedMixin, MethodsExtensionMixin):
     __tablename__ = "receipt_items"
+    __table_args__ = (
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        MonthlyPartitionedMixin.partition_options,
+    )
 
     class TypeEnum(enum.Enum):
         FILM = "FILM"
         SUBSCRIPTION = "SUBSCRIPTION"
 
     id = sa.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    receipt_id = sa.Column(
-        UUID(as_uuid=True), sa.ForeignKey("receipts.id", ondelete="SET NULL")
-    )
+    receipt_id = sa.Column(UUID(as_uuid=True), index=True)
     description = sa.Column(sa.String(length=4096), nullable=False)
     quantity = sa.Column(sa.Numeric(14, 3), nullable=False)
     amount = sa.Column(sa.Numeric(14, 3), nullable=False)
@@ -182,19 +541,230 @@ class UserFilm(Base, TimestampMixin, MethodsExtensionMixin):
     film_id = sa.Column(UUID(as_uuid=True), nullable=False)
     watched = sa.Column(sa.Boolean, default=False)
     is_active = sa.Column(sa.Boolean, default=False)
-    transaction_id = sa.Column(UUID(as_uuid=True), ForeignKey("transactions.id"))
-    transaction = relationship("Transaction", back_populates="user_film")
+    transaction_id = sa.Column(UUID(as_uuid=True), index=True)
+    transaction = relationship(
+        "Transaction",
+        primaryjoin="Transaction.id == foreign(UserFilm.transaction_id)",
+        back_populates="user_film",
+    )
 
     __table_args__ = (sa.UniqueConstraint("user_id", "film_id", name="_user_film"),)
 
     @classmethod
     async def update(
         cls, session: AsyncSession, user_id: UUID4, film_id: UUID4, **kwargs
-    ) -> "UserFilm":
-        user_film = await cls.get(session, user_id=user_id, film_id=film_id)
+    ) -> Row:
+        values = {
+            key: value
+            for key, value in kwargs.items()
+            if key not in ("user_id", "film_id")
+        }
+        rows = await cls.update_where(session, values, user_id=user_id, film_id=film_id)
+
+        if not rows:
+            raise ObjectDoesNotExistError
+
+        return rows[0]
+
+
+class RevenueAggregate(Base, TimestampMixin, MethodsExtensionMixin):
+    """
+    Revenue by day, film and payment type. Kept up to date incrementally when
+    transactions succeed, so reports don't aggregate transactions live.
+    """
 
-        for key, value in kwargs.items():
-            if key not in ("user_id", "film_id"):
-                setattr(user_film, key, value)
+    __tablename__ = "revenue_aggregates"
+
+    day = sa.Column(sa.Date, primary_key=True)
+    film_id = sa.Column(UUID(as_uuid=True), primary_key=True)
+    payment_type = sa.Column(sa.Enum(Transaction.PaymentType), primary_key=True)
+    payments_count = sa.Column(sa.Integer, nullable=False, default=0)
+    payments_amount = sa.Column(sa.Numeric(14, 3), nullable=False, default=0)
+    refunds_count = sa.Column(sa.Integer, nullable=False, default=0)
+    refunds_amount = sa.Column(sa.Numeric(14, 3), nullable=False, default=0)
+
+    counters = ("payments_count", "payments_amount", "refunds_count", "refunds_amount")
+
+    @classmethod
+    async def add(
+        cls, session: AsyncSession, transaction: Transaction, day: Optional[date] = None
+    ) -> None:
+        """
+        Accounts succeeded transaction by the single atomic
+        INSERT ... ON CONFLICT DO UPDATE, so concurrent calls don't lose counts.
+        Call it once per transaction, when it becomes succeeded.
+        """
+        if transaction.film_id is None:
+            logger.warning("Transaction %s has no film, skip revenue", transaction.id)
+            return
+
+        is_payment = transaction.type == Transaction.TypeEnum.PAYMENT
+        stmt = insert(cls).values(
+            day=day or datetime.utcnow().date(),
+            film_id=transaction.film_id,
+            payment_type=transaction.payment_type,
+            payments_count=int(is_payment),
+            payments_amount=transaction.amount if is_payment else 0,
+            refunds_count=int(not is_payment),
+            refunds_amount=0 if is_payment else transaction.amount,
+        )
+        set_ = {name: getattr(cls, name) + stmt.excluded[name] for name in cls.counters}
+        set_["updated_at"] = datetime.utcnow()
+
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["day", "film_id", "payment_type"], set_=set_
+            )
+        )
+
+    @classmethod
+    async def rebuild(
+        cls,
+        session: AsyncSession,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> int:
+        """
+        Recalculates aggregates of days in [date_from, date_to] from transactions.
+        Transactions are dated by the last update, which is when they succeeded.
+        Days up to the last archived one are skipped with a warning, their
+        transactions are not in the table anymore, as well as transactions without
+        film. Returns number of aggregate rows written.
+        """
+        archived_day = await ArchivedTransaction.last_day(session)
+
+        if archived_day and (date_from is None or date_from <= archived_day):
+            logger.warning("Skipped archived days up to %s", archived_day)
+            date_from = archived_day + timedelta(days=1)
+
+            if date_to and date_to < date_from:
+                return 0
+
+        day = sa.cast(Transaction.updated_at, sa.Date)
+        is_payment = Transaction.type == Transaction.TypeEnum.PAYMENT
+        delete_stmt = sa.delete(cls)
+        select_stmt = (
+            sa.select(
+                day,
+                Transaction.film_id,
+                Transaction.payment_type,
+                sa.func.count().filter(is_payment),
+                sa.func.coalesce(sa.func.sum(Transaction.amount).filter(is_payment), 0),
+                sa.func.count().filter(~is_payment),
+                sa.func.coalesce(
+                    sa.func.sum(Transaction.amount).filter(~is_payment), 0
+                ),
+            )
+            .where(
+                Transaction.status == Transaction.StatusEnum.SUCCEEDED,
+                Transaction.film_id.is_not(None),
+            )
+            .group_by(day, Transaction.film_id, Transaction.payment_type)
+        )
+
+        if date_from:
+            delete_stmt = delete_stmt.where(cls.day >= date_from)
+            select_stmt = select_stmt.where(day >= date_from)
+        if date_to:
+            delete_stmt = delete_stmt.where(cls.day <= date_to)
+            select_stmt = select_stmt.where(day <= date_to)
+
+        await session.execute(delete_stmt)
+        result = await session.execute(
+            insert(cls).from_select(
+                ["day", "film_id", "payment_type", *cls.counters], select_stmt
+            )
+        )
+
+        skipped_stmt = sa.select(sa.func.count()).where(
+            Transaction.status == Transaction.StatusEnum.SUCCEEDED,
+            Transaction.film_id.is_(None),
+        )
+
+        if date_from:
+            skipped_stmt = skipped_stmt.where(day >= date_from)
+        if date_to:
+            skipped_stmt = skipped_stmt.where(day <= date_to)
+
+        skipped = await session.scalar(skipped_stmt)
+
+        if skipped:
+            logger.warning("Skipped %s succeeded transactions without film", skipped)
+
+        return result.rowcount
+
+
+class ArchivedTransaction(Base, TimestampMixin, MethodsExtensionMixin):
+    """Locates transactions moved to the archive storage with receipts and items."""
+
+    __tablename__ = "archived_transactions"
+
+    id = sa.Column(UUID(as_uuid=True), primary_key=True)
+    path = sa.Column(sa.String(length=255), nullable=False)
+    # revenue of the transaction is accounted on this day
+    transaction_updated_at = sa.Column(sa.DateTime(timezone=False), nullable=False)
+
+    @classmethod
+    async def last_day(cls, session: AsyncSession) -> Optional[date]:
+        """Returns the last day which has archived transactions."""
+        return await session.scalar(
+            sa.select(sa.func.max(sa.cast(cls.transaction_updated_at, sa.Date)))
+        )
+
+    @classmethod
+    async def is_archived(
+        cls, session: AsyncSession, transaction_id: Union[str, UUID4]
+    ) -> bool:
+        return bool(
+            await session.scalar(sa.select(sa.exists().where(cls.id == transaction_id)))
+        )
+
+    @classmethod
+    async def load(cls, session: AsyncSession, transaction_id: UUID4) -> Transaction:
+        """
+        Rehydrates archived transaction with all relations as transient objects.
+        It reads the whole batch file, so use it for rare lookups only.
+        """
+        archived = await cls.get(session, id=transaction_id)
+        tables = await archive_storage.read_batch(archived.path)
+
+        transaction = next(
+            (
+                Transaction.from_row(row)
+                for row in tables[Transaction.__tablename__]
+                if row["id"] == str(archived.id)
+            ),
+            None,
+        )
+
+        if transaction is None:
+            logger.error("Transaction %s is missing in %s", archived.id, archived.path)
+            raise ObjectDoesNotExistError
 
-        return user_film
+        receipt = next(
+            (
+                Receipt.from_row(row)
+                for row in tables[Receipt.__tablename__]
+                if row["transaction_id"] == str(archived.id)
+            ),
+            None,
+        )
+
+        if receipt:
+            set_committed_value(
+                receipt,
+                "items",
+                [
+                    ReceiptItem.from_row(row)
+                    for row in tables[ReceiptItem.__tablename__]
+                    if row["receipt_id"] == str(receipt.id)
+                ],
+            )
+
+        user_film = await session.scalar(
+            sa.select(UserFilm).where(UserFilm.transaction_id == archived.id)
+        )
+        set_committed_value(transaction, "receipt", receipt)
+        set_committed_value(transaction, "user_film", user_film)
+
+        return transaction
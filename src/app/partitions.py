@@ -0,0 +1,61 @@
+import asyncio
+from datetime import date, datetime
+from logging import getLogger
+
+from app.database import session_scope
+from app.models import Receipt, ReceiptItem, Transaction
+from app.settings import settings
+
+logger = getLogger(__name__)
+
+PARTITIONED_MODELS = (Transaction, Receipt, ReceiptItem)
+
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.month - 1 + months
+    return date(day.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+async def create_future_partitions(
+    months_ahead: int = settings.DB.PARTITIONS_MONTHS_AHEAD,
+) -> int:
+    """
+    Creates monthly partitions from the current month for months_ahead months, so
+    new rows never land in the default partition. Rows which landed there already
+    are moved to the created partitions. Every table is done in its own
+    transaction, so a failure doesn't stop the others. Returns number of created
+    partitions.
+    """
+    date_from = datetime.utcnow().date()
+    date_to = add_months(date_from, months_ahead)
+    created = 0
+
+    for model in PARTITIONED_MODELS:
+        try:
+            async with session_scope() as session:
+                created += await model.create_partitions(session, date_from, date_to)
+
+                if await model.default_partition_has_rows(session):
+                    logger.warning(
+                        "Default partition of %s has rows", model.__tablename__
+                    )
+        except Exception:
+            logger.exception("Failed to create partitions of %s", model.__tablename__)
+
+    if created:
+        logger.info("Created %s partitions up to %s", created, date_to)
+
+    return created
+
+
+async def maintain_partitions(
+    interval_sec: int = settings.DB.PARTITIONS_CHECK_INTERVAL_SEC,
+) -> None:
+    """
+    Creates future partitions every interval_sec until cancelled, so long running
+    workers never run out of them. Concurrent runs in other workers wait for each
+    other in the database.
+    """
+    while True:
+        await asyncio.sleep(interval_sec)
+        await create_future_partitions()
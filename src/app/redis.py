@@ -0,0 +1,14 @@
+from typing import Optional
+
+from redis import asyncio as aioredis
+
+from app.settings import settings
+
+redis_client: Optional[aioredis.Redis] = (
+    aioredis.from_url(settings.REDIS.DSN) if settings.REDIS.ENABLED else None
+)
+
+
+async def shutdown() -> None:
+    if redis_client:
+        await redis_client.close()
@@ -1,4 +1,6 @@
+import hashlib
 import secrets
+import time
 from typing import Optional
 
 from fastapi.security import HTTPBasicCredentials
@@ -6,6 +8,7 @@ from jose import JWTError, jwt
 from pydantic import ValidationError
 
 from app.api.schemas import ORJSONModel
+from app.cache import LRUCache
 from app.settings import settings
 
 
@@ -35,7 +38,30 @@ def verify_basic_auth_credentials(credentials: HTTPBasicCredentials) -> None:
         raise NotAuthenticatedError
 
 
+token_cache = LRUCache(maxsize=settings.SECURITY.JWT_AUTH.CACHE_SIZE)
+
+
 def decode_jwt_token(token: str) -> TokenData:
+    """
+    Decodes the token once and keeps its claims keyed by the token hash until the
+    token expires, but not longer than CACHE_MAX_TTL_SEC.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+
+    if token_data is None:
+        token_data, expires_at = _decode_jwt_token(token)
+        ttl_sec: float = settings.SECURITY.JWT_AUTH.CACHE_MAX_TTL_SEC
+
+        if expires_at is not None:
+            ttl_sec = min(ttl_sec, expires_at - time.time())
+
+        token_cache.set(key, token_data, ttl_sec=ttl_sec)
+
+    return token_data
+
+
+def _decode_jwt_token(token: str) -> tuple[TokenData, Optional[float]]:
     try:
         decoded_token = jwt.decode(
             token,
@@ -46,6 +72,6 @@ def decode_jwt_token(token: str) -> TokenData:
         raise NotAuthenticatedError
 
     try:
-        return TokenData(**decoded_token)
+        return TokenData(**decoded_token), decoded_token.get("exp")
     except ValidationError:
         raise NotAuthenticatedError
@@ -0,0 +1,100 @@
+from datetime import datetime
+from logging import getLogger
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.archive import ArchiveStorage, archive_storage
+from app.models import ArchivedTransaction, Receipt, ReceiptItem, Transaction
+
+logger = getLogger(__name__)
+
+
+class ArchiveService:
+    final_statuses = (
+        Transaction.StatusEnum.SUCCEEDED,
+        Transaction.StatusEnum.CANCELED,
+        Transaction.StatusEnum.FAILED,
+    )
+
+    def __init__(self, storage: ArchiveStorage) -> None:
+        self.storage = storage
+
+    async def archive_batch(
+        self, db_session: AsyncSession, older_than: datetime, batch_size: int
+    ) -> int:
+        """
+        Moves up to batch_size final transactions created before older_than to the
+        storage with their receipts and items. Rows are written to the storage
+        before they are deleted, so a failed batch leaves an unreferenced batch
+        directory at worst. Returns number of archived transactions.
+        """
+        result = await db_session.execute(
+            sa.select(*Transaction.__table__.columns)
+            .where(
+                Transaction.status.in_(self.final_statuses),
+                Transaction.created_at < older_than,
+            )
+            .order_by(Transaction.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        transactions = [dict(row) for row in result.mappings()]
+
+        if not transactions:
+            return 0
+
+        transaction_ids = [row["id"] for row in transactions]
+        result = await db_session.execute(
+            sa.select(*Receipt.__table__.columns).where(
+                Receipt.transaction_id.in_(transaction_ids)
+            )
+        )
+        receipts = [dict(row) for row in result.mappings()]
+
+        receipt_ids = [row["id"] for row in receipts]
+        result = await db_session.execute(
+            sa.select(*ReceiptItem.__table__.columns).where(
+                ReceiptItem.receipt_id.in_(receipt_ids)
+            )
+        )
+        receipt_items = [dict(row) for row in result.mappings()]
+
+        path = await self.storage.write_batch(
+            {
+                Transaction.__tablename__: transactions,
+                Receipt.__tablename__: receipts,
+                ReceiptItem.__tablename__: receipt_items,
+            }
+        )
+        await ArchivedTransaction.bulk_create(
+            db_session,
+            [
+                {
+                    "id": row["id"],
+                    "path": path,
+                    "transaction_updated_at": row["updated_at"] or row["created_at"],
+                }
+                for row in transactions
+            ],
+        )
+
+        await db_session.execute(
+            sa.delete(ReceiptItem).where(ReceiptItem.receipt_id.in_(receipt_ids))
+        )
+        await db_session.execute(
+            sa.delete(Receipt).where(Receipt.transaction_id.in_(transaction_ids))
+        )
+        await db_session.execute(
+            sa.delete(Transaction).where(
+                Transaction.id.in_(transaction_ids),
+                Transaction.created_at < older_than,
+            )
+        )
+
+        logger.info("Archived %s transactions to %s", len(transaction_ids), path)
+
+        return len(transaction_ids)
+
+
+archive_service = ArchiveService(archive_storage)
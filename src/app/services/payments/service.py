@@ -3,11 +3,22 @@ from logging import getLogger
 
 from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.cache import user_film_cache
+from app.database import recent_writes
 from app.integrations.async_api.client import async_api_client, AsyncAPIHttpClientError
 from app.integrations.yookassa.client import yookassa_client, YookassaHttpClientError
 from app.integrations.yookassa.schemas import StatusEnum
-from app.models import Transaction, Receipt, ReceiptItem, UserFilm
+from app.models import (
+    ArchivedTransaction,
+    ObjectDoesNotExistError,
+    Receipt,
+    ReceiptItem,
+    RevenueAggregate,
+    Transaction,
+    UserFilm,
+)
 from app.services.payments.exceptions import (
     AlreadyPurchasedError,
     AsyncAPIUnavailableError,
@@ -18,6 +29,7 @@ from app.services.payments.exceptions import (
     NotAvalableForRefundError,
     AlreadyWatchedError,
 )
+from app.settings import settings
 
 logger = getLogger(__name__)
 
@@ -41,7 +53,10 @@ class PaymentsService:
             raise AlreadyPurchasedError
 
         try:
-            film = await async_api_client.get_film_details(film_id)
+            film = await async_api_client.get_film_details(
+                film_id,
+                max_stale_sec=settings.ASYNC_API_INTEGRATION.CACHE_PURCHASE_STALE_SEC,
+            )
         except AsyncAPIHttpClientError:
             raise AsyncAPIUnavailableError
 
@@ -50,26 +65,29 @@ class PaymentsService:
 
         transaction = await Transaction.create(
             db_session,
+            flush=True,
             user_id=user_id,
+            film_id=film_id,
             amount=film.price,
             type=Transaction.TypeEnum.PAYMENT,
             payment_type=payment_type,
         )
-
-        receipt = await Receipt.create(db_session, transaction_id=transaction.id)
-        receipt_item = await ReceiptItem.create(
+        receipt = await Receipt.create(
+            db_session, flush=True, transaction_id=transaction.id
+        )
+        await ReceiptItem.bulk_create(
             db_session,
-            receipt_id=receipt.id,
-            description=film.title,
-            quantity=1,
-            amount=film.price,
-            type=ReceiptItem.TypeEnum.FILM,
+            [
+                {
+                    "receipt_id": receipt.id,
+                    "description": film.title,
+                    "quantity": 1,
+                    "amount": film.price,
+                    "type": ReceiptItem.TypeEnum.FILM,
+                }
+            ],
         )
 
-        await db_session.flush()
-        receipt.transaction_id = transaction.id
-        receipt_item.receipt_id = receipt.id
-
         valid_price = (Decimal(film.price) / 100).quantize(
             Decimal(".01"), rounding=ROUND_HALF_UP
         )
@@ -82,7 +100,8 @@ class PaymentsService:
             raise YookassaUnavailableError
 
         transaction.ext_id = yookassa_data.id
-        user_film.transaction = transaction
+        user_film.transaction_id = transaction.id
+        await recent_writes.mark(user_id)
 
         return yookassa_data.confirmation.confirmation_url
 
@@ -93,43 +112,51 @@ class PaymentsService:
         user_id: str,
         idempotence_key: UUID4,
     ) -> Transaction:
-        payment_transaction = await Transaction.get(db_session, id=transaction_id)
+        try:
+            payment_transaction = await Transaction.get(
+                db_session, id=transaction_id, profile=Transaction.LoadProfileEnum.FULL
+            )
+        except ObjectDoesNotExistError:
+            # archived transactions are final, they can't be refunded anymore
+            if await ArchivedTransaction.is_archived(db_session, transaction_id):
+                raise NotAvalableForRefundError
+            raise
 
         self.validate_transaction_for_refund(payment_transaction, user_id)
 
+        user_film = payment_transaction.user_film
+
         refund_transaction = await Transaction.create(
             db_session,
+            flush=True,
             user_id=user_id,
+            film_id=user_film.film_id,
             amount=payment_transaction.amount,
             type=Transaction.TypeEnum.REFUND,
             payment_type=payment_transaction.payment_type,
         )
+        user_film.transaction_id = refund_transaction.id
+
         refund_receipt = await Receipt.create(
-            db_session, transaction_id=refund_transaction.id
+            db_session, flush=True, transaction_id=refund_transaction.id
+        )
+        refund_receipt_items = await ReceiptItem.bulk_create(
+            db_session,
+            [
+                {
+                    "receipt_id": refund_receipt.id,
+                    "description": payment_receipt_item.description,
+                    "quantity": payment_receipt_item.quantity,
+                    "amount": payment_receipt_item.amount,
+                    "type": payment_receipt_item.type,
+                }
+                for payment_receipt_item in payment_transaction.receipt.items
+            ],
         )
 
-        refund_receipt_items = [
-            await ReceiptItem.create(
-                db_session,
-                receipt_id=refund_receipt.id,
-                description=payment_receipt_item.description,
-                quantity=payment_receipt_item.quantity,
-                amount=payment_receipt_item.amount,
-                type=payment_receipt_item.type,
-            )
-            for payment_receipt_item in payment_transaction.receipt.items
-        ]
-
-        refund_receipt.items = refund_receipt_items
-        refund_transaction.receipt = refund_receipt
-        refund_transaction.user_film = payment_transaction.user_film
-
-        await db_session.flush()
-
-        refund_receipt.transaction_id = refund_transaction.id
-
-        for refund_receipt_item in refund_receipt_items:
-            refund_receipt_item.receipt_id = refund_receipt.id
+        set_committed_value(refund_receipt, "items", refund_receipt_items)
+        set_committed_value(refund_transaction, "receipt", refund_receipt)
+        set_committed_value(refund_transaction, "user_film", user_film)
 
         valid_amount = (Decimal(refund_transaction.amount) / 100).quantize(
             Decimal(".01"), rounding=ROUND_HALF_UP
@@ -147,10 +174,17 @@ class PaymentsService:
         if transaction_data.status == StatusEnum.CANCELED:
             raise YookassaRefundError
 
+        # pending refunds are accounted by the notification of their final status
+        refund_transaction.ext_id = transaction_data.id
         refund_transaction.status = Transaction.StatusEnum(
             transaction_data.status.upper()
         )
-        payment_transaction.user_film.is_active = False
+        user_film.is_active = False
+        await user_film_cache.invalidate(user_id, user_film.film_id)
+
+        if refund_transaction.status == Transaction.StatusEnum.SUCCEEDED:
+            await RevenueAggregate.add(db_session, refund_transaction)
+        await recent_writes.mark(user_id)
 
         return refund_transaction
 
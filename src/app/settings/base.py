@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pydantic import (
     BaseSettings,
@@ -26,6 +27,8 @@ class SecuritySettings(BaseSettings):
     class JWTAuthSettings(BaseSettings):
         SECRET_KEY: str
         ALGORITHM: str
+        CACHE_SIZE: int = 10000
+        CACHE_MAX_TTL_SEC: int = 300
 
         class Config:
             env_prefix = "SECURITY_JWT_AUTH_"
@@ -107,6 +110,7 @@ class BaseDSNSettings(BaseSettings):
 
 
 class RedisSettings(BaseDSNSettings):
+    ENABLED: bool = False
     HOST: str
     PORT: int
     PROTOCOL: str = "redis"
@@ -123,12 +127,64 @@ class DatabaseSettings(BaseDSNSettings):
     PATH: str = Field(..., env="POSTGRES_DB")
     SCHEMA: str = "content"
     POOL_RECYCLE: int = 1800
+    POOL_SIZE: int = 5
+    POOL_MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT_SEC: int = 30
+    POOL_PRE_PING: bool = False
+    COMMAND_TIMEOUT_SEC: Optional[int] = None
+    REPLICA_DSNS: list[PostgresDsn] = []
+    REPLICA_CONNECT_TIMEOUT_SEC: int = 2
+    REPLICA_RETRY_AFTER_SEC: int = 30
+    READ_YOUR_WRITES_SEC: int = 10
+    # users marked in process if redis is disabled
+    READ_YOUR_WRITES_LOCAL_SIZE: int = 10000
+    PARTITIONS_MONTHS_AHEAD: int = 3
+    PARTITIONS_CHECK_INTERVAL_SEC: int = 6 * 60 * 60
     DSN: PostgresDsn = None
 
     class Config:
         env_prefix = "POSTGRES_"
 
 
+class PaginationSettings(BaseSettings):
+    COUNT_STRATEGY: str = "cached"
+    COUNT_CACHE_TTL_SEC: int = 30
+    # totals kept in process if redis is disabled
+    COUNT_CACHE_LOCAL_SIZE: int = 1024
+
+    class Config:
+        env_prefix = "PAGINATION_"
+
+
+class DeadlineSettings(BaseSettings):
+    BUDGET_SEC: float = 30
+    # callers may send a shorter timeout of the request in seconds
+    HEADER: str = "X-Request-Timeout"
+
+    class Config:
+        env_prefix = "DEADLINE_"
+
+
+class IdempotencySettings(BaseSettings):
+    IN_PROGRESS_TTL_SEC: int = 60
+    RESPONSE_TTL_SEC: int = 24 * 60 * 60
+    WAIT_TIMEOUT_SEC: float = 30
+    POLL_INTERVAL_SEC: float = 0.1
+    # keys kept in process if redis is disabled
+    LOCAL_SIZE: int = 10000
+
+    class Config:
+        env_prefix = "IDEMPOTENCY_"
+
+
+class UsersFilmsCacheSettings(BaseSettings):
+    TTL_SEC: int = 60
+    INVALIDATION_HOLD_SEC: int = 10
+
+    class Config:
+        env_prefix = "USERS_FILMS_CACHE_"
+
+
 class LoggingSettings(BaseSettings):
     JSON_ENABLED: bool = True
     FILES_ENABLED: bool = True
@@ -139,17 +195,54 @@ class LoggingSettings(BaseSettings):
         env_prefix = "LOGGING_"
 
 
-class AsyncAPIIntegrationSettings(BaseSettings):
+class ArchiveSettings(BaseSettings):
+    DIR: Path = Path("/code/shared", "archive")
+    AFTER_DAYS: int = 180
+    BATCH_SIZE: int = 1000
+
+    class Config:
+        env_prefix = "ARCHIVE_"
+
+
+class HttpClientSettings(BaseSettings):
+    """Connection pool, timeouts and failure handling settings of a http client."""
+
+    CONNECTOR_LIMIT: int = 100
+    # 0 means no limit
+    CONNECTOR_LIMIT_PER_HOST: int = 0
+    KEEPALIVE_TIMEOUT_SEC: float = 30
+    # None caches forever
+    DNS_CACHE_TTL_SEC: Optional[int] = 300
+    SSL_VERIFY: bool = True
+    TIMEOUT_SEC: float = 10
+    CONNECT_TIMEOUT_SEC: Optional[float] = 3
+    SOCK_READ_TIMEOUT_SEC: Optional[float] = None
+    # overrides by client method name, e.g. {"refund": {"total": 30}}
+    METHOD_TIMEOUTS: dict[str, dict[str, float]] = {}
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_FAILURE_WINDOW_SEC: float = 30
+    CIRCUIT_RECOVERY_SEC: float = 30
+    # share of requests which may be retried, the bucket allows bursts up to max
+    RETRY_BUDGET_RATIO: float = 0.1
+    RETRY_BUDGET_MAX_TOKENS: float = 10
+
+
+class AsyncAPIIntegrationSettings(HttpClientSettings):
     BASE_URL: AnyHttpUrl
-    TIMEOUT_SEC: int = 10
+    CACHE_TTL_SEC: int = 300
+    CACHE_STALE_SEC: int = 3600
+    # purchases charge the cached price, so they don't take older stale entries
+    CACHE_PURCHASE_STALE_SEC: int = 60
+    CACHE_NEGATIVE_TTL_SEC: int = 60
+    CACHE_LRU_SIZE: int = 1024
 
     class Config:
         env_prefix = "ASYNC_API_INTEGRATION_"
 
 
-class YookassaIntegrationSettings(BaseSettings):
+class YookassaIntegrationSettings(HttpClientSettings):
     BASE_URL: AnyHttpUrl
-    TIMEOUT_SEC: int = 10
     AUTH_USER: str
     AUTH_PASSWORD: str
     SECRET_KEY: str
@@ -173,6 +266,11 @@ class CommonSettings(BaseSettings):
     SENTRY: SentrySettings = SentrySettings()
     REDIS: RedisSettings = RedisSettings()
     DB: DatabaseSettings = DatabaseSettings()
+    PAGINATION: PaginationSettings = PaginationSettings()
+    IDEMPOTENCY: IdempotencySettings = IdempotencySettings()
+    DEADLINE: DeadlineSettings = DeadlineSettings()
+    USERS_FILMS_CACHE: UsersFilmsCacheSettings = UsersFilmsCacheSettings()
     LOGS: LoggingSettings = LoggingSettings()
+    ARCHIVE: ArchiveSettings = ArchiveSettings()
     ASYNC_API_INTEGRATION: AsyncAPIIntegrationSettings = AsyncAPIIntegrationSettings()
     YOOKASSA_INTEGRATION: YookassaIntegrationSettings = YookassaIntegrationSettings()
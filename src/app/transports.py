@@ -1,25 +1,113 @@
 import asyncio
-import json
+import ssl
+import threading
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
 from logging import getLogger
 from types import SimpleNamespace
-from typing import Any, Union, Optional, Type, Sequence
+from typing import Any, Union, Optional, Type
 
 import aiohttp
 import backoff
+import orjson
 from pydantic.json import pydantic_encoder
 
+from app import deadline
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.settings import settings
+from app.settings.base import HttpClientSettings
 
 logger = getLogger(__name__)
 
+# one context for all connections, so certificates are loaded once
+SSL_CONTEXT = ssl.create_default_context()
+
 
 class BaseTransportError(Exception):
     status: Optional[int] = None
     message: str = ""
 
+    def __init__(self, status: Optional[int] = None, message: Any = "") -> None:
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+
+@dataclass(frozen=True)
+class RequestTimeout:
+    """Timeouts of a request in seconds, None disables the timeout."""
+
+    total: Optional[float]
+    connect: Optional[float] = None
+    sock_read: Optional[float] = None
+
+    @classmethod
+    def from_settings(
+        cls, client_settings: HttpClientSettings, method: str
+    ) -> "RequestTimeout":
+        return cls(
+            **{
+                "total": client_settings.TIMEOUT_SEC,
+                "connect": client_settings.CONNECT_TIMEOUT_SEC,
+                "sock_read": client_settings.SOCK_READ_TIMEOUT_SEC,
+                **client_settings.METHOD_TIMEOUTS.get(method, {}),
+            }
+        )
+
+    def within(self, seconds: float) -> "RequestTimeout":
+        """Returns the timeout with total cut to the given seconds."""
+        if self.total is not None and self.total <= seconds:
+            return self
+
+        return replace(self, total=seconds)
+
+
+class RetryBudget:
+    """
+    Token bucket which limits retries to a fraction of requests. Every request
+    adds ratio tokens and every retry takes one, so retries can't multiply the
+    load on a failing upstream. Kept in process.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def can_retry(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                return True
+
+            self.denied += 1
+
+        return False
+
+    def spend(self) -> None:
+        with self._lock:
+            self.tokens -= 1
+            self.retries += 1
+
+    def pop(self) -> tuple[int, int]:
+        """Returns retries and denied retries counts since last call."""
+        with self._lock:
+            retries, denied = self.retries, self.denied
+            self.retries, self.denied = 0, 0
+
+        return retries, denied
+
 
 class AbstractHttpTransport(ABC):  # pragma: no cover
+    circuit_breaker: Optional[CircuitBreaker] = None
+    retry_budget: Optional[RetryBudget] = None
+
     @abstractmethod
     async def startup(self) -> None:
         pass
@@ -30,8 +118,9 @@ class AbstractHttpTransport(ABC):  # pragma: no cover
     ) -> None:
         pass
 
+    @property
     @abstractmethod
-    def backoff_exc(self) -> Union[Type[Exception], Sequence[Type[Exception]]]:
+    def backoff_exc(self) -> tuple[Type[Exception], ...]:
         pass
 
     @abstractmethod
@@ -39,23 +128,133 @@ class AbstractHttpTransport(ABC):  # pragma: no cover
         pass
 
     async def request(self, *args, **kwargs):
-        return await backoff.on_exception(
-            wait_gen=backoff.expo,
-            max_time=settings.BACKOFF.MAX_TIME_SEC,
-            exception=self.backoff_exc,
-        )(self._request)(*args, **kwargs)
+        """
+        Retries the request until it succeeds, but no longer than the backoff max
+        time or the request deadline, and only while the retry budget allows.
+        """
+        max_time = settings.BACKOFF.MAX_TIME_SEC
+        remaining = deadline.remaining()
+
+        if remaining is not None:
+            max_time = min(max_time, remaining)
+
+        if self.retry_budget:
+            self.retry_budget.deposit()
+
+        try:
+            return await backoff.on_exception(
+                wait_gen=backoff.expo,
+                max_time=max_time,
+                exception=self.backoff_exc,
+                giveup=self._giveup,
+                on_backoff=self._on_backoff,
+            )(self._call)(*args, **kwargs)
+        except self.backoff_exc as err:
+            raise BaseTransportError(message=repr(err)) from err
+        except CircuitOpenError as err:
+            raise BaseTransportError(message=f"Circuit {err} is open") from err
+        except deadline.DeadlineExceededError as err:
+            raise BaseTransportError(message="Deadline exceeded") from err
+
+    def _giveup(self, err: Exception) -> bool:
+        return self.retry_budget is not None and not self.retry_budget.can_retry()
+
+    def _on_backoff(self, details: dict[str, Any]) -> None:
+        if self.retry_budget:
+            self.retry_budget.spend()
+
+    async def _call(self, *args, **kwargs):
+        """Makes a single attempt of the request through the circuit breaker."""
+        remaining = deadline.remaining()
+
+        if remaining is not None and remaining <= 0:
+            raise deadline.DeadlineExceededError
+
+        if not self.circuit_breaker:
+            return await self._request(*args, **kwargs)
+
+        trial = await self.circuit_breaker.allow()
+
+        try:
+            result = await self._request(*args, **kwargs)
+        except BaseTransportError as err:
+            # client errors mean that the upstream is alive
+            if err.status is None or err.status >= 500:
+                await self.circuit_breaker.record_failure(trial)
+            else:
+                await self.circuit_breaker.record_success(trial)
+            raise
+        except self.backoff_exc:
+            await self.circuit_breaker.record_failure(trial)
+            raise
+
+        await self.circuit_breaker.record_success(trial)
+
+        return result
+
+
+class ConnectionStats:
+    """
+    Counts how often requests get a new connection instead of a pooled one, and
+    how often they time out.
+    """
+
+    names = ("created", "reused", "dns_cache_hits", "dns_cache_misses", "timeouts")
+
+    def __init__(self) -> None:
+        self.created = 0
+        self.reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def inc(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def pop(self) -> dict[str, int]:
+        """Returns counters since last call."""
+        with self._lock:
+            stats = {name: getattr(self, name) for name in self.names}
+
+            for name in self.names:
+                setattr(self, name, 0)
+
+        return stats
 
 
 class AiohttpTransport(AbstractHttpTransport):
-    backoff_exc: tuple[Exception, ...] = (
+    backoff_exc: tuple[Type[Exception], ...] = (
         aiohttp.ClientConnectionError,
         asyncio.TimeoutError,
     )
+    # all created transports, to collect their metrics
+    instances: list["AiohttpTransport"] = []
 
-    def __init__(self) -> None:
+    def __init__(
+        self, name: str, client_settings: Optional[HttpClientSettings] = None
+    ) -> None:
+        self.name = name
+        self.client_settings = client_settings or HttpClientSettings()
         self.session: Optional[aiohttp.ClientSession] = None
+        self.connection_stats = ConnectionStats()
         self._auth: Optional[aiohttp.BasicAuth] = None
 
+        self.retry_budget = RetryBudget(
+            ratio=self.client_settings.RETRY_BUDGET_RATIO,
+            max_tokens=self.client_settings.RETRY_BUDGET_MAX_TOKENS,
+        )
+
+        if self.client_settings.CIRCUIT_BREAKER_ENABLED:
+            self.circuit_breaker = CircuitBreaker(
+                name,
+                failure_threshold=self.client_settings.CIRCUIT_FAILURE_THRESHOLD,
+                failure_window_sec=self.client_settings.CIRCUIT_FAILURE_WINDOW_SEC,
+                recovery_sec=self.client_settings.CIRCUIT_RECOVERY_SEC,
+            )
+        self.instances.append(self)
+
     @property
     def auth(self) -> Optional[aiohttp.BasicAuth]:
         return self._auth
@@ -69,9 +268,24 @@ class AiohttpTransport(AbstractHttpTransport):
         trace_config.on_request_start.append(self.on_request_start)
         trace_config.on_request_end.append(self.on_request_end)
         trace_config.on_request_exception.append(self.on_request_exception)
+        trace_config.on_connection_create_end.append(self._count_connection("created"))
+        trace_config.on_connection_reuseconn.append(self._count_connection("reused"))
+        trace_config.on_dns_cache_hit.append(self._count_connection("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(
+            self._count_connection("dns_cache_misses")
+        )
+
+        connector = aiohttp.TCPConnector(
+            limit=self.client_settings.CONNECTOR_LIMIT,
+            limit_per_host=self.client_settings.CONNECTOR_LIMIT_PER_HOST,
+            keepalive_timeout=self.client_settings.KEEPALIVE_TIMEOUT_SEC,
+            use_dns_cache=True,
+            ttl_dns_cache=self.client_settings.DNS_CACHE_TTL_SEC,
+            ssl=SSL_CONTEXT if self.client_settings.SSL_VERIFY else False,
+        )
 
         self.session = aiohttp.ClientSession(
-            json_serialize=lambda data: json.dumps(data, default=pydantic_encoder),
+            connector=connector,
             trace_configs=[trace_config],
         )
 
@@ -79,19 +293,73 @@ class AiohttpTransport(AbstractHttpTransport):
         if self.session:
             await self.session.close()
 
-    async def _request(self, *args, **kwargs) -> Union[dict[str, Any], str]:
-        async with self.session.request(*args, **kwargs, auth=self.auth) as response:
-            if response.content_type == "application/json":
-                data = await response.json()
-            else:
-                data = await response.text()
+    async def _request(
+        self,
+        *args,
+        timeout: Optional[RequestTimeout] = None,
+        json: Any = None,
+        raw: bool = False,
+        **kwargs,
+    ) -> Union[dict[str, Any], str, bytes]:
+        """
+        Encodes json with orjson and reads the response body once. Returns the
+        body bytes if raw, so the caller can validate them straight into a schema,
+        otherwise decoded JSON or text depending on the content type.
+        """
+        if timeout is None:
+            timeout = RequestTimeout.from_settings(self.client_settings, "")
+
+        remaining = deadline.remaining()
+
+        if remaining is not None:
+            timeout = timeout.within(remaining)
+
+        client_timeout = aiohttp.ClientTimeout(
+            total=timeout.total,
+            sock_connect=timeout.connect,
+            sock_read=timeout.sock_read,
+        )
+
+        if json is not None:
+            kwargs["data"] = orjson.dumps(json, default=pydantic_encoder)
+            kwargs["headers"] = {
+                "Content-Type": "application/json",
+                **(kwargs.get("headers") or {}),
+            }
+
+        try:
+            async with self.session.request(
+                *args, **kwargs, timeout=client_timeout, auth=self.auth
+            ) as response:
+                body = await response.read()
+
+                if response.status >= 400:
+                    raise BaseTransportError(
+                        response.status, self._decode(response, body)
+                    )
+
+                return body if raw else self._decode(response, body)
+        except asyncio.TimeoutError:
+            self.connection_stats.inc("timeouts")
+            raise
+
+    @staticmethod
+    def _decode(
+        response: aiohttp.ClientResponse, body: bytes
+    ) -> Union[dict[str, Any], str]:
+        if response.content_type != "application/json":
+            return body.decode(response.get_encoding(), errors="replace")
+
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as err:
+            raise BaseTransportError(response.status, f"Invalid JSON: {err}") from err
 
-            try:
-                response.raise_for_status()
-            except aiohttp.ClientResponseError as err:
-                raise BaseTransportError(err.status, data)
+    def _count_connection(self, name: str):
+        async def callback(session, trace_config_ctx, params) -> None:
+            self.connection_stats.inc(name)
 
-            return data
+        return callback
 
     async def on_request_start(
         self,
@@ -0,0 +1,87 @@
+"""
+Compares the JWT auth dependency with and without the decoded claims cache:
+
+    python -m benchmarks.auth --tokens 100 --repeat 10000
+"""
+import asyncio
+import time
+import uuid
+from statistics import mean
+
+import typer
+from jose import jwt
+
+import app.main  # noqa: F401 app.api modules import the app, it must go first
+from app.api.dependencies.auth import decode_jwt
+from app.security import _decode_jwt_token, token_cache
+from app.settings import settings
+
+typer_app = typer.Typer()
+
+
+def make_tokens(qty: int) -> list[str]:
+    return [
+        jwt.encode(
+            {
+                "user_id": str(uuid.uuid4()),
+                "login": "login",
+                "email": "user@example.com",
+                "roles": ["subscriber"],
+                "exp": int(time.time()) + 3600,
+            },
+            settings.SECURITY.JWT_AUTH.SECRET_KEY,
+            algorithm=settings.SECURITY.JWT_AUTH.ALGORITHM,
+        )
+        for _ in range(qty)
+    ]
+
+
+async def decode_uncached(token: str) -> None:
+    # the dependency as it was before the cache
+    _decode_jwt_token(token)
+
+
+async def decode_cache_miss(token: str) -> None:
+    token_cache.clear()
+    await decode_jwt(token)
+
+
+async def decode_cache_hit(token: str) -> None:
+    await decode_jwt(token)
+
+
+async def measure(decode, tokens: list[str], repeat: int) -> float:
+    timings = []
+
+    for i in range(repeat):
+        token = tokens[i % len(tokens)]
+
+        started_at = time.perf_counter()
+        await decode(token)
+        timings.append((time.perf_counter() - started_at) * 1_000_000)
+
+    return mean(timings)
+
+
+async def run(tokens_qty: int, repeat: int) -> None:
+    tokens = make_tokens(tokens_qty)
+
+    typer.echo(f"{'case':<12}{'avg us':>10}")
+
+    for name, decode in (
+        ("uncached", decode_uncached),
+        ("cache miss", decode_cache_miss),
+        ("cache hit", decode_cache_hit),
+    ):
+        token_cache.clear()
+        avg_us = await measure(decode, tokens, repeat)
+        typer.echo(f"{name:<12}{avg_us:>10.2f}")
+
+
+@typer_app.command()
+def main(tokens: int = 100, repeat: int = 10000) -> None:
+    asyncio.run(run(tokens, repeat))
+
+
+if __name__ == "__main__":
+    typer_app()
@@ -0,0 +1,140 @@
+"""
+Compares the stdlib json and orjson codecs of http transports on Yookassa payloads:
+
+    python -m benchmarks.codec --repeat 10000
+"""
+import json
+import time
+import uuid
+from decimal import Decimal
+from statistics import mean
+from typing import Any, Callable
+
+import orjson
+import typer
+from pydantic.json import pydantic_encoder
+
+import app.main  # noqa: F401 app.api modules import the app, it must go first
+from app.api.public.v1.schemas import PaymentObjectSchema
+from app.integrations.yookassa.schemas import YookassaPaymentResponseSchema
+
+typer_app = typer.Typer()
+
+
+def make_payment(payment_id: str) -> dict[str, Any]:
+    return {
+        "id": payment_id,
+        "status": "succeeded",
+        "paid": True,
+        "amount": {"value": "600.00", "currency": "RUB"},
+        "confirmation": {
+            "type": "redirect",
+            "confirmation_url": "https://yoomoney.ru/api-pages/v2/payment-confirm/"
+            f"epl?orderId={payment_id}",
+        },
+        "authorization_details": {
+            "rrn": "10000000000",
+            "auth_code": "000000",
+            "three_d_secure": {"applied": True},
+        },
+        "captured_at": "2018-05-03T10:17:31.487Z",
+        "created_at": "2018-05-03T10:17:09.337Z",
+        "description": "Film purchase",
+        "metadata": {},
+        "payment_method": {
+            "type": "bank_card",
+            "id": payment_id,
+            "saved": False,
+            "card": {
+                "first6": "411111",
+                "last4": "1111",
+                "expiry_month": "01",
+                "expiry_year": "2020",
+                "card_type": "Visa",
+                "issuer_country": "RU",
+                "issuer_name": "Sberbank",
+            },
+            "title": "Bank card *1111",
+        },
+        "receipt_registration": "pending",
+        "recipient": {"account_id": "100500", "gateway_id": "100700"},
+        "refundable": True,
+        "refunded_amount": {"value": "600.00", "currency": "RUB"},
+        "test": False,
+    }
+
+
+def make_refund_request() -> dict[str, Any]:
+    return {
+        "amount": {"value": Decimal("600.00"), "currency": "RUB"},
+        "payment_id": uuid.uuid4(),
+    }
+
+
+def measure(func: Callable[[Any], Any], payloads: list[Any], repeat: int) -> float:
+    timings = []
+
+    for i in range(repeat):
+        payload = payloads[i % len(payloads)]
+
+        started_at = time.perf_counter()
+        func(payload)
+        timings.append((time.perf_counter() - started_at) * 1_000_000)
+
+    return mean(timings)
+
+
+def run(payloads_qty: int, repeat: int) -> None:
+    bodies = [
+        orjson.dumps(make_payment(str(uuid.uuid4()))) for _ in range(payloads_qty)
+    ]
+    requests = [make_refund_request() for _ in range(payloads_qty)]
+
+    cases = (
+        # the transport as it was: response.json() and validation of the dict
+        (
+            "decode json + dict",
+            bodies,
+            lambda body: YookassaPaymentResponseSchema(**json.loads(body.decode())),
+        ),
+        (
+            "decode orjson + dict",
+            bodies,
+            lambda body: YookassaPaymentResponseSchema(**orjson.loads(body)),
+        ),
+        (
+            "decode parse_raw",
+            bodies,
+            lambda body: YookassaPaymentResponseSchema.parse_raw(body),
+        ),
+        (
+            "decode parse_raw small",
+            bodies,
+            lambda body: PaymentObjectSchema.parse_raw(body),
+        ),
+        (
+            "encode json",
+            requests,
+            lambda data: json.dumps(data, default=pydantic_encoder).encode(),
+        ),
+        (
+            "encode orjson",
+            requests,
+            lambda data: orjson.dumps(data, default=pydantic_encoder),
+        ),
+    )
+
+    typer.echo(f"{'case':<24}{'avg us':>10}")
+
+    for name, payloads, func in cases:
+        avg_us = measure(func, payloads, repeat)
+        typer.echo(f"{name:<24}{avg_us:>10.2f}")
+
+
+@typer_app.command()
+def main(payloads: int = 100, repeat: int = 10000) -> None:
+    run(payloads, repeat)
+
+
+if __name__ == "__main__":
+    typer_app()
@@ -0,0 +1,177 @@
+"""
+Compares Transaction load profiles on a seeded database.
+
+Seeds transactions with receipts, receipt items and users films inside a transaction
+which is rolled back at the end, so it can be pointed to any migrated database:
+
+    python -m benchmarks.load_profiles --transactions 10000 --items 3
+"""
+import asyncio
+import time
+import uuid
+from decimal import Decimal
+from statistics import mean
+from typing import Any
+
+import sqlalchemy as sa
+import typer
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import joinedload
+
+from app.models import Transaction, Receipt, ReceiptItem, UserFilm
+from app.settings import settings
+
+typer_app = typer.Typer()
+
+LEGACY_JOINED = "legacy_joined"
+
+
+class RowsCounter:
+    def __init__(self) -> None:
+        self.statements = 0
+        self.rows = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        self.rows += len(getattr(cursor, "_rows", None) or [])
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.rows = 0
+
+
+def get_options(profile: str) -> list:
+    if profile == LEGACY_JOINED:
+        # The graph which was configured by lazy="joined" on the relationships.
+        return [
+            joinedload(Transaction.receipt).joinedload(Receipt.items),
+            joinedload(Transaction.receipt).joinedload(Receipt.transactions),
+            joinedload(Transaction.user_film),
+        ]
+
+    return Transaction.load_options(Transaction.LoadProfileEnum(profile))
+
+
+async def seed(session: AsyncSession, transactions_qty: int, items_qty: int) -> list:
+    user_id = uuid.uuid4()
+    transactions: list[dict[str, Any]] = []
+    receipts: list[dict[str, Any]] = []
+    receipt_items: list[dict[str, Any]] = []
+    users_films: list[dict[str, Any]] = []
+
+    for _ in range(transactions_qty):
+        transaction_id, receipt_id = uuid.uuid4(), uuid.uuid4()
+        transactions.append(
+            {
+                "id": transaction_id,
+                "ext_id": uuid.uuid4(),
+                "user_id": user_id,
+                "amount": Decimal(300),
+                "type": Transaction.TypeEnum.PAYMENT,
+                "status": Transaction.StatusEnum.SUCCEEDED,
+                "payment_type": Transaction.PaymentType.CARD,
+            }
+        )
+        receipts.append({"id": receipt_id, "transaction_id": transaction_id})
+        receipt_items.extend(
+            {
+                "id": uuid.uuid4(),
+                "receipt_id": receipt_id,
+                "description": "film",
+                "quantity": Decimal(1),
+                "amount": Decimal(100),
+                "type": ReceiptItem.TypeEnum.FILM,
+            }
+            for _ in range(items_qty)
+        )
+        users_films.append(
+            {
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "film_id": uuid.uuid4(),
+                "transaction_id": transaction_id,
+            }
+        )
+
+    for model, values in (
+        (Transaction, transactions),
+        (Receipt, receipts),
+        (ReceiptItem, receipt_items),
+        (UserFilm, users_films),
+    ):
+        await session.execute(sa.insert(model), values)
+
+    return [transaction["id"] for transaction in transactions]
+
+
+async def measure(session: AsyncSession, counter: RowsCounter, stmt, repeat: int):
+    timings = []
+
+    for _ in range(repeat):
+        session.expunge_all()
+        counter.reset()
+
+        started_at = time.perf_counter()
+        result = await session.execute(stmt)
+        result.scalars().unique().all()
+        timings.append((time.perf_counter() - started_at) * 1000)
+
+    return counter.statements, counter.rows, mean(timings)
+
+
+async def run(transactions_qty: int, items_qty: int, limit: int, repeat: int) -> None:
+    engine = create_async_engine(settings.DB.DSN)
+    counter = RowsCounter()
+
+    async with engine.connect() as connection:
+        trans = await connection.begin()
+        session = AsyncSession(bind=connection)
+
+        try:
+            ids = await seed(session, transactions_qty, items_qty)
+            sa.event.listen(engine.sync_engine, "after_cursor_execute", counter)
+
+            typer.echo(
+                f"{'profile':<16}{'query':<6}{'stmts':>6}{'rows':>8}{'avg ms':>10}"
+            )
+
+            for profile in [LEGACY_JOINED, *Transaction.LoadProfileEnum]:
+                options = get_options(profile)
+                queries = {
+                    "get": sa.select(Transaction)
+                    .where(Transaction.id == ids[0])
+                    .options(*options),
+                    "list": sa.select(Transaction)
+                    .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+                    .limit(limit)
+                    .options(*options),
+                }
+
+                for name, stmt in queries.items():
+                    statements, rows, avg_ms = await measure(
+                        session, counter, stmt, repeat
+                    )
+                    typer.echo(
+                        f"{getattr(profile, 'value', profile):<16}{name:<6}"
+                        f"{statements:>6}{rows:>8}{avg_ms:>10.2f}"
+                    )
+        finally:
+            sa.event.remove(engine.sync_engine, "after_cursor_execute", counter)
+            await session.close()
+            await trans.rollback()
+
+    await engine.dispose()
+
+
+@typer_app.command()
+def main(
+    transactions: int = 10000,
+    items: int = 3,
+    limit: int = 50,
+    repeat: int = 20,
+) -> None:
+    asyncio.run(run(transactions, items, limit, repeat))
+
+
+if __name__ == "__main__":
+    typer_app()
@@ -1,11 +1,16 @@
 import asyncio
+from datetime import datetime, timedelta
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 
 import typer
 import uvicorn
 from IPython import embed
 
+from app.database import session_scope
+from app.models import RevenueAggregate
+from app.partitions import create_future_partitions
+from app.services.archive.service import archive_service
 from app.settings import settings
 
 typer_app = typer.Typer()
@@ -29,5 +34,63 @@ def runserver():
     uvicorn.run(**settings.UVICORN.dict())
 
 
+@typer_app.command()
+@coro
+async def rebuild_revenue(
+    date_from: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"]),
+    date_to: Optional[datetime] = typer.Option(None, formats=["%Y-%m-%d"]),
+):
+    """
+    Recalculate revenue aggregates from transactions, for all days by default.
+    Archived days are kept as they are.
+    """
+    async with session_scope() as session:
+        rows = await RevenueAggregate.rebuild(
+            session,
+            date_from=date_from.date() if date_from else None,
+            date_to=date_to.date() if date_to else None,
+        )
+
+    typer.echo(f"Rebuilt {rows} revenue aggregates")
+
+
+@typer_app.command()
+@coro
+async def create_partitions(
+    months_ahead: int = typer.Option(settings.DB.PARTITIONS_MONTHS_AHEAD),
+):
+    """Create monthly partitions ahead. Schedule it at least monthly."""
+    created = await create_future_partitions(months_ahead)
+
+    typer.echo(f"Created {created} partitions")
+
+
+@typer_app.command()
+@coro
+async def archive(
+    older_than_days: int = typer.Option(settings.ARCHIVE.AFTER_DAYS),
+    batch_size: int = typer.Option(settings.ARCHIVE.BATCH_SIZE),
+):
+    """
+    Move final transactions older than older_than_days with receipts and items to
+    the archive, committing every batch.
+    """
+    older_than = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+
+    while True:
+        async with session_scope() as session:
+            archived = await archive_service.archive_batch(
+                session, older_than, batch_size
+            )
+
+        if not archived:
+            break
+
+        total += archived
+
+    typer.echo(f"Archived {total} transactions")
+
+
 if __name__ == "__main__":
     typer_app()
@@ -12,7 +12,8 @@ from sqlalchemy.orm import sessionmaker
 
 from app.main import app
 from app.settings import settings
-from tests.functional.utils import fake, create_database, drop_database
+from app.transports import AiohttpTransport
+from tests.functional.utils import FakeRedis, fake, create_database, drop_database
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -85,3 +86,16 @@ async def db_session(mocker: MockerFixture, sqla_engine):
         await session.close()
         await trans.rollback()
         await connection.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers() -> None:
+    for transport in AiohttpTransport.instances:
+        if transport.circuit_breaker:
+            transport.circuit_breaker.reset()
+
+
+@pytest.fixture
+def fake_redis(mocker: MockerFixture) -> FakeRedis:
+    """Enables redis of user film cache."""
+    return mocker.patch("app.cache.redis_client", FakeRedis())
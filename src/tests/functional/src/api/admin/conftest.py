@@ -3,6 +3,8 @@ from typing import Any
 import pytest
 from jose import jwt
 
+from app.api.pagination import count_cache
+from app.cache import LRUCache
 from app.settings import settings
 from tests.functional.utils import fake
 
@@ -27,3 +29,8 @@ def valid_admin_token(valid_admin_payload) -> str:
     )
 
     return f"Bearer {token}"
+
+
+@pytest.fixture(autouse=True)
+def clear_count_cache(mocker) -> None:
+    mocker.patch.object(count_cache, "_local", LRUCache(maxsize=16))
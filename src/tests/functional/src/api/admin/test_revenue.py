@@ -0,0 +1,103 @@
+import http
+from datetime import date
+from typing import Any
+
+import pytest
+from furl import furl
+
+from app.models import RevenueAggregate, Transaction
+from tests.functional.utils import fake
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def film_id() -> str:
+    return fake.cryptographic.uuid()
+
+
+@pytest.fixture
+def revenue(db_session, film_id) -> list[RevenueAggregate]:
+    revenue = [
+        RevenueAggregate(
+            day=day,
+            film_id=film_id,
+            payment_type=payment_type,
+            payments_count=2,
+            payments_amount=800,
+            refunds_count=1,
+            refunds_amount=300,
+        )
+        for day in (date(2022, 8, 1), date(2022, 8, 2))
+        for payment_type in (Transaction.PaymentType.CARD, Transaction.PaymentType.QR)
+    ]
+    db_session.add_all(revenue)
+
+    return revenue
+
+
+@pytest.fixture
+def valid_headers(valid_admin_token) -> dict[str, Any]:
+    return {"Authorization": valid_admin_token}
+
+
+async def test_by_day(client, revenue, film_id, valid_headers) -> None:
+    response = await client.get(
+        path=furl("/api/admin/v1/revenue").add({"film_id": film_id}).url,
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json() == [
+        {
+            "day": day,
+            "film_id": None,
+            "payment_type": None,
+            "payments_count": 4,
+            "payments_amount": 1600,
+            "refunds_count": 2,
+            "refunds_amount": 600,
+            "net_amount": 1000,
+        }
+        for day in ("2022-08-01", "2022-08-02")
+    ]
+
+
+async def test_by_film_and_payment_type(
+    client, revenue, film_id, valid_headers
+) -> None:
+    response = await client.get(
+        path=furl("/api/admin/v1/revenue")
+        .add(
+            {
+                "film_id": film_id,
+                "group_by": ["film", "payment_type"],
+                "payment_type": Transaction.PaymentType.QR.value,
+                "date_from": "2022-08-02",
+            }
+        )
+        .url,
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json() == [
+        {
+            "day": None,
+            "film_id": film_id,
+            "payment_type": Transaction.PaymentType.QR.value,
+            "payments_count": 2,
+            "payments_amount": 800,
+            "refunds_count": 1,
+            "refunds_amount": 300,
+            "net_amount": 500,
+        }
+    ]
+
+
+async def test_forbidden(client, valid_jwt_token) -> None:
+    response = await client.get(
+        path="/api/admin/v1/revenue", headers={"Authorization": valid_jwt_token}
+    )
+
+    assert response.status_code == http.HTTPStatus.FORBIDDEN
@@ -1,10 +1,17 @@
+import csv
 import http
+import io
+from datetime import datetime, timedelta
 from typing import Any
 from unittest.mock import ANY
 
+import orjson
 import pytest
+import sqlalchemy as sa
 from furl import furl
 
+from app.api.errors import INVALID_CURSOR
+from app.models import Receipt, ReceiptItem, Transaction, UserFilm
 from tests.functional.src.api.utils import LIMIT_QTY, TRANSACTIONS_QTY, OFFSET_NUM
 
 pytestmark = pytest.mark.asyncio
@@ -96,3 +103,209 @@ async def test_forbidden(
     )
 
     assert response.status_code == http.HTTPStatus.FORBIDDEN
+
+
+async def test_count_estimated(
+    client, path, receipt_items, users_films, valid_headers
+) -> None:
+    response = await client.get(
+        path=furl(path).add({"count": "estimated"}).url, headers=valid_headers
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert len(response.json()["items"]) == LIMIT_QTY
+    assert isinstance(response.json()["total"], int)
+
+
+async def test_count_cached(
+    client, path, db_session, receipt_items, users_films, valid_headers
+) -> None:
+    response = await client.get(
+        path=furl(path).add({"count": "cached"}).url, headers=valid_headers
+    )
+    assert response.json()["total"] == TRANSACTIONS_QTY
+
+    await db_session.execute(sa.delete(ReceiptItem))
+    await db_session.execute(sa.delete(UserFilm))
+    await db_session.execute(sa.delete(Receipt))
+    await db_session.execute(sa.delete(Transaction))
+    response = await client.get(
+        path=furl(path).add({"count": "cached"}).url, headers=valid_headers
+    )
+    assert response.json()["total"] == TRANSACTIONS_QTY
+
+    response = await client.get(
+        path=furl(path).add({"count": "exact"}).url, headers=valid_headers
+    )
+    assert response.json()["total"] == 0
+
+
+@pytest.fixture
+def cursor_path() -> str:
+    return furl("/api/admin/v1/transactions/cursor").add({"limit": LIMIT_QTY}).url
+
+
+async def test_cursor_ok(
+    client, cursor_path, receipt_items, users_films, valid_headers
+) -> None:
+    response = await client.get(path=cursor_path, headers=valid_headers)
+
+    assert response.status_code == http.HTTPStatus.OK
+    first_page = response.json()
+    assert len(first_page["items"]) == LIMIT_QTY
+    assert first_page["limit"] == LIMIT_QTY
+    assert first_page["next_cursor"]
+    assert "total" not in first_page
+
+    response = await client.get(
+        path=furl(cursor_path).add({"cursor": first_page["next_cursor"]}).url,
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    second_page = response.json()
+    assert len(second_page["items"]) == TRANSACTIONS_QTY - LIMIT_QTY
+    assert second_page["next_cursor"] is None
+
+    first_ids = {item["id"] for item in first_page["items"]}
+    second_ids = {item["id"] for item in second_page["items"]}
+    assert not first_ids & second_ids
+
+
+async def test_cursor_invalid(client, cursor_path, valid_headers) -> None:
+    response = await client.get(
+        path=furl(cursor_path).add({"cursor": "invalid"}).url,
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert response.json()["detail"] == INVALID_CURSOR
+
+
+@pytest.fixture
+def list_path() -> str:
+    return furl("/api/admin/v1/transactions").add({"limit": TRANSACTIONS_QTY}).url
+
+
+async def test_filter_by_status(
+    client, list_path, transactions, receipt_items, users_films, valid_headers
+) -> None:
+    statuses = [Transaction.StatusEnum.SUCCEEDED, Transaction.StatusEnum.CANCELED]
+    response = await client.get(
+        path=furl(list_path).add({"status": [s.value for s in statuses]}).url,
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    expected_ids = {str(t.id) for t in transactions if t.status in statuses}
+    assert {item["id"] for item in response.json()["items"]} == expected_ids
+    assert response.json()["total"] == len(expected_ids)
+
+
+async def test_filter_by_user_and_amount(
+    client, list_path, transactions, receipt_items, users_films, valid_headers
+) -> None:
+    transaction = transactions[0]
+    response = await client.get(
+        path=furl(list_path)
+        .add(
+            {
+                "user_id": str(transaction.user_id),
+                "amount_from": transaction.amount,
+                "amount_to": transaction.amount,
+            }
+        )
+        .url,
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert [item["id"] for item in response.json()["items"]] == [str(transaction.id)]
+
+
+async def test_filter_by_created_range(
+    client, receipt_items, users_films, valid_headers
+) -> None:
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    response = await client.get(
+        path="/api/admin/v1/transactions",
+        query_string={"created_from": tomorrow},
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json()["items"] == []
+
+    response = await client.get(
+        path="/api/admin/v1/transactions",
+        query_string={"created_to": tomorrow},
+        headers=valid_headers,
+    )
+
+    assert response.json()["total"] == TRANSACTIONS_QTY
+
+
+async def test_sort_by_amount(
+    client, list_path, receipt_items, users_films, valid_headers
+) -> None:
+    response = await client.get(
+        path=furl(list_path).add({"sort": "amount"}).url, headers=valid_headers
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    amounts = [item["amount"] for item in response.json()["items"]]
+    assert amounts == sorted(amounts)
+
+
+async def test_cursor_sort_by_amount_desc(
+    client, receipt_items, users_films, valid_headers
+) -> None:
+    path = "/api/admin/v1/transactions/cursor"
+    query_string = {"limit": LIMIT_QTY, "sort": "-amount"}
+    response = await client.get(
+        path=path, query_string=query_string, headers=valid_headers
+    )
+    first_page = response.json()
+
+    response = await client.get(
+        path=path,
+        query_string={**query_string, "cursor": first_page["next_cursor"]},
+        headers=valid_headers,
+    )
+    second_page = response.json()
+
+    assert response.status_code == http.HTTPStatus.OK
+    amounts = [item["amount"] for item in first_page["items"] + second_page["items"]]
+    assert len(amounts) == TRANSACTIONS_QTY
+    assert amounts == sorted(amounts, reverse=True)
+
+
+async def test_export_csv(client, db_session, transactions, valid_headers) -> None:
+    await db_session.flush()
+    response = await client.get(
+        path="/api/admin/v1/transactions/export", headers=valid_headers
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert {row["id"] for row in rows} == {str(t.id) for t in transactions}
+    assert {row["status"] for row in rows} <= {s.value for s in Transaction.StatusEnum}
+
+
+async def test_export_ndjson_filtered(
+    client, db_session, transactions, valid_headers
+) -> None:
+    await db_session.flush()
+    transaction = transactions[0]
+    response = await client.get(
+        path=furl("/api/admin/v1/transactions/export")
+        .add({"format": "ndjson", "user_id": str(transaction.user_id)})
+        .url,
+        headers=valid_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    rows = [orjson.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [str(transaction.id)]
+    assert rows[0]["type"] == transaction.type.value
@@ -2,9 +2,11 @@ import http
 from unittest.mock import ANY
 
 import pytest
+import sqlalchemy as sa
 
 from app.api.errors import USER_FILM_NOT_FOUND
 from app.main import app
+from app.models import UserFilm
 from tests.functional.utils import fake
 
 pytestmark = pytest.mark.asyncio
@@ -40,3 +42,52 @@ async def test_not_found(client) -> None:
     )
     assert response.status_code == http.HTTPStatus.BAD_REQUEST, response.text
     assert response.json()["detail"] == USER_FILM_NOT_FOUND
+
+
+async def test_cached(
+    db_session, client, fake_redis, user_film, user_id, film_id
+) -> None:
+    path = app.url_path_for(name="retrieve", user_id=user_id, film_id=film_id)
+    response = await client.get(path=path)
+    assert response.status_code == http.HTTPStatus.OK, response.text
+
+    await db_session.execute(
+        sa.update(UserFilm)
+        .where(UserFilm.user_id == user_id, UserFilm.film_id == film_id)
+        .values(is_active=True)
+    )
+    cached_response = await client.get(path=path)
+
+    assert cached_response.json() == response.json()
+
+
+async def test_not_cached_without_redis(
+    db_session, client, user_film, user_id, film_id
+) -> None:
+    path = app.url_path_for(name="retrieve", user_id=user_id, film_id=film_id)
+    await client.get(path=path)
+
+    await db_session.execute(
+        sa.update(UserFilm)
+        .where(UserFilm.user_id == user_id, UserFilm.film_id == film_id)
+        .values(is_active=True)
+    )
+    response = await client.get(path=path)
+
+    assert response.json()["is_active"]
+
+
+async def test_invalidated_by_mark_as_watched(
+    client, fake_redis, user_film, user_id, film_id
+) -> None:
+    path = app.url_path_for(name="retrieve", user_id=user_id, film_id=film_id)
+    response = await client.get(path=path)
+    assert not response.json()["watched"]
+
+    await client.put(
+        path=app.url_path_for(name="mark_as_watched", user_id=user_id, film_id=film_id)
+    )
+    response = await client.get(path=path)
+
+    assert response.status_code == http.HTTPStatus.OK, response.text
+    assert response.json()["watched"]
@@ -1,4 +1,6 @@
+import asyncio
 import http
+import time
 from typing import Any
 from unittest.mock import ANY, MagicMock
 
@@ -7,7 +9,16 @@ import sqlalchemy as sa
 from async_asgi_testclient import TestClient
 from pytest_mock import MockerFixture
 
-from app.api.errors import ASYNC_API_SERVICE_ERROR, YOOKASSA_SERVICE_ERROR
+from app.api.errors import (
+    ASYNC_API_SERVICE_ERROR,
+    IDEMPOTENCE_KEY_REUSED,
+    YOOKASSA_SERVICE_ERROR,
+)
+from app.api.idempotency import IdempotencyStore
+from app.cache import LRUCache
+from app.deadline import remaining, reset_deadline, set_deadline
+from app.integrations.async_api.cache import CachedFilm, film_details_cache
+from app.integrations.async_api.schemas import FilmSchema
 from app.integrations.async_api.client import async_api_client
 from app.integrations.yookassa.client import yookassa_client
 from app.main import app
@@ -20,6 +31,11 @@ from tests.functional.utils import fake
 pytestmark = pytest.mark.asyncio
 
 
+@pytest.fixture(autouse=True)
+def clear_film_details_cache(mocker: MockerFixture) -> None:
+    mocker.patch.object(film_details_cache, "_local", LRUCache(maxsize=16))
+
+
 @pytest.fixture
 def film_id() -> str:
     return fake.cryptographic.uuid()
@@ -46,7 +62,10 @@ def mocked_async_api(request, mocker: MockerFixture) -> MagicMock:
         "id": "a801e84c-316a-4c0c-a5a5-cc024234b2cb",
         "rating": 6.5,
         "title": "Kre-O Star Trek",
-        "description": "A stop-motion animated story about 'Star Trek' featuring Kre-O toy blocks.",
+        "description": (
+            "A stop-motion animated story about 'Star Trek' featuring Kre-O toy "
+            "blocks."
+        ),
         "genres": [
             {
                 "id": "6a0a479b-cfec-41ac-b520-41b2b007b611",
@@ -77,6 +96,15 @@ def failed_async_api(mocker: MockerFixture) -> MagicMock:
     )
 
 
+@pytest.fixture
+def missing_async_api(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch.object(
+        async_api_client.http_transport,
+        "_request",
+        side_effect=BaseTransportError(http.HTTPStatus.NOT_FOUND, {"detail": ""}),
+    )
+
+
 @pytest.fixture
 def mocked_yookassa(mocker: MockerFixture) -> MagicMock:
     mock = {
@@ -86,7 +114,10 @@ def mocked_yookassa(mocker: MockerFixture) -> MagicMock:
         "amount": {"value": "600.00", "currency": "RUB"},
         "confirmation": {
             "type": "redirect",
-            "confirmation_url": "https://yoomoney.ru/api-pages/v2/payment-confirm/epl?orderId=227cf565-000f-5000-8000-1c9d1c6000fb",
+            "confirmation_url": (
+                "https://yoomoney.ru/api-pages/v2/payment-confirm/"
+                "epl?orderId=227cf565-000f-5000-8000-1c9d1c6000fb"
+            ),
         },
         "authorization_details": {
             "rrn": "10000000000",
@@ -116,8 +147,12 @@ def mocked_yookassa(mocker: MockerFixture) -> MagicMock:
         "refundable": True,
         "refunded_amount": {"value": "600.00", "currency": "RUB"},
     }
+    # every payment gets its own id, ext_id of transactions is unique
     return mocker.patch.object(
-        yookassa_client.http_transport, "_request", return_value=mock
+        yookassa_client.http_transport,
+        "_request",
+        return_value=mock,
+        side_effect=lambda **kwargs: {**mock, "id": fake.cryptographic.uuid()},
     )
 
 
@@ -154,7 +189,8 @@ async def test_ok(
     mocked_async_api.assert_called_with(
         method="GET",
         url=f"{settings.ASYNC_API_INTEGRATION.BASE_URL}/api/v1/films/{film_id}",
-        timeout=settings.ASYNC_API_INTEGRATION.TIMEOUT_SEC,
+        timeout=async_api_client.timeout("get_film_details"),
+        raw=True,
     )
     mocked_yookassa.assert_called_with(
         method="POST",
@@ -168,6 +204,8 @@ async def test_ok(
             },
         },
         headers={"Idempotence-Key": headers["Idempotence-Key"]},
+        timeout=yookassa_client.timeout("pay"),
+        raw=True,
     )
 
     stmt = sa.select(UserFilm).where(
@@ -225,7 +263,8 @@ async def test_lte_zero_price(
     mocked_async_api.assert_called_with(
         method="GET",
         url=f"{settings.ASYNC_API_INTEGRATION.BASE_URL}/api/v1/films/{film_id}",
-        timeout=settings.ASYNC_API_INTEGRATION.TIMEOUT_SEC,
+        timeout=async_api_client.timeout("get_film_details"),
+        raw=True,
     )
     mocked_yookassa.assert_not_called()
 
@@ -250,7 +289,8 @@ async def test_failed_async_api(
     failed_async_api.assert_called_with(
         method="GET",
         url=f"{settings.ASYNC_API_INTEGRATION.BASE_URL}/api/v1/films/{film_id}",
-        timeout=settings.ASYNC_API_INTEGRATION.TIMEOUT_SEC,
+        timeout=async_api_client.timeout("get_film_details"),
+        raw=True,
     )
     mocked_yookassa.assert_not_called()
 
@@ -276,7 +316,8 @@ async def test_failed_yookassa(
     mocked_async_api.assert_called_with(
         method="GET",
         url=f"{settings.ASYNC_API_INTEGRATION.BASE_URL}/api/v1/films/{film_id}",
-        timeout=settings.ASYNC_API_INTEGRATION.TIMEOUT_SEC,
+        timeout=async_api_client.timeout("get_film_details"),
+        raw=True,
     )
     failed_yookassa.assert_called_with(
         method="POST",
@@ -290,4 +331,303 @@ async def test_failed_yookassa(
             },
         },
         headers={"Idempotence-Key": headers["Idempotence-Key"]},
+        timeout=yookassa_client.timeout("pay"),
+        raw=True,
+    )
+
+
+@pytest.mark.parametrize("mocked_async_api", (30000,), indirect=True)
+async def test_cached_film_details(
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    mocked_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    for _ in range(2):
+        response = await client.post(
+            path=app.url_path_for(name="purchase", film_id=film_id),
+            headers={**headers, "Idempotence-Key": fake.cryptographic.uuid()},
+            json=request_body,
+        )
+
+        assert response.status_code == http.HTTPStatus.OK, response.text
+
+    assert mocked_async_api.call_count == 1
+    assert mocked_yookassa.call_count == 2
+
+
+async def test_missing_film_cached(
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    missing_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    for _ in range(2):
+        response = await client.post(
+            path=app.url_path_for(name="purchase", film_id=film_id),
+            headers=headers,
+            json=request_body,
+        )
+
+        assert response.status_code == http.HTTPStatus.FAILED_DEPENDENCY, response.text
+
+    assert missing_async_api.call_count == 1
+    mocked_yookassa.assert_not_called()
+
+
+@pytest.mark.parametrize("mocked_async_api", (30000,), indirect=True)
+async def test_stale_film_details_refreshed(
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    mocked_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    film_details_cache._local.set(
+        film_id,
+        CachedFilm(
+            film=FilmSchema(title="Stale", price=10000),
+            fresh_until=time.time() - 1,
+        ),
+        ttl_sec=60,
+    )
+
+    response = await client.post(
+        path=app.url_path_for(name="purchase", film_id=film_id),
+        headers=headers,
+        json=request_body,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK, response.text
+    assert mocked_yookassa.call_args.kwargs["json"]["amount"]["value"] == "100.00"
+
+    await asyncio.gather(*film_details_cache._refreshing.values())
+
+    mocked_async_api.assert_called_once()
+    entry = await film_details_cache.get(film_id)
+    assert entry is not None and entry.film is not None
+    assert entry.is_fresh
+    assert entry.film.price == 30000
+
+
+@pytest.mark.parametrize("mocked_async_api", (30000,), indirect=True)
+async def test_too_stale_film_details_fetched(
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    mocked_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    stale_sec = settings.ASYNC_API_INTEGRATION.CACHE_PURCHASE_STALE_SEC + 1
+    film_details_cache._local.set(
+        film_id,
+        CachedFilm(
+            film=FilmSchema(title="Stale", price=10000),
+            fresh_until=time.time() - stale_sec,
+        ),
+        ttl_sec=60,
     )
+
+    response = await client.post(
+        path=app.url_path_for(name="purchase", film_id=film_id),
+        headers=headers,
+        json=request_body,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK, response.text
+    assert mocked_yookassa.call_args.kwargs["json"]["amount"]["value"] == "300.00"
+    mocked_async_api.assert_called_once()
+    assert not film_details_cache._refreshing
+
+
+async def test_refresh_has_no_request_deadline(film_id: str) -> None:
+    deadlines = []
+
+    async def fetch(_: str) -> None:
+        deadlines.append(remaining())
+
+    token = set_deadline(1)
+
+    try:
+        film_details_cache.refresh(film_id, fetch)
+    finally:
+        reset_deadline(token)
+
+    await asyncio.gather(*film_details_cache._refreshing.values())
+
+    assert deadlines == [None]
+
+
+@pytest.mark.parametrize("mocked_async_api", (30000,), indirect=True)
+async def test_retry_gets_stored_response(
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    mocked_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    responses = [
+        await client.post(
+            path=app.url_path_for(name="purchase", film_id=film_id),
+            headers=headers,
+            json=request_body,
+        )
+        for _ in range(2)
+    ]
+
+    assert all(response.status_code == http.HTTPStatus.OK for response in responses)
+    assert responses[0].json() == responses[1].json()
+    mocked_yookassa.assert_called_once()
+
+
+@pytest.mark.parametrize("mocked_async_api", (30000,), indirect=True)
+async def test_idempotence_key_reused_for_another_film(
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    mocked_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    response = await client.post(
+        path=app.url_path_for(name="purchase", film_id=film_id),
+        headers=headers,
+        json=request_body,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK, response.text
+
+    response = await client.post(
+        path=app.url_path_for(name="purchase", film_id=fake.cryptographic.uuid()),
+        headers=headers,
+        json=request_body,
+    )
+
+    assert response.status_code == http.HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == IDEMPOTENCE_KEY_REUSED
+    mocked_yookassa.assert_called_once()
+
+
+@pytest.mark.parametrize("mocked_async_api", (30000,), indirect=True)
+async def test_concurrent_duplicates_wait(
+    mocker: MockerFixture,
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    mocked_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    payment = mocked_yookassa.return_value
+
+    async def _request(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return payment
+
+    mocked_yookassa.side_effect = _request
+
+    responses = await asyncio.gather(
+        *(
+            client.post(
+                path=app.url_path_for(name="purchase", film_id=film_id),
+                headers=headers,
+                json=request_body,
+            )
+            for _ in range(3)
+        )
+    )
+
+    assert all(response.status_code == http.HTTPStatus.OK for response in responses)
+    assert len({response.text for response in responses}) == 1
+    mocked_yookassa.assert_called_once()
+
+
+@pytest.mark.parametrize("mocked_async_api", (30000,), indirect=True)
+async def test_retry_after_error(
+    mocker: MockerFixture,
+    client: TestClient,
+    headers: dict[str, Any],
+    film_id: str,
+    request_body: dict[str, Any],
+    mocked_async_api: MagicMock,
+    failed_yookassa: MagicMock,
+) -> None:
+    response = await client.post(
+        path=app.url_path_for(name="purchase", film_id=film_id),
+        headers=headers,
+        json=request_body,
+    )
+    assert response.status_code == http.HTTPStatus.FAILED_DEPENDENCY, response.text
+
+    failed_yookassa.side_effect = None
+    failed_yookassa.return_value = {
+        "id": fake.cryptographic.uuid(),
+        "status": "pending",
+        "paid": False,
+        "amount": {"value": "300.00", "currency": "RUB"},
+        "confirmation": {
+            "type": "redirect",
+            "confirmation_url": "https://yoomoney.ru/confirm",
+        },
+        "created_at": "2018-05-03T10:17:09.337Z",
+        "metadata": {},
+        "recipient": {"account_id": "100500", "gateway_id": "100700"},
+        "refundable": False,
+    }
+
+    response = await client.post(
+        path=app.url_path_for(name="purchase", film_id=film_id),
+        headers=headers,
+        json=request_body,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK, response.text
+    assert response.json()["confirmation_url"] == "https://yoomoney.ru/confirm"
+    assert failed_yookassa.call_count == 2
+
+
+async def test_local_idempotence_keys_bounded() -> None:
+    store = IdempotencyStore(
+        in_progress_ttl_sec=60,
+        response_ttl_sec=60,
+        wait_timeout_sec=0,
+        poll_interval_sec=0,
+        local_size=2,
+    )
+
+    for key in ("first", "second", "third"):
+        assert await store.acquire(key, "fingerprint") is None
+        await store.complete(key, "fingerprint", b"{}")
+
+    assert len(store._local) == 2
+    assert await store.acquire("third", "fingerprint") == b"{}"
+    assert await store.acquire("first", "fingerprint") is None
+
+
+async def test_async_api_circuit_open(
+    client: TestClient,
+    headers: dict[str, Any],
+    request_body: dict[str, Any],
+    failed_async_api: MagicMock,
+    mocked_yookassa: MagicMock,
+) -> None:
+    threshold = settings.ASYNC_API_INTEGRATION.CIRCUIT_FAILURE_THRESHOLD
+
+    for _ in range(threshold + 1):
+        response = await client.post(
+            path=app.url_path_for(name="purchase", film_id=fake.cryptographic.uuid()),
+            headers={**headers, "Idempotence-Key": fake.cryptographic.uuid()},
+            json=request_body,
+        )
+
+        assert response.status_code == http.HTTPStatus.FAILED_DEPENDENCY, response.text
+        assert response.json()["detail"] == ASYNC_API_SERVICE_ERROR
+
+    assert failed_async_api.call_count == threshold
@@ -1,5 +1,6 @@
+import asyncio
 import http
-from typing import Any
+from typing import Any, AsyncIterator
 
 import pytest
 import sqlalchemy as sa
@@ -7,7 +8,7 @@ from sqlalchemy.orm import selectinload
 
 from app.integrations.yookassa.client import YookassaHttpClient
 from app.main import app
-from app.models import UserFilm, Transaction
+from app.models import RevenueAggregate, UserFilm, Transaction
 from tests.functional.utils import fake
 
 pytestmark = pytest.mark.asyncio
@@ -41,6 +42,15 @@ def payment_data_succeeded(transaction_ext_id) -> dict[str, Any]:
     }
 
 
+@pytest.fixture
+def refund_data_succeeded(transaction_ext_id) -> dict[str, Any]:
+    return {
+        "type": "notification",
+        "event": "refund.succeeded",
+        "object": {"id": transaction_ext_id, "status": "succeeded"},
+    }
+
+
 @pytest.fixture
 def payment_data_wrong_transaction_id() -> dict[str, Any]:
     return {
@@ -126,6 +136,137 @@ async def test_yookassa_notification_payment_succeeded(
     assert user_film.is_active
     assert user_film.transaction.status == Transaction.StatusEnum.SUCCEEDED
 
+    result = await db_session.execute(
+        sa.select(RevenueAggregate).where(RevenueAggregate.film_id == user_film.film_id)
+    )
+    revenue = result.scalar_one()
+    assert revenue.payments_count == 1
+    assert revenue.payments_amount == 400
+
+
+@pytest.fixture
+async def committed_db_data(
+    sqla_engine, transaction_id, transaction_ext_id, user_id
+) -> AsyncIterator[str]:
+    """Data visible to concurrent requests, which have their own sessions."""
+    film_id = fake.cryptographic.uuid()
+
+    async with sqla_engine.begin() as conn:
+        await conn.execute(
+            sa.insert(Transaction).values(
+                id=transaction_id,
+                ext_id=transaction_ext_id,
+                user_id=user_id,
+                amount=400,
+                type=Transaction.TypeEnum.PAYMENT,
+                payment_type=Transaction.PaymentType.CARD,
+            )
+        )
+        await conn.execute(
+            sa.insert(UserFilm).values(
+                user_id=user_id,
+                film_id=film_id,
+                transaction_id=transaction_id,
+                is_active=False,
+            )
+        )
+
+    try:
+        yield film_id
+    finally:
+        async with sqla_engine.begin() as conn:
+            await conn.execute(
+                sa.delete(RevenueAggregate).where(RevenueAggregate.film_id == film_id)
+            )
+            await conn.execute(sa.delete(UserFilm).where(UserFilm.user_id == user_id))
+            await conn.execute(
+                sa.delete(Transaction).where(Transaction.user_id == user_id)
+            )
+
+
+async def test_yookassa_notification_duplicates_concurrent(
+    client,
+    sqla_engine,
+    committed_db_data,
+    payment_data_succeeded,
+    mocked_yookassa_answer_succeeded,
+    mocker,
+) -> None:
+    mocker.patch.object(
+        YookassaHttpClient,
+        "request",
+        return_value=mocked_yookassa_answer_succeeded,
+    )
+
+    responses = await asyncio.gather(
+        *(
+            client.post(
+                path=app.url_path_for(name="on_after_payment"),
+                json=payment_data_succeeded,
+            )
+            for _ in range(2)
+        )
+    )
+
+    assert all(response.status_code == http.HTTPStatus.OK for response in responses)
+
+    async with sqla_engine.connect() as conn:
+        payments_count = await conn.scalar(
+            sa.select(RevenueAggregate.payments_count).where(
+                RevenueAggregate.film_id == committed_db_data
+            )
+        )
+
+    assert payments_count == 1
+
+
+async def test_yookassa_notification_refund_succeeded(
+    client,
+    db_session,
+    refund_data_succeeded,
+    transaction_ext_id,
+    user_id,
+    mocker,
+) -> None:
+    refund = Transaction(
+        ext_id=transaction_ext_id,
+        user_id=user_id,
+        film_id=fake.cryptographic.uuid(),
+        amount=400,
+        type=Transaction.TypeEnum.REFUND,
+        status=Transaction.StatusEnum.PENDING,
+        payment_type=Transaction.PaymentType.CARD,
+    )
+    db_session.add(refund)
+    await db_session.flush()
+    request = mocker.patch.object(
+        YookassaHttpClient,
+        "request",
+        return_value={"id": transaction_ext_id, "status": "succeeded"},
+    )
+
+    for _ in range(2):
+        response = await client.post(
+            path=app.url_path_for(name="on_after_payment"), json=refund_data_succeeded
+        )
+        assert response.status_code == http.HTTPStatus.OK, response.text
+
+    assert request.call_args.kwargs["url"].endswith(f"/v3/refunds/{transaction_ext_id}")
+
+    result = await db_session.execute(
+        sa.select(Transaction)
+        .where(Transaction.id == refund.id)
+        .execution_options(populate_existing=True)
+    )
+    assert result.scalar_one().status == Transaction.StatusEnum.SUCCEEDED
+
+    result = await db_session.execute(
+        sa.select(RevenueAggregate).where(RevenueAggregate.film_id == refund.film_id)
+    )
+    revenue = result.scalar_one()
+    assert revenue.refunds_count == 1
+    assert revenue.refunds_amount == 400
+
 
 async def test_yookassa_notification_payment_canceled(
     client,
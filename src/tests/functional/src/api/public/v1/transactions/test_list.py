@@ -2,6 +2,7 @@ import http
 from typing import Any
 
 import pytest
+import sqlalchemy as sa
 from furl import furl
 
 from tests.functional.src.api.utils import LIMIT_QTY, OFFSET_NUM
@@ -68,3 +69,60 @@ async def test_not_target_user(
         "limit": LIMIT_QTY,
         "offset": OFFSET_NUM,
     }
+
+
+def _plan_nodes(plan: dict[str, Any]):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@pytest.mark.parametrize(
+    "endpoint_path",
+    (
+        furl("/api/v1/transactions")
+        .add(query_params={"limit": LIMIT_QTY, "offset": OFFSET_NUM})
+        .url,
+        furl("/api/v1/transactions/cursor").add(query_params={"limit": LIMIT_QTY}).url,
+    ),
+)
+async def test_plan_uses_user_history_index(
+    client, db_session, transactions, headers, endpoint_path
+) -> None:
+    connection = await db_session.connection()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        # the page query, not the count of the offset pagination
+        if "LIMIT" in statement and "count(" not in statement:
+            statements.append((statement, parameters))
+
+    sa.event.listen(connection.sync_engine, "before_cursor_execute", capture)
+
+    try:
+        response = await client.get(path=endpoint_path, headers=headers)
+    finally:
+        sa.event.remove(connection.sync_engine, "before_cursor_execute", capture)
+
+    assert response.status_code == http.HTTPStatus.OK
+    [(statement, parameters)] = statements
+
+    # the test table is tiny, so make the planner behave as on a large one
+    await db_session.execute(sa.text("SET LOCAL enable_seqscan = off"))
+    await db_session.execute(sa.text("SET LOCAL enable_bitmapscan = off"))
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {statement}", parameters
+    )
+    nodes = list(_plan_nodes(result.scalar()[0]["Plan"]))
+
+    assert not [node for node in nodes if node["Node Type"] == "Sort"]
+    # transactions are partitioned, every partition has its own copy of the index
+    index_names = {
+        node.get("Index Name")
+        for node in nodes
+        if node.get("Relation Name", "").startswith("transactions")
+    }
+    assert index_names
+    assert all(
+        name and name.endswith("_user_id_created_at_id_idx") for name in index_names
+    ), index_names
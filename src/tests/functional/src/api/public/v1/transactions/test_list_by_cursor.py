@@ -0,0 +1,83 @@
+import http
+from typing import Any
+
+import pytest
+from furl import furl
+
+from app.api.errors import INVALID_CURSOR
+from tests.functional.src.api.utils import LIMIT_QTY
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def path() -> str:
+    return furl("/api/v1/transactions/cursor").add({"limit": LIMIT_QTY}).url
+
+
+@pytest.fixture
+def expected_response(expected_retrieve) -> dict[str, Any]:
+    return {
+        "items": [expected_retrieve],
+        "limit": LIMIT_QTY,
+        "next_cursor": None,
+    }
+
+
+async def test_ok(
+    client,
+    path,
+    receipt_items,
+    users_films,
+    user_receipt_item,
+    user_film,
+    headers,
+    expected_response,
+) -> None:
+    response = await client.get(
+        path=path,
+        headers=headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json() == expected_response
+
+
+async def test_not_target_user(
+    client,
+    path,
+    receipt_items,
+    users_films,
+    user_receipt_item,
+    user_film,
+    not_target_headers,
+) -> None:
+    response = await client.get(
+        path=path,
+        headers=not_target_headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.json() == {
+        "items": [],
+        "limit": LIMIT_QTY,
+        "next_cursor": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "invalid",
+        # ["2022-08-01T00:00:00",123], the id is not a string
+        "WyIyMDIyLTA4LTAxVDAwOjAwOjAwIiwxMjNd",
+    ],
+)
+async def test_invalid_cursor(client, path, headers, cursor) -> None:
+    response = await client.get(
+        path=furl(path).add({"cursor": cursor}).url,
+        headers=headers,
+    )
+
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert response.json()["detail"] == INVALID_CURSOR
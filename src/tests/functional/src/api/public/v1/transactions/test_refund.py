@@ -257,7 +257,14 @@ async def test_ok(
     film_id,
     mocked_yookassa: MagicMock,
     expected_response: dict[str, Any],
+    fake_redis,
 ) -> None:
+    user_film_path = app.url_path_for(
+        name="retrieve", user_id=valid_jwt_payload["user_id"], film_id=film_id
+    )
+    response = await client.get(path=user_film_path)
+    assert response.json()["is_active"]
+
     response = await client.post(
         path=app.url_path_for(name="refund", transaction_id=transaction_id),
         headers=headers,
@@ -266,6 +273,9 @@ async def test_ok(
     assert response.status_code == http.HTTPStatus.OK, response.text
     assert response.json() == expected_response
 
+    response = await client.get(path=user_film_path)
+    assert not response.json()["is_active"]
+
     mocked_yookassa.assert_called_with(
         method="POST",
         url=f"{settings.YOOKASSA_INTEGRATION.BASE_URL}/v3/refunds",
@@ -277,6 +287,8 @@ async def test_ok(
             "payment_id": ANY,
         },
         headers={"Idempotence-Key": headers["Idempotence-Key"]},
+        timeout=yookassa_client.timeout("refund"),
+        raw=True,
     )
 
     stmt = sa.select(UserFilm).where(
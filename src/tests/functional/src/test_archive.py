@@ -0,0 +1,224 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app.archive import ArchiveStorage
+from app.models import (
+    ArchivedTransaction,
+    ObjectDoesNotExistError,
+    Receipt,
+    ReceiptItem,
+    RevenueAggregate,
+    Transaction,
+    UserFilm,
+)
+from app.services.archive.service import ArchiveService
+from app.services.payments.exceptions import NotAvalableForRefundError
+from app.services.payments.service import payments_service
+from tests.functional.utils import fake
+
+pytestmark = pytest.mark.asyncio
+
+OLD = datetime(2021, 3, 5)
+
+
+@pytest.fixture
+def archive_service(tmp_path) -> ArchiveService:
+    return ArchiveService(ArchiveStorage(tmp_path))
+
+
+@pytest.fixture
+def storage_patch(mocker, tmp_path) -> None:
+    mocker.patch("app.models.archive_storage", ArchiveStorage(tmp_path))
+
+
+def make_transaction(db_session, status, created_at) -> Transaction:
+    transaction = Transaction(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        film_id=uuid.uuid4(),
+        amount=400,
+        type=Transaction.TypeEnum.PAYMENT,
+        status=status,
+        payment_type=Transaction.PaymentType.CARD,
+        created_at=created_at,
+        updated_at=created_at,
+    )
+    receipt = Receipt(
+        id=uuid.uuid4(),
+        transaction_id=transaction.id,
+        created_at=created_at,
+    )
+    receipt_item = ReceiptItem(
+        receipt_id=receipt.id,
+        description=fake.text.title(),
+        quantity=1,
+        amount=400,
+        type=ReceiptItem.TypeEnum.FILM,
+        created_at=created_at,
+    )
+    user_film = UserFilm(
+        user_id=transaction.user_id,
+        film_id=transaction.film_id,
+        transaction_id=transaction.id,
+        is_active=True,
+    )
+    db_session.add_all([transaction, receipt, receipt_item, user_film])
+
+    return transaction
+
+
+@pytest.fixture
+async def transactions(db_session) -> dict[str, Transaction]:
+    transactions = {
+        "old_final": make_transaction(
+            db_session, Transaction.StatusEnum.SUCCEEDED, OLD
+        ),
+        "old_pending": make_transaction(
+            db_session, Transaction.StatusEnum.PENDING, OLD
+        ),
+        "new_final": make_transaction(
+            db_session, Transaction.StatusEnum.SUCCEEDED, datetime.utcnow()
+        ),
+    }
+    await db_session.flush()
+
+    return transactions
+
+
+async def test_archive_batch(db_session, archive_service, transactions) -> None:
+    older_than = datetime.utcnow() - timedelta(days=180)
+
+    assert await archive_service.archive_batch(db_session, older_than, 10) == 1
+    assert await archive_service.archive_batch(db_session, older_than, 10) == 0
+
+    result = await db_session.execute(
+        sa.select(Transaction.id).where(
+            Transaction.id.in_([t.id for t in transactions.values()])
+        )
+    )
+    assert set(result.scalars()) == {
+        transactions["old_pending"].id,
+        transactions["new_final"].id,
+    }
+
+    archived = await ArchivedTransaction.get(
+        db_session, id=transactions["old_final"].id
+    )
+    tables = await archive_service.storage.read_batch(archived.path)
+    assert [len(tables[table]) for table in sorted(tables)] == [1, 1, 1]
+
+
+async def test_revenue_rebuild_keeps_archived_days(
+    db_session, archive_service, transactions
+) -> None:
+    old_final, new_final = transactions["old_final"], transactions["new_final"]
+
+    for transaction in (old_final, new_final):
+        await RevenueAggregate.add(
+            db_session, transaction, day=transaction.updated_at.date()
+        )
+
+    older_than = datetime.utcnow() - timedelta(days=180)
+    await archive_service.archive_batch(db_session, older_than, 10)
+    await RevenueAggregate.rebuild(db_session)
+
+    result = await db_session.execute(
+        sa.select(RevenueAggregate.day, RevenueAggregate.payments_amount).where(
+            RevenueAggregate.film_id.in_([old_final.film_id, new_final.film_id])
+        )
+    )
+    assert sorted(result.all()) == [
+        (OLD.date(), 400),
+        (new_final.updated_at.date(), 400),
+    ]
+
+
+async def test_get_falls_back_to_archive(
+    db_session, archive_service, storage_patch, transactions
+) -> None:
+    old_final = transactions["old_final"]
+    await archive_service.archive_batch(db_session, datetime.utcnow(), 10)
+    db_session.expunge_all()
+
+    transaction = await Transaction.get(
+        db_session,
+        id=old_final.id,
+        profile=Transaction.LoadProfileEnum.FULL,
+        with_archived=True,
+    )
+
+    assert transaction.id == old_final.id
+    assert transaction.status == Transaction.StatusEnum.SUCCEEDED
+    assert transaction.amount == 400
+    assert transaction.created_at == OLD
+    assert transaction.receipt.transaction_id == old_final.id
+    assert [item.type for item in transaction.receipt.items] == [
+        ReceiptItem.TypeEnum.FILM
+    ]
+    assert transaction.user_film.transaction_id == old_final.id
+
+    with pytest.raises(ObjectDoesNotExistError):
+        await Transaction.get(db_session, ext_id=fake.cryptographic.uuid())
+
+    with pytest.raises(ObjectDoesNotExistError):
+        await Transaction.get(
+            db_session, id=fake.cryptographic.uuid(), with_archived=True
+        )
+
+
+async def test_get_archived_on_request_only(
+    db_session, archive_service, storage_patch, transactions
+) -> None:
+    old_final = transactions["old_final"]
+    await archive_service.archive_batch(db_session, datetime.utcnow(), 10)
+    db_session.expunge_all()
+
+    with pytest.raises(ObjectDoesNotExistError):
+        await Transaction.get(db_session, id=old_final.id)
+
+    transaction = await Transaction.get(
+        db_session,
+        id=old_final.id,
+        user_id=str(old_final.user_id),
+        with_archived=True,
+    )
+    assert transaction.id == old_final.id
+
+    with pytest.raises(ObjectDoesNotExistError):
+        await Transaction.get(
+            db_session,
+            id=old_final.id,
+            user_id=fake.cryptographic.uuid(),
+            with_archived=True,
+        )
+
+
+async def test_refund_archived_rejected(
+    db_session, archive_service, storage_patch, transactions
+) -> None:
+    old_final = transactions["old_final"]
+    await archive_service.archive_batch(db_session, datetime.utcnow(), 10)
+
+    with pytest.raises(NotAvalableForRefundError):
+        await payments_service.refund_film(
+            db_session, str(old_final.id), str(old_final.user_id), uuid.uuid4()
+        )
+
+
+async def test_load_missing_in_batch(
+    db_session, archive_service, storage_patch, transactions
+) -> None:
+    old_final = transactions["old_final"]
+    await archive_service.archive_batch(db_session, datetime.utcnow(), 10)
+    await db_session.execute(
+        sa.update(ArchivedTransaction)
+        .where(ArchivedTransaction.id == old_final.id)
+        .values(id=uuid.uuid4())
+        .execution_options(synchronize_session=False)
+    )
+
+    with pytest.raises(ObjectDoesNotExistError):
+        await ArchivedTransaction.load(db_session, old_final.id)
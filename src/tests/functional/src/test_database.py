@@ -0,0 +1,112 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.database import (
+    InstrumentedQueuePool,
+    RecentWritesRegistry,
+    ReplicasRouter,
+    read_session_scope,
+    session_scope,
+)
+from app.settings import settings
+from tests.functional.utils import fake
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def unavailable_engine():
+    engine = create_async_engine(
+        make_url(settings.DB.DSN).set(port=1), connect_args={"timeout": 1}
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def instrumented_engine():
+    engine = create_async_engine(settings.DB.DSN, poolclass=InstrumentedQueuePool)
+    yield engine
+    await engine.dispose()
+
+
+async def test_pool_stats(instrumented_engine) -> None:
+    for _ in range(2):
+        async with instrumented_engine.connect():
+            pass
+
+    stats = instrumented_engine.pool.pop_stats()
+
+    assert stats["checkouts"] == 2
+    # only the first checkout opened a connection
+    assert stats["connects"] == 1
+    assert stats["connect_sec"] > 0
+    assert stats["checkout_wait_sec"] < stats["connect_sec"]
+    assert instrumented_engine.pool.pop_stats()["checkouts"] == 0
+
+
+async def test_recent_writes_marked() -> None:
+    registry = RecentWritesRegistry(ttl_sec=60, local_size=16)
+    user_id = fake.cryptographic.uuid()
+
+    await registry.mark(user_id)
+
+    assert await registry.is_marked(user_id)
+    assert not await registry.is_marked(fake.cryptographic.uuid())
+
+
+async def test_recent_writes_expired() -> None:
+    registry = RecentWritesRegistry(ttl_sec=0, local_size=16)
+    user_id = fake.cryptographic.uuid()
+
+    await registry.mark(user_id)
+
+    assert not await registry.is_marked(user_id)
+
+
+async def test_recent_writes_bounded() -> None:
+    registry = RecentWritesRegistry(ttl_sec=60, local_size=2)
+    user_ids = [fake.cryptographic.uuid() for _ in range(3)]
+
+    for user_id in user_ids:
+        await registry.mark(user_id)
+
+    assert len(registry._local) == 2
+    assert not await registry.is_marked(user_ids[0])
+    assert await registry.is_marked(user_ids[-1])
+
+
+async def test_unavailable_replica_skipped(unavailable_engine) -> None:
+    router = ReplicasRouter([unavailable_engine], retry_after_sec=60)
+
+    assert await router.get_session() is None
+    assert not router.is_healthy(unavailable_engine)
+
+
+async def in_transaction(session: AsyncSession) -> bool:
+    """Returns whether the driver connection of the session is in a transaction."""
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+
+    return raw_connection.connection.driver_connection.is_in_transaction()
+
+
+# not using db_session, its sessionmaker patch bypasses read_engine
+async def test_read_session_autocommit(database) -> None:
+    async with read_session_scope() as session:
+        await session.execute(sa.text("SELECT 1"))
+        connection = await session.connection()
+
+        assert (
+            connection.sync_connection.get_execution_options().get("isolation_level")
+            == "AUTOCOMMIT"
+        )
+        # no BEGIN is sent, so there is no COMMIT to send either
+        assert not await in_transaction(session)
+
+    async with session_scope() as session:
+        await session.execute(sa.text("SELECT 1"))
+
+        assert await in_transaction(session)
@@ -0,0 +1,382 @@
+import asyncio
+import uuid
+from decimal import Decimal
+from typing import AsyncIterator, Optional
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+from pytest_mock import MockerFixture
+from starlette.types import Receive, Scope, Send
+
+from app import deadline
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.integrations.async_api.client import async_api_client
+from app.integrations.async_api.exceptions import AsyncAPIHttpClientError
+from app.integrations.async_api.schemas import FilmSchema
+from app.integrations.yookassa.client import yookassa_client
+from app.integrations.yookassa.exceptions import YookassaHttpClientError
+from app.integrations.yookassa.schemas import YookassaPaymentResponseSchema
+from app.settings import settings
+from app.settings.base import HttpClientSettings
+from app.transports import (
+    AiohttpTransport,
+    BaseTransportError,
+    RequestTimeout,
+    RetryBudget,
+)
+from tests.functional.utils import FakeRedis, fake
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def slow_async_api(mocker: MockerFixture) -> MagicMock:
+    async def _request(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return {"title": "Kre-O Star Trek", "price": 30000}
+
+    return mocker.patch.object(
+        async_api_client.http_transport, "_request", side_effect=_request
+    )
+
+
+@pytest.fixture
+def slow_failed_async_api(mocker: MockerFixture) -> MagicMock:
+    async def _request(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        raise BaseTransportError(500, "error")
+
+    return mocker.patch.object(
+        async_api_client.http_transport, "_request", side_effect=_request
+    )
+
+
+@pytest.fixture
+async def upstream_url() -> AsyncIterator[str]:
+    async def ok(request: web.Request) -> web.Response:
+        return web.json_response({"ok": True})
+
+    async def slow(request: web.Request) -> web.Response:
+        await asyncio.sleep(1)
+        return web.json_response({"ok": True})
+
+    async def error(request: web.Request) -> web.Response:
+        return web.Response(status=503)
+
+    async def text(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def invalid(request: web.Request) -> web.Response:
+        return web.Response(body=b"{", content_type="application/json")
+
+    async def not_found(request: web.Request) -> web.Response:
+        return web.json_response({"detail": "not found"}, status=404)
+
+    async def echo(request: web.Request) -> web.Response:
+        return web.Response(
+            body=await request.read(), content_type=request.content_type
+        )
+
+    app = web.Application()
+    app.router.add_get("/", ok)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/error", error)
+    app.router.add_get("/text", text)
+    app.router.add_get("/invalid", invalid)
+    app.router.add_get("/not-found", not_found)
+    app.router.add_post("/echo", echo)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    try:
+        yield f"http://127.0.0.1:{port}/"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture
+async def transport() -> AsyncIterator[AiohttpTransport]:
+    transport = AiohttpTransport("test")
+    await transport.startup()
+
+    try:
+        yield transport
+    finally:
+        await transport.shutdown()
+        AiohttpTransport.instances.remove(transport)
+
+
+async def test_connections_reused(transport, upstream_url) -> None:
+    for _ in range(5):
+        assert await transport.request("GET", upstream_url) == {"ok": True}
+
+    stats = transport.connection_stats.pop()
+
+    assert stats["created"] == 1
+    assert stats["reused"] == 4
+    assert transport.connection_stats.pop()["reused"] == 0
+
+
+async def test_json_codec(transport, upstream_url) -> None:
+    data = {"payment_id": uuid.uuid4(), "amount": {"value": Decimal("600.00")}}
+
+    assert await transport.request("POST", f"{upstream_url}echo", json=data) == {
+        "payment_id": str(data["payment_id"]),
+        "amount": {"value": 600.0},
+    }
+    assert await transport.request("GET", f"{upstream_url}text") == "ok"
+    assert await transport.request("GET", upstream_url, raw=True) == b'{"ok": true}'
+
+
+async def test_json_codec_errors(transport, upstream_url) -> None:
+    with pytest.raises(BaseTransportError) as exc_info:
+        await transport.request("GET", f"{upstream_url}not-found", raw=True)
+    assert exc_info.value.status == 404
+    assert exc_info.value.message == {"detail": "not found"}
+
+    with pytest.raises(BaseTransportError) as exc_info:
+        await transport.request("GET", f"{upstream_url}invalid")
+    assert exc_info.value.status == 200
+
+
+def test_parse_raw_response() -> None:
+    payment_id = uuid.uuid4()
+    response = (
+        b'{"id": "%s", "status": "pending", "paid": false, "confirmation": '
+        b'{"type": "redirect", "confirmation_url": "https://yoomoney.ru/confirm"}}'
+    ) % str(payment_id).encode()
+
+    payment = yookassa_client.parse(YookassaPaymentResponseSchema, response)
+
+    assert payment.id == payment_id
+    assert payment.confirmation.confirmation_url == "https://yoomoney.ru/confirm"
+
+    with pytest.raises(YookassaHttpClientError):
+        yookassa_client.parse(YookassaPaymentResponseSchema, b'{"id": "x"}')
+    with pytest.raises(YookassaHttpClientError):
+        yookassa_client.parse(YookassaPaymentResponseSchema, b"{")
+
+
+def test_method_timeout() -> None:
+    client_settings = HttpClientSettings(
+        TIMEOUT_SEC=10,
+        CONNECT_TIMEOUT_SEC=2,
+        METHOD_TIMEOUTS={"refund": {"total": 30, "sock_read": 20}},
+    )
+
+    assert RequestTimeout.from_settings(client_settings, "pay") == RequestTimeout(
+        total=10, connect=2
+    )
+    assert RequestTimeout.from_settings(client_settings, "refund") == RequestTimeout(
+        total=30, connect=2, sock_read=20
+    )
+
+
+async def test_timeouts_counted(mocker: MockerFixture, transport, upstream_url) -> None:
+    mocker.patch.object(settings.BACKOFF, "MAX_TIME_SEC", 0.2)
+
+    with pytest.raises(BaseTransportError):
+        await transport.request(
+            "GET", f"{upstream_url}slow", timeout=RequestTimeout(total=0.05)
+        )
+
+    assert transport.connection_stats.pop()["timeouts"] >= 1
+
+
+async def test_circuit_breaker(transport, upstream_url) -> None:
+    threshold = transport.client_settings.CIRCUIT_FAILURE_THRESHOLD
+
+    for _ in range(threshold):
+        with pytest.raises(BaseTransportError) as exc_info:
+            await transport.request("GET", f"{upstream_url}error")
+        assert exc_info.value.status == 503
+
+    assert transport.circuit_breaker.state == CircuitBreaker.StateEnum.OPEN
+
+    with pytest.raises(BaseTransportError) as exc_info:
+        await transport.request("GET", upstream_url)
+    assert isinstance(exc_info.value.__cause__, CircuitOpenError)
+
+    # recovery time passed
+    transport.circuit_breaker._open_until = 0
+    assert transport.circuit_breaker.state == CircuitBreaker.StateEnum.HALF_OPEN
+
+    assert await transport.request("GET", upstream_url) == {"ok": True}
+    assert transport.circuit_breaker.state == CircuitBreaker.StateEnum.CLOSED
+
+
+async def test_circuit_breaker_failed_trial(transport, upstream_url) -> None:
+    transport.circuit_breaker._record_failure_local(trial=True)
+    transport.circuit_breaker._open_until = 0
+
+    with pytest.raises(BaseTransportError):
+        await transport.request("GET", f"{upstream_url}error")
+
+    assert transport.circuit_breaker.state == CircuitBreaker.StateEnum.OPEN
+
+
+async def test_circuit_breaker_shared(mocker: MockerFixture) -> None:
+    redis = mocker.patch("app.circuit_breaker.redis_client", FakeRedis())
+    circuit_breaker = CircuitBreaker(
+        "shared", failure_threshold=2, failure_window_sec=60, recovery_sec=30
+    )
+
+    await circuit_breaker.record_failure(trial=False)
+
+    # the window of failures is set together with the counter
+    ttl = redis.ttl("circuit:shared:failures")
+    assert ttl is not None
+    assert 0 < ttl <= 60
+    assert not await circuit_breaker.allow()
+
+    await circuit_breaker.record_failure(trial=False)
+
+    with pytest.raises(CircuitOpenError):
+        await circuit_breaker.allow()
+    assert await redis.get("circuit:shared:failures") is None
+
+
+async def test_deadline_cuts_timeout(transport, upstream_url) -> None:
+    token = deadline.set_deadline(0.1)
+
+    try:
+        with pytest.raises(BaseTransportError) as exc_info:
+            await transport.request(
+                "GET", f"{upstream_url}slow", timeout=RequestTimeout(total=10)
+            )
+    finally:
+        deadline.reset_deadline(token)
+
+    assert isinstance(
+        exc_info.value.__cause__,
+        (asyncio.TimeoutError, deadline.DeadlineExceededError),
+    )
+
+
+async def test_deadline_exceeded(
+    mocker: MockerFixture, transport, upstream_url
+) -> None:
+    _request = mocker.patch.object(transport, "_request")
+    token = deadline.set_deadline(0)
+
+    try:
+        with pytest.raises(BaseTransportError) as exc_info:
+            await transport.request("GET", upstream_url)
+    finally:
+        deadline.reset_deadline(token)
+
+    assert isinstance(exc_info.value.__cause__, deadline.DeadlineExceededError)
+    _request.assert_not_called()
+
+
+def test_deadline_middleware_timeout() -> None:
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        pass
+
+    middleware = deadline.DeadlineMiddleware(
+        app, budget_sec=30, header="X-Request-Timeout"
+    )
+
+    assert middleware._get_timeout({"headers": []}) == 30
+    assert middleware._get_timeout({"headers": [(b"x-request-timeout", b"5")]}) == 5
+    assert middleware._get_timeout({"headers": [(b"x-request-timeout", b"60")]}) == 30
+    assert middleware._get_timeout({"headers": [(b"x-request-timeout", b"x")]}) == 30
+
+
+async def test_retry_budget(mocker: MockerFixture, transport, upstream_url) -> None:
+    mocker.patch.object(settings.BACKOFF, "MAX_TIME_SEC", 5)
+    mocker.patch.object(transport, "retry_budget", RetryBudget(0, max_tokens=1))
+    mocker.patch.object(transport, "circuit_breaker", None)
+
+    with pytest.raises(BaseTransportError):
+        await transport.request(
+            "GET", f"{upstream_url}slow", timeout=RequestTimeout(total=0.05)
+        )
+
+    assert transport.connection_stats.pop()["timeouts"] == 2
+    assert transport.retry_budget.pop() == (1, 1)
+
+
+async def test_single_flight(slow_async_api: MagicMock) -> None:
+    film_id = fake.cryptographic.uuid()
+
+    films = await asyncio.gather(
+        *(async_api_client._fetch_film_details(film_id) for _ in range(5))
+    )
+
+    slow_async_api.assert_called_once()
+    assert all(film is films[0] for film in films)
+    assert not async_api_client._in_flight
+
+
+async def test_single_flight_different_args(slow_async_api: MagicMock) -> None:
+    await asyncio.gather(
+        async_api_client._fetch_film_details(fake.cryptographic.uuid()),
+        async_api_client._fetch_film_details(fake.cryptographic.uuid()),
+    )
+
+    assert slow_async_api.call_count == 2
+
+
+async def test_single_flight_error(slow_failed_async_api: MagicMock) -> None:
+    film_id = fake.cryptographic.uuid()
+
+    results = await asyncio.gather(
+        *(async_api_client._fetch_film_details(film_id) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    slow_failed_async_api.assert_called_once()
+    assert all(isinstance(result, AsyncAPIHttpClientError) for result in results)
+
+
+async def test_single_flight_cancelled_caller(slow_async_api: MagicMock) -> None:
+    film_id = fake.cryptographic.uuid()
+
+    cancelled = asyncio.ensure_future(async_api_client._fetch_film_details(film_id))
+    waiting = asyncio.ensure_future(async_api_client._fetch_film_details(film_id))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    film = await waiting
+
+    slow_async_api.assert_called_once()
+    assert film is not None
+    assert film.price == 30000
+
+
+async def test_single_flight_deadline_of_each_caller(mocker: MockerFixture) -> None:
+    deadlines = []
+
+    async def _request(*args, **kwargs):
+        deadlines.append(deadline.remaining())
+        await asyncio.sleep(0.05)
+        return {"title": "Kre-O Star Trek", "price": 30000}
+
+    _request_mock = mocker.patch.object(
+        async_api_client.http_transport, "_request", side_effect=_request
+    )
+    film_id = fake.cryptographic.uuid()
+
+    async def fetch_until_deadline() -> Optional[FilmSchema]:
+        token = deadline.set_deadline(0.01)
+        try:
+            return await async_api_client._fetch_film_details(film_id)
+        finally:
+            deadline.reset_deadline(token)
+
+    hurried, patient = await asyncio.gather(
+        fetch_until_deadline(),
+        async_api_client._fetch_film_details(film_id),
+        return_exceptions=True,
+    )
+
+    _request_mock.assert_called_once()
+    # the shared call doesn't inherit the deadline of the first caller
+    assert deadlines == [None]
+    assert isinstance(hurried, AsyncAPIHttpClientError)
+    assert isinstance(patient, FilmSchema)
@@ -0,0 +1,156 @@
+from datetime import date
+
+import pytest
+import sqlalchemy as sa
+
+from app.models import RevenueAggregate, Transaction, UserFilm
+from tests.functional.utils import fake
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def user_id() -> str:
+    return fake.cryptographic.uuid()
+
+
+@pytest.fixture
+def users_films_values(user_id) -> list[dict]:
+    return [
+        {"user_id": user_id, "film_id": fake.cryptographic.uuid()} for _ in range(3)
+    ]
+
+
+async def test_bulk_create(db_session, users_films_values) -> None:
+    users_films = await UserFilm.bulk_create(db_session, users_films_values)
+
+    assert len(users_films) == len(users_films_values)
+    assert all(user_film.id for user_film in users_films)
+    assert all(user_film.created_at for user_film in users_films)
+
+
+async def test_bulk_create_empty(db_session) -> None:
+    assert await UserFilm.bulk_create(db_session, []) == []
+
+
+async def test_bulk_create_ignore_conflicts(db_session, users_films_values) -> None:
+    await UserFilm.bulk_create(db_session, users_films_values[:1])
+
+    users_films = await UserFilm.bulk_create(
+        db_session, users_films_values, ignore_conflicts=True
+    )
+
+    assert len(users_films) == len(users_films_values) - 1
+
+
+async def test_bulk_upsert(db_session, user_id, users_films_values) -> None:
+    await UserFilm.bulk_create(db_session, users_films_values)
+
+    users_films = await UserFilm.bulk_upsert(
+        db_session,
+        [{**values, "watched": True} for values in users_films_values],
+        index_elements=["user_id", "film_id"],
+    )
+
+    assert len(users_films) == len(users_films_values)
+    assert all(user_film.watched for user_film in users_films)
+
+    result = await db_session.execute(
+        sa.select(sa.func.count()).where(UserFilm.user_id == user_id)
+    )
+    assert result.scalar() == len(users_films_values)
+
+
+async def test_get_or_create(db_session, user_id) -> None:
+    film_id = fake.cryptographic.uuid()
+
+    user_film, created = await UserFilm.get_or_create(
+        db_session, user_id=user_id, film_id=film_id
+    )
+
+    assert created
+    assert not user_film.is_active
+
+    same_user_film, created = await UserFilm.get_or_create(
+        db_session, defaults={"is_active": True}, user_id=user_id, film_id=film_id
+    )
+
+    assert not created
+    assert same_user_film.id == user_film.id
+    assert not same_user_film.is_active
+
+
+async def test_update_where(db_session, user_id, users_films_values) -> None:
+    await UserFilm.bulk_create(db_session, users_films_values)
+
+    rows = await UserFilm.update_where(db_session, {"is_active": True}, user_id=user_id)
+
+    assert len(rows) == len(users_films_values)
+    assert all(row.is_active for row in rows)
+
+
+async def test_update_where_not_matched(db_session) -> None:
+    rows = await UserFilm.update_where(
+        db_session, {"is_active": True}, user_id=fake.cryptographic.uuid()
+    )
+
+    assert rows == []
+
+
+@pytest.fixture
+def film_transactions(db_session, user_id) -> list[Transaction]:
+    film_id = fake.cryptographic.uuid()
+    transactions = [
+        Transaction(
+            user_id=user_id,
+            film_id=film_id,
+            amount=amount,
+            type=type_,
+            status=Transaction.StatusEnum.SUCCEEDED,
+            payment_type=Transaction.PaymentType.CARD,
+        )
+        for amount, type_ in (
+            (300, Transaction.TypeEnum.PAYMENT),
+            (500, Transaction.TypeEnum.PAYMENT),
+            (300, Transaction.TypeEnum.REFUND),
+        )
+    ]
+    db_session.add_all(transactions)
+
+    return transactions
+
+
+async def _get_revenue(db_session, film_id) -> RevenueAggregate:
+    result = await db_session.execute(
+        sa.select(RevenueAggregate)
+        .where(RevenueAggregate.film_id == film_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def test_revenue_add(db_session, film_transactions) -> None:
+    for transaction in film_transactions:
+        await RevenueAggregate.add(db_session, transaction, day=date(2022, 8, 1))
+
+    revenue = await _get_revenue(db_session, film_transactions[0].film_id)
+
+    assert revenue.day == date(2022, 8, 1)
+    assert revenue.payments_count == 2
+    assert revenue.payments_amount == 800
+    assert revenue.refunds_count == 1
+    assert revenue.refunds_amount == 300
+
+
+async def test_revenue_rebuild(db_session, film_transactions) -> None:
+    await db_session.flush()
+    await RevenueAggregate.add(db_session, film_transactions[0])
+
+    await RevenueAggregate.rebuild(db_session, date_from=date.today())
+
+    revenue = await _get_revenue(db_session, film_transactions[0].film_id)
+
+    assert revenue.payments_count == 2
+    assert revenue.payments_amount == 800
+    assert revenue.refunds_count == 1
+    assert revenue.refunds_amount == 300
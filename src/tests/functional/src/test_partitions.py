@@ -0,0 +1,102 @@
+from datetime import date, datetime
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Transaction, TransactionExtId
+from app.partitions import add_months, create_future_partitions
+from tests.functional.utils import fake
+
+pytestmark = pytest.mark.asyncio
+
+
+def test_add_months() -> None:
+    assert add_months(date(2022, 8, 22), 3) == date(2022, 11, 1)
+    assert add_months(date(2022, 11, 1), 14) == date(2024, 1, 1)
+
+
+async def test_create_future_partitions(db_session) -> None:
+    assert await create_future_partitions(months_ahead=24) > 0
+    assert await create_future_partitions(months_ahead=24) == 0
+
+    created_at = datetime.combine(add_months(date.today(), 20), datetime.min.time())
+    await db_session.execute(
+        sa.insert(Transaction).values(
+            user_id=fake.cryptographic.uuid(),
+            amount=100,
+            type=Transaction.TypeEnum.PAYMENT,
+            payment_type=Transaction.PaymentType.CARD,
+            created_at=created_at,
+        )
+    )
+    result = await db_session.execute(
+        sa.select(sa.literal_column("tableoid::regclass::text")).where(
+            Transaction.created_at == created_at
+        )
+    )
+
+    assert result.scalar() == f"content.transactions_{created_at:y%Ym%m}"
+
+
+async def test_rows_moved_from_default_partition(db_session) -> None:
+    created_at = datetime.combine(add_months(date.today(), 40), datetime.min.time())
+    ext_id = fake.cryptographic.uuid()
+    await db_session.execute(
+        sa.insert(Transaction).values(
+            ext_id=ext_id,
+            user_id=fake.cryptographic.uuid(),
+            amount=100,
+            type=Transaction.TypeEnum.PAYMENT,
+            payment_type=Transaction.PaymentType.CARD,
+            created_at=created_at,
+        )
+    )
+    assert await Transaction.default_partition_has_rows(db_session)
+
+    # the month of the row is created even though it is not ahead enough
+    assert await create_future_partitions(months_ahead=1) > 0
+
+    result = await db_session.execute(
+        sa.select(sa.literal_column("tableoid::regclass::text")).where(
+            Transaction.created_at == created_at
+        )
+    )
+
+    assert result.scalar() == f"content.transactions_{created_at:y%Ym%m}"
+    assert not await Transaction.default_partition_has_rows(db_session)
+    # ext_id still locates the moved row
+    assert (
+        await db_session.scalar(
+            sa.select(TransactionExtId.created_at).where(
+                TransactionExtId.ext_id == ext_id
+            )
+        )
+        == created_at
+    )
+
+
+async def test_ext_id_unique_across_partitions(db_session) -> None:
+    ext_id = fake.cryptographic.uuid()
+    values = dict(
+        ext_id=ext_id,
+        user_id=fake.cryptographic.uuid(),
+        amount=100,
+        type=Transaction.TypeEnum.PAYMENT,
+        payment_type=Transaction.PaymentType.CARD,
+    )
+    await db_session.execute(
+        sa.insert(Transaction).values(**values, created_at=datetime(2022, 8, 1))
+    )
+
+    with pytest.raises(IntegrityError):
+        async with db_session.begin_nested():
+            await db_session.execute(
+                sa.insert(Transaction).values(**values, created_at=datetime(2022, 9, 1))
+            )
+
+    transaction = await Transaction.get(
+        db_session, ext_id=ext_id, created_at=TransactionExtId.created_at_of(ext_id)
+    )
+
+    assert transaction.created_at == datetime(2022, 8, 1)
@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+import pytest
+from jose import jwt
+from pytest_mock import MockerFixture
+
+from app.security import NotAuthenticatedError, decode_jwt_token, token_cache
+from app.settings import settings
+from tests.functional.utils import fake
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache(mocker: MockerFixture) -> None:
+    mocker.patch.object(token_cache, "_data", OrderedDict())
+
+
+@pytest.fixture
+def payload() -> dict[str, Any]:
+    return {
+        "user_id": fake.cryptographic.uuid(),
+        "login": fake.person.full_name(),
+        "email": fake.person.email(),
+        "roles": [],
+    }
+
+
+def encode(payload: dict[str, Any]) -> str:
+    return jwt.encode(
+        payload,
+        settings.SECURITY.JWT_AUTH.SECRET_KEY,
+        algorithm=settings.SECURITY.JWT_AUTH.ALGORITHM,
+    )
+
+
+def test_decoded_token_cached(mocker: MockerFixture, payload) -> None:
+    token = encode(payload)
+    decode = mocker.spy(jwt, "decode")
+
+    token_data = decode_jwt_token(token)
+
+    assert decode_jwt_token(token) is token_data
+    assert token_data.user_id == payload["user_id"]
+    decode.assert_called_once()
+
+
+def test_cached_until_exp(payload) -> None:
+    exp = int(time.time()) + 60
+    decode_jwt_token(encode({**payload, "exp": exp}))
+
+    [(expires_at, _)] = token_cache._data.values()
+    assert expires_at == pytest.approx(exp)
+
+
+def test_cached_not_longer_than_max_ttl(payload) -> None:
+    decode_jwt_token(encode({**payload, "exp": int(time.time()) + 86400}))
+
+    [(expires_at, _)] = token_cache._data.values()
+    assert expires_at == pytest.approx(
+        time.time() + settings.SECURITY.JWT_AUTH.CACHE_MAX_TTL_SEC, abs=1
+    )
+
+
+def test_expired_token_decoded_again(mocker: MockerFixture, payload) -> None:
+    token = encode({**payload, "exp": int(time.time()) + 60})
+    decode_jwt_token(token)
+    decode = mocker.spy(jwt, "decode")
+
+    mocker.patch("app.cache.time.time", return_value=time.time() + 120)
+    decode_jwt_token(token)
+
+    decode.assert_called_once()
+
+
+def test_invalid_token_not_cached() -> None:
+    with pytest.raises(NotAuthenticatedError):
+        decode_jwt_token("invalid")
+
+    assert not token_cache._data
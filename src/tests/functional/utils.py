@@ -1,3 +1,4 @@
+import time
 from typing import Optional
 
 import mimesis
@@ -81,3 +82,79 @@ async def drop_database(url: str):
         await conn.execute(text(disc_users))
 
         await conn.execute(text(f'DROP DATABASE "{url_object.database}"'))
+
+
+class FakeRedis:
+    """In-memory stand-in for the few redis commands used by caches."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, tuple[Optional[float], bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        expires_at, value = self.data.get(key, (None, None))
+
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+
+        return value
+
+    async def set(
+        self, key: str, value, ex: Optional[int] = None, nx: bool = False
+    ) -> bool:
+        if nx and await self.get(key) is not None:
+            return False
+
+        if not isinstance(value, bytes):
+            value = str(value).encode()
+
+        self.data[key] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    async def mget(self, *keys: str) -> list[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    async def incr(self, key: str) -> int:
+        expires_at, _ = self.data.get(key, (None, None))
+        value = int(await self.get(key) or 0) + 1
+        self.data[key] = (expires_at, str(value).encode())
+        return value
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def ttl(self, key: str) -> Optional[float]:
+        """Seconds left until the key expires, not a redis command."""
+        expires_at, _ = self.data.get(key, (None, None))
+        return expires_at - time.monotonic() if expires_at is not None else None
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands of FakeRedis and runs them on execute."""
+
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.commands = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs) -> "FakePipeline":
+            self.commands.append((getattr(self.redis, name), args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list:
+        results = [
+            await command(*args, **kwargs) for command, args, kwargs in self.commands
+        ]
+        self.commands = []
+        return results